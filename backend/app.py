@@ -6,11 +6,13 @@ FINAL FIXED VERSION - Each video gets UNIQUE analysis
 
 import os
 import sys
-import pandas as pd
-import numpy as np
 import json
 import hashlib
-from flask import Flask, request, jsonify
+import hmac
+import tempfile
+import threading
+import time
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -19,9 +21,13 @@ load_dotenv()
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Analyzers (and pandas/numpy) are imported on first use, so a fresh worker
+# can answer health checks without paying for libraries it has not needed yet
 try:
-    from src.loader import InteractionDataLoader
-    from src.detector import InstagramAIConfidenceLabeler
+    from src.analyzers import create_analyzer
+    from src.enrichment import EnrichmentQueueFullError, GeminiEnrichmentQueue
+    from src.video_jobs import (QueueFullError, VideoBatchRunner, VideoJobQueue, discover_videos,
+                                load_completed_videos, to_json_line)
     print("✅ Successfully imported backend modules")
 except ImportError as e:
     print(f"⚠️ Import error: {e}")
@@ -33,9 +39,90 @@ CORS(app)
 # Disable all caching
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
-def get_labeler():
+# One warm labeler shared by all request threads. Building it configures the
+# Gemini SDK and probes the candidate models, so it is done once at startup
+# (in the background, see warm_labeler) and again only on an explicit refresh.
+_labeler = None
+_labeler_built_at = None
+_labeler_lock = threading.Lock()
+
+# Refreshing re-probes Gemini (spending quota), so it needs ADMIN_TOKEN in an
+# X-Admin-Token header (or, with no token configured, a localhost caller) and
+# runs at most once per GEMINI_REFRESH_MIN_INTERVAL seconds
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+GEMINI_REFRESH_MIN_INTERVAL = float(os.getenv('GEMINI_REFRESH_MIN_INTERVAL', '60'))
+_last_refresh = None
+_refresh_lock = threading.Lock()
+
+# Deferred Gemini jobs outlive labeler refreshes, so the queue is app-level
+enrichment_queue = GeminiEnrichmentQueue(max_pending=int(os.getenv('GEMINI_MAX_PENDING', '64')))
+
+# Video analysis runs in worker processes; the pool starts on the first job
+_video_queue = None
+_video_queue_lock = threading.Lock()
+VIDEO_UPLOAD_DIR = os.getenv('VIDEO_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'video_uploads'))
+# Server-side directory clients may reference by path instead of uploading
+VIDEO_INPUT_DIR = os.getenv('VIDEO_INPUT_DIR')
+# Batches run one at a time, each on its own worker pool; resume files live here
+_video_batch_lock = threading.Lock()
+VIDEO_BATCH_STATE_DIR = os.getenv('VIDEO_BATCH_STATE_DIR', os.path.join(tempfile.gettempdir(), 'video_batches'))
+
+def get_video_queue():
+    """Return the shared video job queue, starting its worker pool on first use."""
+    global _video_queue
+    if _video_queue is None:
+        with _video_queue_lock:
+            if _video_queue is None:
+                _video_queue = VideoJobQueue(
+                    max_workers=int(os.getenv('VIDEO_WORKERS', '0')) or None,
+                    max_pending=int(os.getenv('VIDEO_MAX_PENDING', '16'))
+                )
+    return _video_queue
+
+def build_labeler():
     gemini_key = os.getenv('GEMINI_API_KEY')
-    return InstagramAIConfidenceLabeler(gemini_api_key=gemini_key)
+    return create_analyzer('interactions', gemini_api_key=gemini_key, enrichment_queue=enrichment_queue)
+
+def get_labeler():
+    """Return the shared labeler, building it on first use."""
+    global _labeler, _labeler_built_at
+    if _labeler is None:
+        with _labeler_lock:
+            if _labeler is None:
+                _labeler = build_labeler()
+                _labeler_built_at = datetime.now()
+    return _labeler
+
+def refresh_labeler():
+    """Rebuild the shared labeler (re-probing Gemini) and swap it in atomically."""
+    global _labeler, _labeler_built_at
+    with _labeler_lock:
+        # In-flight requests keep using the old instance until they finish
+        _labeler = build_labeler()
+        _labeler_built_at = datetime.now()
+    return _labeler
+
+def warm_labeler():
+    """Build the shared labeler on a background thread, so no request pays for it"""
+    threading.Thread(target=get_labeler, name='labeler-warmup', daemon=True).start()
+
+def _reset_labeler_lock():
+    # A server that forks workers after import (e.g. gunicorn --preload) may
+    # fork mid-warmup; the child must not inherit the lock held by that thread
+    global _labeler_lock
+    _labeler_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_labeler_lock)
+
+def labeler_status():
+    """Health details for the shared labeler and its Gemini client."""
+    if _labeler is None:
+        return {'initialized': False}
+    return {
+        'initialized': True,
+        'built_at': _labeler_built_at.isoformat(),
+        'gemini': _labeler.gemini.status()
+    }
 
 def generate_deterministic_interactions(video_id, video_num):
     """
@@ -43,6 +130,7 @@ def generate_deterministic_interactions(video_id, video_num):
     Same video ID will ALWAYS get the same pattern
     Different video IDs will get DIFFERENT patterns
     """
+    import numpy as np
     
     # Use video_id to create a deterministic seed
     seed_value = int(hashlib.md5(str(video_id).encode()).hexdigest()[:8], 16)
@@ -183,16 +271,51 @@ def generate_deterministic_interactions(video_id, video_num):
 def health_check():
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'labeler': labeler_status(),
+        'enrichment_queue': enrichment_queue.status(),
+        'video_queue': _video_queue.status() if _video_queue is not None else {'initialized': False}
     })
 
+@app.route('/api/gemini/refresh', methods=['POST'])
+def refresh_gemini():
+    """Rebuild the shared labeler and re-probe Gemini (e.g. after a quota reset or key change)"""
+    global _last_refresh
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return jsonify({'error': 'Admin token required'}), 401
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Refresh is only allowed from localhost unless ADMIN_TOKEN is set'}), 403
+    
+    with _refresh_lock:
+        now = time.monotonic()
+        if _last_refresh is not None and now - _last_refresh < GEMINI_REFRESH_MIN_INTERVAL:
+            response = jsonify({'error': 'Refreshed too recently'})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(int(GEMINI_REFRESH_MIN_INTERVAL - (now - _last_refresh)) + 1)
+            return response
+        _last_refresh = now
+    
+    try:
+        print("\n🔄 Refreshing labeler and Gemini connection...")
+        refresh_labeler()
+        return jsonify(labeler_status())
+    except Exception as e:
+        print(f"❌ Refresh failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/analyze/reel', methods=['POST'])
 def analyze_reel():
     """Analyze a reel with UNIQUE patterns per video"""
+    import pandas as pd
+    
     try:
         data = request.json
         reel_data = data.get('reel', {})
         frontend_interactions = data.get('interactions', [])
+        use_gemini = data.get('use_gemini', True)
+        # Gemini runs in the background by default; pick it up via /api/enrichment/<job_id>
+        defer_gemini = data.get('defer_gemini', True)
         
         # Get video ID
         video_id = reel_data.get('id', 'unknown')
@@ -205,7 +328,7 @@ def analyze_reel():
         print(f"🔍 ANALYZING VIDEO {video_id} at {datetime.now().strftime('%H:%M:%S')}")
         print(f"{'='*60}")
         
-        # Create FRESH labeler
+        # Shared warm labeler (built once, not per request)
         labeler = get_labeler()
         
         # Use frontend interactions if provided, otherwise generate deterministic ones
@@ -227,7 +350,7 @@ def analyze_reel():
         print(f"   ... and {len(df)-3} more")
         
         # Analyze
-        result = labeler.analyze_post(f"reel_{video_id}", df, use_gemini=True)
+        result = labeler.analyze_post(f"reel_{video_id}", df, use_gemini=use_gemini, defer_gemini=defer_gemini)
         
         # Add metadata
         result['video_id'] = video_id
@@ -256,14 +379,147 @@ def analyze_reel():
         
         return response
     
+    except EnrichmentQueueFullError as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = '10'
+        return response
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/enrichment/<job_id>', methods=['GET'])
+def get_enrichment(job_id):
+    """Fetch deferred Gemini insights for an earlier analysis"""
+    job = enrichment_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown or expired enrichment job: {job_id}'}), 404
+    
+    response = jsonify(convert_numpy_types(job))
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+@app.route('/api/video/jobs', methods=['POST'])
+def submit_video_job():
+    """Queue a video for AI-content analysis; poll /api/video/jobs/<job_id> for the result"""
+    upload = request.files.get('video')
+    remove_upload = None
+    
+    if upload is not None and upload.filename:
+        os.makedirs(VIDEO_UPLOAD_DIR, exist_ok=True)
+        fd, video_path = tempfile.mkstemp(suffix=os.path.splitext(upload.filename)[1], dir=VIDEO_UPLOAD_DIR)
+        os.close(fd)
+        upload.save(video_path)
+        
+        def remove_upload(job_id=None):
+            if os.path.exists(video_path):
+                os.unlink(video_path)
+    else:
+        data = request.get_json(silent=True) or {}
+        video_path = data.get('video_path')
+        if not video_path:
+            return jsonify({'error': "Upload a 'video' file or pass 'video_path'"}), 400
+        video_path = resolve_input_path(video_path)
+        if video_path is None:
+            return jsonify({'error': 'video_path must be inside VIDEO_INPUT_DIR'}), 403
+        if not os.path.isfile(video_path):
+            return jsonify({'error': f'Video not found: {video_path}'}), 404
+    
+    try:
+        job_id = get_video_queue().submit(video_path, on_finished=remove_upload)
+    except QueueFullError as e:
+        if remove_upload is not None:
+            remove_upload()
+        response = jsonify({'error': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    print(f"🎬 Queued video job {job_id}")
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/api/video/jobs/{job_id}'}), 202
+
+@app.route('/api/video/jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Status (and, once done, the result) of a video analysis job"""
+    job = get_video_queue().get(job_id) if _video_queue is not None else None
+    if job is None:
+        return jsonify({'error': f'Unknown or expired video job: {job_id}'}), 404
+    
+    response = jsonify(convert_numpy_types(job))
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+@app.route('/api/video/batch', methods=['POST'])
+def run_video_batch():
+    """Analyze a directory or manifest of videos, streaming one JSON line per video as it finishes"""
+    data = request.get_json(silent=True) or {}
+    source = data.get('source')
+    if not source:
+        return jsonify({'error': "Pass 'source': a directory or manifest inside VIDEO_INPUT_DIR"}), 400
+    source = resolve_input_path(source)
+    if source is None:
+        return jsonify({'error': 'source must be inside VIDEO_INPUT_DIR'}), 403
+    if not os.path.exists(source):
+        return jsonify({'error': f'Not found: {source}'}), 404
+    
+    try:
+        video_paths = discover_videos(source)
+    except (OSError, ValueError, KeyError) as e:
+        return jsonify({'error': f'Could not read manifest: {e}'}), 400
+    outside = [path for path in video_paths if resolve_input_path(path) is None]
+    if outside:
+        return jsonify({'error': f'{len(outside)} manifest entries are outside VIDEO_INPUT_DIR', 'example': outside[0]}), 403
+    
+    # With 'resume': true, the same source picks up where an earlier
+    # (interrupted) request stopped; videos it finished are not streamed again
+    resume_path = None
+    skipped = 0
+    if data.get('resume', False):
+        os.makedirs(VIDEO_BATCH_STATE_DIR, exist_ok=True)
+        resume_path = os.path.join(VIDEO_BATCH_STATE_DIR, hashlib.sha256(source.encode('utf-8')).hexdigest()[:16] + '.jsonl')
+        completed = load_completed_videos(resume_path)
+        remaining = [path for path in video_paths if path not in completed]
+        skipped = len(video_paths) - len(remaining)
+        video_paths = remaining
+    runner = VideoBatchRunner(max_workers=int(os.getenv('VIDEO_WORKERS', '0')) or None, resume_path=resume_path)
+    
+    def generate():
+        for record in runner.run(video_paths):
+            yield to_json_line(convert_numpy_types(record))
+    
+    # Taken only once nothing else can fail before the response owns it
+    if not _video_batch_lock.acquire(blocking=False):
+        response = jsonify({'error': 'A video batch is already running'})
+        response.status_code = 429
+        response.headers['Retry-After'] = '60'
+        return response
+    try:
+        response = Response(generate(), mimetype='application/x-ndjson')
+        response.headers['X-Video-Count'] = str(len(video_paths))
+        response.headers['X-Video-Skipped'] = str(skipped)
+        # Runs when the stream ends or the client disconnects
+        response.call_on_close(_video_batch_lock.release)
+    except Exception:
+        _video_batch_lock.release()
+        raise
+    print(f"🎬 Video batch: {len(video_paths)} videos from {source}" + (f" ({skipped} already done)" if skipped else ""))
+    return response
+
+def resolve_input_path(path):
+    """Real path of ``path`` if it is inside VIDEO_INPUT_DIR, else None"""
+    if not VIDEO_INPUT_DIR:
+        return None
+    input_dir = os.path.realpath(VIDEO_INPUT_DIR)
+    path = os.path.realpath(path)
+    return path if os.path.commonpath([input_dir, path]) == input_dir else None
+
 def convert_numpy_types(obj):
     """Convert numpy types to Python native types"""
+    import numpy as np
+    import pandas as pd
+    
     if obj is None:
         return None
     if isinstance(obj, dict):
@@ -285,6 +541,13 @@ def convert_numpy_types(obj):
     else:
         return obj
 
+# Warm the labeler at startup in every process that serves requests (gunicorn
+# or uwsgi workers, `flask run`, the debug reloader's child), but not in the
+# reloader's parent, which only watches files. LABELER_WARMUP=0 turns it off.
+_reloader_parent = __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+if os.getenv('LABELER_WARMUP', '1') != '0' and not _reloader_parent:
+    warm_labeler()
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("🚀 INSTAGRAM AI DETECTOR - FINAL FIXED VERSION")
@@ -0,0 +1,85 @@
+"""
+Timing script for the synchronization feature.
+
+Times BehavioralFeatureExtractor.extract_synchronization (the sorted
+adjacent-gap mask) against the original pairwise scan it replaced, on random
+posts of increasing size, after checking that both return the same result.
+
+Usage: python benchmark_features.py [--sizes 250 1000 2000] [--repeat 3]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features import BehavioralFeatureExtractor
+
+
+def pairwise_synchronization(df: pd.DataFrame, window_seconds: float, threshold: float) -> dict:
+    """The original O(n^2) extract_synchronization, kept here as the reference."""
+    if len(df) < 2:
+        return {'value': 0, 'is_abnormal': False}
+    
+    df_sorted = df.sort_values('timestamp')
+    times = df_sorted['timestamp'].tolist()
+    users = df_sorted['user_id'].tolist()
+    sync_users = set()
+    for i in range(len(times)):
+        for j in range(i+1, len(times)):
+            if (times[j] - times[i]).total_seconds() <= window_seconds:
+                sync_users.add(users[i])
+                sync_users.add(users[j])
+    ratio = len(sync_users) / df['user_id'].nunique() if df['user_id'].nunique() > 0 else 0
+    return {'value': ratio, 'is_abnormal': ratio > threshold}
+
+
+def random_post(num_events: int, seed: int = 0) -> pd.DataFrame:
+    """Interactions spread over a day, with a coordinated burst in the middle."""
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.uniform(0, 24 * 3600, num_events))
+    burst = rng.choice(num_events, num_events // 10, replace=False)
+    offsets[burst] = 12 * 3600 + rng.uniform(0, 30, len(burst))
+    return pd.DataFrame({
+        'user_id': [f'user_{u}' for u in rng.integers(0, num_events // 2 + 1, num_events)],
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(offsets, unit='s')
+    })
+
+
+def best_time(fn, repeat: int) -> float:
+    """Fastest of ``repeat`` runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the synchronization feature')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 1000, 2000],
+                        help='Interactions per post')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+    
+    extractor = BehavioralFeatureExtractor()
+    window = extractor.thresholds.SYNC_WINDOW_SECONDS
+    threshold = extractor.thresholds.SYNC_THRESHOLD_PERCENT
+    print(f"\n⏱️ extract_synchronization, {window}s window")
+    print(f"{'events':>8} {'pairwise':>12} {'shipped':>12} {'speedup':>9}")
+    for size in args.sizes:
+        df = random_post(size)
+        if extractor.extract_synchronization(df) != pairwise_synchronization(df, window, threshold):
+            raise SystemExit(f"❌ extract_synchronization and the pairwise scan disagree at {size} events")
+        
+        pairwise = best_time(lambda: pairwise_synchronization(df, window, threshold), args.repeat)
+        shipped = best_time(lambda: extractor.extract_synchronization(df), args.repeat)
+        print(f"{size:>8} {pairwise * 1000:>10.1f}ms {shipped * 1000:>10.2f}ms {pairwise / shipped:>8.0f}x")
+    
+    print("✅ Both implementations agree")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,8 +21,9 @@ from src.loader import InteractionDataLoader
 from src.detector import InstagramAIConfidenceLabeler
 
 
-def analyze_post_from_csv(csv_file_path, use_gemini=True):
-    """Analyze posts from a CSV file with optional Gemini insights."""
+def analyze_post_from_csv(csv_file_path, use_gemini=True, workers=1, chunk_size=32, stream=False,
+                          output_path=None, post_ids=None, start_time=None, end_time=None):
+    """Analyze posts from a CSV, Parquet or Arrow file with optional Gemini insights."""
     
     print(f"\n📊 Analyzing data from: {csv_file_path}")
     
@@ -31,12 +32,19 @@ def analyze_post_from_csv(csv_file_path, use_gemini=True):
         return
     
     # Load and analyze the data
-    loader = InteractionDataLoader(data_source=csv_file_path)
+    loader = InteractionDataLoader(data_source=csv_file_path, compact=True, post_ids=post_ids,
+                                   start_time=start_time, end_time=end_time)
+    writer = None
     
     try:
-        df = loader.load_data()
-        print(f"✓ Loaded {len(df)} interactions")
-        print(f"✓ Found {df['post_id'].nunique()} posts")
+        if stream:
+            # Complete per-post groups from chunked reads; the file is never fully in memory
+            posts = loader.iter_post_groups()
+            print("✓ Streaming interactions in chunks")
+        else:
+            posts = loader.load_data()
+            print(f"✓ Loaded {len(posts)} interactions")
+            print(f"✓ Found {posts['post_id'].nunique()} posts")
         
         # Get Gemini API key from environment
         gemini_key = os.getenv('GEMINI_API_KEY')
@@ -47,10 +55,17 @@ def analyze_post_from_csv(csv_file_path, use_gemini=True):
         if use_gemini and gemini_key:
             print("✓ Gemini API enabled for enhanced analysis")
         
+        if workers > 1:
+            print(f"✓ Analyzing with {workers} worker processes")
+        
+        if output_path:
+            from src.writer import AnalysisResultWriter
+            writer = AnalysisResultWriter(output_path)
+        
         # Analyze each post
-        for post_id in df['post_id'].unique():
-            post_df = df[df['post_id'] == post_id]
-            result = labeler.analyze_post(post_id, post_df, use_gemini=use_gemini)
+        for result in labeler.iter_analyze_posts(posts, use_gemini=use_gemini, workers=workers, chunk_size=chunk_size):
+            if writer is not None:
+                writer.write(result)
             
             # Display result
             print("\n" + "="*70)
@@ -89,9 +104,58 @@ def analyze_post_from_csv(csv_file_path, use_gemini=True):
                 print(f"\n   📋 Moderation Note: {result['moderation_note']}")
             
             print("="*70)
+        
+        if writer is not None:
+            writer.close()
+            print(f"\n💾 Wrote {writer.rows_written} results to {output_path}")
             
     except Exception as e:
         print(f"❌ Error analyzing post: {e}")
+    finally:
+        # Failed or interrupted: a half-written Parquet/Arrow file has no footer and cannot be read
+        if writer is not None and not writer.closed:
+            writer.abort()
+            print(f"🗑️ Removed partial output {output_path}")
+
+
+def analyze_videos(source, output_path=None, resume_path=None, workers=None, num_frames=30, use_cache=True):
+    """Analyze a directory or manifest of videos, writing one JSON line per video as it finishes."""
+    from src.video_jobs import VideoBatchRunner, discover_videos, to_json_line
+    
+    # Results go to stdout unless --output is given, so progress goes to stderr
+    log = sys.stderr
+    
+    if not os.path.exists(source):
+        print(f"❌ ERROR: Not found: {source}", file=log)
+        return
+    
+    video_paths = discover_videos(source)
+    print(f"🎬 Found {len(video_paths)} videos in {source}", file=log)
+    
+    runner = VideoBatchRunner(max_workers=workers, resume_path=resume_path,
+                              analyzer_options={'num_frames': num_frames, 'use_cache': use_cache})
+    out = open(output_path, 'a', encoding='utf-8') if output_path else sys.stdout
+    
+    try:
+        for record in runner.run(video_paths):
+            out.write(to_json_line(record))
+            out.flush()
+            
+            finished = runner.stats['done'] + runner.stats['failed']
+            remaining = runner.stats['total'] - runner.stats['skipped'] - finished
+            if record['status'] == 'done':
+                print(f"✓ {record['video_path']}: {record['result'].get('ai_probability')}% AI "
+                      f"({record['elapsed_seconds']}s, {remaining} left)", file=log)
+            else:
+                print(f"❌ {record['video_path']}: {record['error']}", file=log)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted" + (f"; rerun with --resume {resume_path} to continue" if resume_path else ""), file=log)
+    finally:
+        if output_path:
+            out.close()
+    
+    stats = runner.stats
+    print(f"\n📊 {stats['done']} done, {stats['failed']} failed, {stats['skipped']} skipped (already done)", file=log)
 
 
 def interactive_mode():
@@ -196,12 +260,33 @@ def main():
     """Main entry point."""
     
     parser = argparse.ArgumentParser(description='Instagram AI Confidence Labeler with Gemini')
-    parser.add_argument('--file', '-f', help='CSV file containing post interactions')
+    parser.add_argument('--file', '-f', help='CSV, Parquet or Arrow file containing post interactions')
     parser.add_argument('--interactive', '-i', action='store_true', help='Run in interactive mode')
     parser.add_argument('--no-gemini', action='store_true', help='Disable Gemini API')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Worker processes for multi-post analysis')
+    parser.add_argument('--chunk-size', type=int, default=32, help='Posts sent to a worker per task')
+    parser.add_argument('--stream', action='store_true', help='Stream large files in chunks instead of loading them whole')
+    parser.add_argument('--output', '-o', help='Write results to a .parquet or .arrow file')
+    parser.add_argument('--post-id', action='append', dest='post_ids', help='Only analyze this post (repeatable)')
+    parser.add_argument('--since', help='Only use interactions at or after this time')
+    parser.add_argument('--until', help='Only use interactions at or before this time')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    videos_parser = subparsers.add_parser('videos', help='Batch-analyze video files for AI-generated content')
+    videos_parser.add_argument('source', help='Directory of videos, or a manifest file with one path per line')
+    videos_parser.add_argument('--output', '-o', dest='video_output', help='Append JSON Lines results to this file (default: stdout)')
+    videos_parser.add_argument('--resume', help='Resume file: records finished videos and skips them on rerun')
+    videos_parser.add_argument('--workers', '-w', type=int, dest='video_workers', help='Worker processes (default: CPU count)')
+    videos_parser.add_argument('--num-frames', type=int, default=30, help='Frames sampled per video')
+    videos_parser.add_argument('--no-cache', action='store_true', help='Do not read or write the video result cache')
     
     args = parser.parse_args()
     
+    if args.command == 'videos':
+        analyze_videos(args.source, output_path=args.video_output, resume_path=args.resume, workers=args.video_workers,
+                       num_frames=args.num_frames, use_cache=not args.no_cache)
+        return
+    
     print("\n" + "="*70)
     print("📱 INSTAGRAM AI CONFIDENCE LABELER WITH GEMINI")
     print("="*70)
@@ -209,12 +294,19 @@ def main():
     if args.interactive:
         interactive_mode()
     elif args.file:
-        analyze_post_from_csv(args.file, use_gemini=not args.no_gemini)
+        analyze_post_from_csv(args.file, use_gemini=not args.no_gemini,
+                              workers=args.workers, chunk_size=args.chunk_size, stream=args.stream,
+                              output_path=args.output, post_ids=args.post_ids,
+                              start_time=args.since, end_time=args.until)
     else:
         print("\nUsage:")
         print("  python main.py --file <your_data.csv>")
         print("  python main.py --interactive")
         print("  python main.py --file data.csv --no-gemini")
+        print("  python main.py --file data.csv --no-gemini --workers 4")
+        print("  python main.py --file huge.csv --no-gemini --stream")
+        print("  python main.py --file events.parquet --post-id video123 --output results.parquet")
+        print("  python main.py videos reels/ --output results.jsonl --resume reels.resume --workers 4")
         print("\nCSV Format Required:")
         print("  post_id,user_id,timestamp,action_type")
         print("  video123,user456,2025-02-13 14:30:00,like")
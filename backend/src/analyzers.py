@@ -0,0 +1,63 @@
+"""
+Registry of analyzers, imported on first use.
+
+Each analyzer pulls in a different set of heavy libraries (pandas/scipy for
+interactions, OpenCV/librosa for video, the Gemini SDK for insights). Callers
+ask the registry for an analyzer by name, so a process only pays the import
+cost of the analyzers it actually runs.
+"""
+
+import importlib
+import threading
+from typing import Any, Dict, Tuple
+
+
+_REGISTRY: Dict[str, Tuple[str, str]] = {
+    'interactions': ('.detector', 'InstagramAIConfidenceLabeler'),
+    'video': ('.video_analyzer', 'VideoAIAnalyzer'),
+    'gemini': ('.gemini_analyzer', 'GeminiPostAnalyzer')
+}
+_loaded: Dict[str, type] = {}
+_lock = threading.Lock()
+
+
+def register_analyzer(name: str, module: str, attribute: str) -> None:
+    """
+    Register an analyzer class by location, without importing it.
+    
+    Args:
+        name: Registry key
+        module: Module path; a leading '.' is relative to this package
+        attribute: Class (or factory) name inside the module
+    """
+    with _lock:
+        _REGISTRY[name] = (module, attribute)
+        _loaded.pop(name, None)
+
+
+def available_analyzers() -> Dict[str, bool]:
+    """Registered analyzer names, mapped to whether each is already imported."""
+    with _lock:
+        return {name: name in _loaded for name in _REGISTRY}
+
+
+def get_analyzer_class(name: str) -> type:
+    """
+    Import (once) and return the analyzer class registered under ``name``.
+    
+    Raises:
+        KeyError: If no analyzer is registered under the name
+        ImportError: If the analyzer's dependencies are not installed
+    """
+    with _lock:
+        if name not in _loaded:
+            if name not in _REGISTRY:
+                raise KeyError(f"Unknown analyzer '{name}'. Choose from {list(_REGISTRY)}")
+            module, attribute = _REGISTRY[name]
+            _loaded[name] = getattr(importlib.import_module(module, __package__), attribute)
+        return _loaded[name]
+
+
+def create_analyzer(name: str, *args: Any, **kwargs: Any) -> Any:
+    """Instantiate the analyzer registered under ``name``."""
+    return get_analyzer_class(name)(*args, **kwargs)
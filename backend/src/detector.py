@@ -1,12 +1,18 @@
 """Core detection logic with Gemini API integration."""
 
+import bisect
+import copy
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
 
 from .features import BehavioralFeatureExtractor
 from .graph_analysis import InteractionGraphAnalyzer
 from .gemini_analyzer import GeminiPostAnalyzer
-from .utils import DetectionThresholds, calculate_confidence_score, format_instagram_ui_label, get_instagram_tap_detail, get_signal_descriptions
+from .enrichment import GeminiEnrichmentQueue
+from .utils import DetectionThresholds, calculate_confidence_score, epoch_ns, to_epoch_ns, format_instagram_ui_label, get_instagram_tap_detail, get_signal_descriptions
 
 class InstagramAIConfidenceLabeler:
     """
@@ -14,22 +20,31 @@ class InstagramAIConfidenceLabeler:
     Now with Gemini API for enhanced insights!
     """
     
-    def __init__(self, gemini_api_key: Optional[str] = None):
+    def __init__(self, gemini_api_key: Optional[str] = None, graph_backend: str = 'networkx',
+                 enrichment_queue: Optional[GeminiEnrichmentQueue] = None,
+                 enable_gemini: bool = True):
         """
         Initialize the labeler.
         
         Args:
             gemini_api_key: Optional Gemini API key for enhanced analysis
+            graph_backend: Graph metrics backend, 'networkx' or 'sparse'
+            enrichment_queue: Queue for deferred Gemini enrichment; one is
+                created on first deferred call if omitted
+            enable_gemini: If False, skip Gemini setup entirely (no environment
+                key lookup, no model probe); scoring still works
         """
         self.feature_extractor = BehavioralFeatureExtractor()
-        self.graph_analyzer = InteractionGraphAnalyzer()
+        self.graph_analyzer = InteractionGraphAnalyzer(backend=graph_backend)
         self.thresholds = DetectionThresholds()
         self.signal_descriptions = get_signal_descriptions()
         
         # Initialize Gemini if API key provided
-        self.gemini = GeminiPostAnalyzer(api_key=gemini_api_key)
+        self.gemini = GeminiPostAnalyzer(api_key=gemini_api_key, enabled=enable_gemini)
+        self.enrichment_queue = enrichment_queue
     
-    def analyze_post(self, post_id: str, interactions_df: pd.DataFrame, use_gemini: bool = True) -> Dict[str, Any]:
+    def analyze_post(self, post_id: str, interactions_df: pd.DataFrame, use_gemini: bool = True,
+                     defer_gemini: bool = False) -> Dict[str, Any]:
         """
         Analyze a post and return complete results with optional Gemini insights.
         
@@ -37,14 +52,18 @@ class InstagramAIConfidenceLabeler:
             post_id: Your post/video ID
             interactions_df: DataFrame with interaction data
             use_gemini: Whether to enhance analysis with Gemini API
+            defer_gemini: Return immediately and run Gemini in the background;
+                the result carries a gemini_job_id for get_enrichment()
         
         Returns:
             Dictionary with analysis results and optional Gemini insights
         """
         
+        unique_users = interactions_df['user_id'].nunique() if len(interactions_df) > 0 else 0
+        
         # Check for minimum data
         if len(interactions_df) < 3:
-            return self._insufficient_data_response(post_id, interactions_df)
+            return self._insufficient_data_response(post_id, len(interactions_df), unique_users)
         
         # Extract all behavioral features
         behavioral_features = self.feature_extractor.extract_all_features(post_id, interactions_df)
@@ -52,6 +71,23 @@ class InstagramAIConfidenceLabeler:
         # Perform graph analysis
         graph_analysis = self.graph_analyzer.analyze_post_patterns(post_id, interactions_df)
         
+        result = self._score_signals(post_id, len(interactions_df), unique_users, behavioral_features, graph_analysis)
+        
+        # Add Gemini insights if requested and available
+        if use_gemini and self.gemini.is_available:
+            if defer_gemini:
+                if self.enrichment_queue is None:
+                    self.enrichment_queue = GeminiEnrichmentQueue()
+                result['gemini_job_id'] = self.enrichment_queue.submit(self._gemini_enrichment, dict(result))
+                result['gemini_status'] = 'pending'
+            else:
+                result.update(self._gemini_enrichment(result))
+        
+        return result
+    
+    def _score_signals(self, post_id: str, total_interactions: int, unique_users: int,
+                       behavioral_features: Dict, graph_analysis: Dict) -> Dict[str, Any]:
+        """Turn extracted features into the result dictionary (without Gemini fields)."""
         # Evaluate all signals
         signals = self._evaluate_signals(behavioral_features, graph_analysis)
         abnormal_signals = [s for s in signals if s['is_abnormal']]
@@ -70,10 +106,10 @@ class InstagramAIConfidenceLabeler:
                 triggered.append(desc)
         
         # Base result
-        result = {
+        return {
             'post_id': post_id,
-            'total_interactions': len(interactions_df),
-            'unique_users': interactions_df['user_id'].nunique(),
+            'total_interactions': total_interactions,
+            'unique_users': unique_users,
             'abnormal_signal_count': abnormal_count,
             'confidence': confidence,
             'label': format_instagram_ui_label(confidence),
@@ -81,47 +117,200 @@ class InstagramAIConfidenceLabeler:
             'triggered_signals': triggered,
             'detailed_signals': detailed_signals
         }
+    
+    def _gemini_enrichment(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Gemini insights and moderation note for an analysis result."""
+        enriched = dict(result)
+        enriched['gemini_insights'] = self.gemini.generate_post_insights(enriched)
+        enriched['moderation_note'] = self.gemini.generate_moderation_note(enriched)
+        return {
+            'gemini_insights': enriched['gemini_insights'],
+            'moderation_note': enriched['moderation_note']
+        }
+    
+    def get_enrichment(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Pick up a deferred Gemini enrichment.
         
-        # Add Gemini insights if requested and available
-        if use_gemini and self.gemini.is_available:
-            result['gemini_insights'] = self.gemini.generate_post_insights(result)
-            result['moderation_note'] = self.gemini.generate_moderation_note(result)
-        
-        return result
+        Returns:
+            Job dict with status 'pending', 'done' (with result) or 'failed'
+            (with error); None if the job is unknown or expired
+        """
+        if self.enrichment_queue is None:
+            return None
+        return self.enrichment_queue.get(job_id)
     
-    def analyze_multiple_posts(self, df: pd.DataFrame, use_gemini: bool = True) -> List[Dict[str, Any]]:
+    def analyze_multiple_posts(self, df: pd.DataFrame, use_gemini: bool = True,
+                               workers: int = 1, chunk_size: int = 32) -> List[Dict[str, Any]]:
         """
         Analyze multiple posts and optionally compare them with Gemini.
         
         Args:
             df: DataFrame with multiple posts
             use_gemini: Whether to use Gemini for comparison
+            workers: Number of worker processes (1 analyzes in this process)
+            chunk_size: Number of posts sent to a worker per task
             
         Returns:
             List of analysis results with optional comparison
         """
-        results = []
-        
-        # Analyze each post
-        for post_id in df['post_id'].unique():
-            post_df = df[df['post_id'] == post_id]
-            result = self.analyze_post(post_id, post_df, use_gemini=False)  # Don't use Gemini per-post yet
-            results.append(result)
+        # Analyze each post (don't use Gemini per-post yet)
+        results = list(self.iter_analyze_posts(df, use_gemini=False, workers=workers, chunk_size=chunk_size))
         
         # Add Gemini comparison if requested
         if use_gemini and self.gemini.is_available and len(results) > 1:
             comparison = self.gemini.compare_posts(results)
             for result in results:
-                result['comparison_insights'] = comparison
+                result['comparison_insights'] = {
+                    'summary': comparison['summary'],
+                    'note': comparison['posts'].get(result['post_id'], '')
+                }
         
         return results
     
-    def _insufficient_data_response(self, post_id: str, df: pd.DataFrame) -> Dict[str, Any]:
+    def iter_analyze_posts(self, df: Union[pd.DataFrame, Iterable[Tuple[str, pd.DataFrame]]],
+                           use_gemini: bool = False, workers: int = 1,
+                           chunk_size: int = 32) -> Iterator[Dict[str, Any]]:
+        """
+        Yield analyze_post results for every post, in first-seen post order.
+        
+        With workers > 1, posts are sharded across a process pool. Each worker
+        builds one labeler and reuses it, and only receives the slices of the
+        posts in its chunk. At most two chunks per worker are in flight, so
+        pending results stay bounded however many posts the frame holds.
+        
+        Gemini enrichment is done here, one chunk at a time, with batched
+        prompts, so a chunk of posts costs a couple of requests rather than
+        two per post.
+        
+        Args:
+            df: DataFrame with multiple posts, or an iterable of (post_id, post_df)
+                pairs such as InteractionDataLoader.iter_post_groups()
+            use_gemini: Whether to add Gemini insights to each post
+            workers: Number of worker processes (1 analyzes in this process)
+            chunk_size: Number of posts sent to a worker per task
+        
+        Yields:
+            One analysis result per post
+        """
+        posts = df.groupby('post_id', sort=False, observed=True) if isinstance(df, pd.DataFrame) else df
+        enrich = use_gemini and self.gemini.is_available
+        
+        if workers <= 1:
+            if not enrich:
+                for post_id, post_df in posts:
+                    yield self.analyze_post(post_id, post_df, use_gemini=False)
+                return
+            chunk = []
+            for post_id, post_df in posts:
+                chunk.append(self.analyze_post(post_id, post_df, use_gemini=False))
+                if len(chunk) >= chunk_size:
+                    yield from self.enrich_posts(chunk)
+                    chunk = []
+            yield from self.enrich_posts(chunk)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.graph_analyzer.backend,)) as pool:
+            pending = deque()
+            chunk = []
+            for post_id, post_df in posts:
+                chunk.append((post_id, _detach_categories(post_df)))
+                if len(chunk) >= chunk_size:
+                    pending.append(pool.submit(_analyze_chunk, chunk))
+                    chunk = []
+                    if len(pending) >= workers * 2:
+                        results = pending.popleft().result()
+                        yield from self.enrich_posts(results) if enrich else results
+            if chunk:
+                pending.append(pool.submit(_analyze_chunk, chunk))
+            while pending:
+                results = pending.popleft().result()
+                yield from self.enrich_posts(results) if enrich else results
+    
+    def enrich_posts(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add Gemini insights and moderation notes to several results at once.
+        
+        Args:
+            results: Analysis results from analyze_post(use_gemini=False)
+        
+        Returns:
+            The same results, updated in place
+        """
+        # Posts below the data threshold are not sent to Gemini, as in analyze_post
+        analyzed = [r for r in results if 'detailed_signals' in r]
+        if analyzed and self.gemini.is_available:
+            insights = self.gemini.generate_insights_batch(analyzed)
+            for result, post_insights in zip(analyzed, insights):
+                result['gemini_insights'] = post_insights
+            notes = self.gemini.generate_moderation_notes(analyzed)
+            for result, note in zip(analyzed, notes):
+                result['moderation_note'] = note
+        return results
+    
+    def analyze_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Analyze every post in a DataFrame in one vectorized pass.
+        
+        Behavioral features are computed for all posts at once with segment
+        reductions; only the graph signal is built per post, from a single
+        groupby pass. Gemini enrichment is not applied.
+        
+        Args:
+            df: DataFrame with interactions for any number of posts
+        
+        Returns:
+            DataFrame with one row per post (first-seen order) holding the fields
+            of analyze_post plus one column per signal value
+        """
+        features = self.feature_extractor.extract_frame_features(df)
+        sufficient = features['total_interactions'].to_numpy() >= 3
+        
+        graph_value = np.full(len(features), np.nan)
+        graph_abnormal = np.zeros(len(features), dtype=bool)
+        positions = pd.Series(np.arange(len(features)), index=features.index)
+        for post_id, post_df in df.groupby('post_id', sort=False, observed=True):
+            pos = positions[post_id]
+            if sufficient[pos]:
+                metrics = self.graph_analyzer.analyze_post_patterns(post_id, post_df)['graph_metrics']
+                graph_value[pos] = metrics.get('value', 0)
+                graph_abnormal[pos] = metrics.get('is_abnormal', False)
+        features['graph_clustering'] = graph_value
+        features['graph_clustering_abnormal'] = graph_abnormal
+        
+        signal_names = list(self.signal_descriptions)
+        flags = features[[f'{name}_abnormal' for name in signal_names]].to_numpy() & sufficient[:, None]
+        abnormal_count = flags.sum(axis=1)
+        
+        scores = np.array([calculate_confidence_score(count) for count in range(len(signal_names) + 1)])
+        confidence = scores[abnormal_count]
+        labels = {score: format_instagram_ui_label(score) for score in scores}
+        details = {score: get_instagram_tap_detail(score) for score in scores}
+        descriptions = [self.signal_descriptions[name] for name in signal_names]
+        
+        result = pd.DataFrame({
+            'post_id': features.index,
+            'total_interactions': features['total_interactions'].to_numpy(),
+            'unique_users': features['unique_users'].to_numpy(),
+            'abnormal_signal_count': abnormal_count,
+            'confidence': confidence,
+            'label': [labels[c] for c in confidence],
+            'tap_detail': np.where(sufficient, [details[c] for c in confidence], ''),
+            'triggered_signals': [[d for d, hit in zip(descriptions, row) if hit] for row in flags],
+        })
+        for name in signal_names:
+            result[name] = np.where(sufficient, features[name].to_numpy(), np.nan)
+        result['message'] = np.where(sufficient, None, 'Insufficient data (need at least 3 interactions)')
+        
+        return result
+    
+    def _insufficient_data_response(self, post_id: str, total_interactions: int, unique_users: int) -> Dict[str, Any]:
         """Return response for insufficient data."""
         return {
             'post_id': post_id,
-            'total_interactions': len(df),
-            'unique_users': df['user_id'].nunique() if len(df) > 0 else 0,
+            'total_interactions': total_interactions,
+            'unique_users': unique_users,
             'abnormal_signal_count': 0,
             'confidence': 0,
             'label': '',
@@ -198,4 +387,238 @@ class InstagramAIConfidenceLabeler:
     def get_label_only(self, post_id: str, interactions_df: pd.DataFrame) -> str:
         """Quick method - just return UI label."""
         result = self.analyze_post(post_id, interactions_df, use_gemini=False)
-        return result['label']
\ No newline at end of file
+        return result['label']
+
+
+def _count_while(values: List[int], predicate) -> int:
+    """Length of the leading run of a sorted list for which a monotone predicate holds."""
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(values[mid]):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class StreamingPostState:
+    """
+    Running aggregates for one post, updated one interaction at a time.
+    
+    analyze_post recomputes every feature from the whole history, which is
+    O(n) per call (more for sync and graph) if a post is re-scored on each
+    new event. This keeps the aggregates instead:
+    
+    - first/last arrival times, for spread speed (the mean gap telescopes)
+      and the early-burst cutoff
+    - a sorted timeline, so early burst and the 10-bin timing histogram are
+      counted with binary searches
+    - the set of synchronized users; an insert only shrinks its neighbours'
+      gaps, so a user once synchronized stays so
+    - exact user and action counts (in first-seen order)
+    - the co-interaction edge weights, extended by the events within the
+      graph window of each new event
+    
+    add() costs O(log n) to find the new event's place plus the events within
+    10 s of it, and then the timeline insert: an append for in-order events,
+    but an O(n) list shift for one that arrives out of order (a memmove, which
+    stays cheap next to the rest until posts reach millions of events).
+    result() returns the same dictionary as analyze_post(..., use_gemini=False)
+    on the events seen so far, in arrival order, up to float rounding in
+    spread speed. Only the graph metrics are recomputed per call, from the
+    maintained edges rather than from the events, and results are cached
+    until the next add().
+    """
+    
+    # Same window InteractionGraphAnalyzer.analyze_post_patterns links users with
+    GRAPH_WINDOW_SECONDS = 10
+    
+    def __init__(self, post_id: str, labeler: Optional[InstagramAIConfidenceLabeler] = None):
+        """
+        Initialize an empty post.
+        
+        Args:
+            post_id: Post the events belong to
+            labeler: Labeler whose thresholds and graph backend are used (a
+                Gemini-less one is created if omitted; share one across posts)
+        """
+        self.post_id = post_id
+        self.labeler = labeler or InstagramAIConfidenceLabeler(enable_gemini=False)
+        self.total_interactions = 0
+        self._sync_window = int(self.labeler.thresholds.SYNC_WINDOW_SECONDS * 1_000_000_000)
+        self._graph_window = int(self.GRAPH_WINDOW_SECONDS * 1_000_000_000)
+        self._first = None
+        self._last = None
+        self._times: List[int] = []
+        self._time_users: List[int] = []
+        self._users: Dict[Any, int] = {}
+        self._synced_users = set()
+        self._actions: Dict[Any, int] = {}
+        self._edges: Dict[Tuple[int, int], int] = {}
+        self._result = None
+    
+    def add(self, user_id: Any, timestamp: Any, action_type: Any) -> None:
+        """
+        Apply one interaction.
+        
+        Args:
+            user_id: Interacting user
+            timestamp: Datetime (or string), or int64 epoch nanoseconds
+            action_type: like, comment, share, ...
+        """
+        epoch = epoch_ns(timestamp)
+        user = self._users.setdefault(user_id, len(self._users))
+        if self._first is None:
+            self._first = epoch
+        self._last = epoch
+        self.total_interactions += 1
+        self._actions[action_type] = self._actions.get(action_type, 0) + 1
+        
+        times, time_users = self._times, self._time_users
+        
+        # Link the user to everyone else acting within the graph window
+        lo = bisect.bisect_left(times, epoch - self._graph_window)
+        hi = bisect.bisect_right(times, epoch + self._graph_window)
+        for other in time_users[lo:hi]:
+            if other != user:
+                edge = (other, user) if other < user else (user, other)
+                self._edges[edge] = self._edges.get(edge, 0) + 1
+        
+        # Only the gaps to the new event's neighbours change
+        pos = bisect.bisect_right(times, epoch, lo, hi)
+        if pos > 0 and epoch - times[pos - 1] <= self._sync_window:
+            self._synced_users.update((time_users[pos - 1], user))
+        if pos < len(times) and times[pos] - epoch <= self._sync_window:
+            self._synced_users.update((time_users[pos], user))
+        times.insert(pos, epoch)
+        time_users.insert(pos, user)
+        
+        self._result = None
+    
+    def add_events(self, interactions_df: pd.DataFrame) -> None:
+        """Apply a DataFrame of interactions (user_id, timestamp, action_type) in row order."""
+        epochs = to_epoch_ns(interactions_df['timestamp'])
+        for user_id, epoch, action_type in zip(interactions_df['user_id'], epochs.tolist(),
+                                               interactions_df['action_type']):
+            self.add(user_id, epoch, action_type)
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pickled without the labeler (and its Gemini client); reattach one after loading
+        state = dict(self.__dict__)
+        state['labeler'] = None
+        state['_result'] = None
+        return state
+    
+    @property
+    def unique_users(self) -> int:
+        return len(self._users)
+    
+    def behavioral_features(self) -> Dict[str, Dict]:
+        """Same dictionary as BehavioralFeatureExtractor.extract_all_features."""
+        thresholds = self.labeler.thresholds
+        n = self.total_interactions
+        first = self._first
+        
+        if n < 2:
+            spread_speed = {'value': 999, 'is_abnormal': False}
+            early_burst = {'value': 0, 'is_abnormal': False}
+            synchronization = {'value': 0, 'is_abnormal': False}
+        else:
+            # The mean consecutive gap telescopes to (last - first) / (n - 1)
+            lifetime = (self._last - first) / 1e9
+            avg_gap = lifetime / (n - 1)
+            spread_speed = {'value': avg_gap, 'is_abnormal': avg_gap < thresholds.SPREAD_SPEED_THRESHOLD_SECONDS}
+            
+            if lifetime == 0:
+                early_burst = {'value': 1.0, 'is_abnormal': True}
+            else:
+                cutoff = lifetime * 0.1
+                ratio = _count_while(self._times, lambda e: (e - first) / 1e9 <= cutoff) / n
+                early_burst = {'value': ratio, 'is_abnormal': ratio > thresholds.EARLY_BURST_THRESHOLD_PERCENT}
+            
+            sync = len(self._synced_users) / self.unique_users
+            synchronization = {'value': sync, 'is_abnormal': sync > thresholds.SYNC_THRESHOLD_PERCENT}
+        
+        diversity = self.unique_users / n if n > 0 else 1
+        
+        entropy = self.labeler.feature_extractor.entropy
+        timing = self._timing_entropy() if n >= 2 else 0.0
+        action = entropy.count_entropy(np.array(list(self._actions.values()))) if n > 0 else 0.0
+        combined = (timing * 0.6 + action * 0.4) if (timing > 0 or action > 0) else 0
+        
+        return {
+            'spread_speed': spread_speed,
+            'early_burst': early_burst,
+            'synchronization': synchronization,
+            'user_diversity': {'value': diversity, 'is_abnormal': diversity < thresholds.USER_DIVERSITY_THRESHOLD},
+            'behavioral_entropy': {'value': combined, 'is_abnormal': combined < thresholds.ENTROPY_THRESHOLD}
+        }
+    
+    def _timing_entropy(self, bins: int = 10) -> float:
+        """
+        calculate_timing_entropy from the sorted timeline.
+        
+        Uses np.histogram's edges; each bin's count is the difference of two
+        binary searches for its edges (the last bin is closed).
+        """
+        first = self._first
+        lo = (self._times[0] - first) / 1e9
+        hi = (self._times[-1] - first) / 1e9
+        if lo == hi:
+            return 0.0
+        
+        edges = np.linspace(lo, hi, bins + 1)
+        below = [0] + [_count_while(self._times, lambda e, edge=edge: (e - first) / 1e9 < edge)
+                       for edge in edges[1:-1].tolist()] + [self.total_interactions]
+        hist = np.diff(below)
+        return self.labeler.feature_extractor.entropy.histogram_entropy(hist)
+    
+    def graph_analysis(self) -> Dict[str, Any]:
+        """Same dictionary as InteractionGraphAnalyzer.analyze_post_patterns, from the maintained edges."""
+        from scipy import sparse
+        
+        num_users = self.unique_users
+        if self._edges:
+            rows, cols = zip(*self._edges)
+            data = list(self._edges.values())
+        else:
+            rows, cols, data = (), (), ()
+        weights = sparse.coo_matrix(
+            (np.array(data, dtype=np.int64), (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp))),
+            shape=(num_users, num_users)
+        ).tocsr()
+        return self.labeler.graph_analyzer.analyze_interaction_matrix(self.post_id, list(self._users), weights)
+    
+    def result(self) -> Dict[str, Any]:
+        """analyze_post's result (without Gemini fields) for the events applied so far."""
+        if self._result is None:
+            if self.total_interactions < 3:
+                self._result = self.labeler._insufficient_data_response(
+                    self.post_id, self.total_interactions, self.unique_users)
+            else:
+                self._result = self.labeler._score_signals(
+                    self.post_id, self.total_interactions, self.unique_users,
+                    self.behavioral_features(), self.graph_analysis())
+        return copy.deepcopy(self._result)
+
+
+# Per-process labeler used by iter_analyze_posts workers
+_worker_labeler: Optional[InstagramAIConfidenceLabeler] = None
+
+
+def _init_worker(graph_backend: str) -> None:
+    """Build the labeler a worker process reuses for all of its chunks (Gemini stays in the parent)."""
+    global _worker_labeler
+    _worker_labeler = InstagramAIConfidenceLabeler(graph_backend=graph_backend, enable_gemini=False)
+
+
+def _detach_categories(post_df: pd.DataFrame) -> pd.DataFrame:
+    """Decode categorical columns so a post slice pickles without the shared category tables."""
+    categorical = [col for col in post_df.columns if isinstance(post_df[col].dtype, pd.CategoricalDtype)]
+    return post_df.astype({col: object for col in categorical}) if categorical else post_df
+
+
+def _analyze_chunk(posts: List) -> List[Dict[str, Any]]:
+    """Analyze a chunk of (post_id, post_df) pairs in a worker process (Gemini runs in the parent)."""
+    return [_worker_labeler.analyze_post(post_id, post_df, use_gemini=False) for post_id, post_df in posts]
@@ -0,0 +1,130 @@
+"""Background Gemini enrichment with results picked up by job ID."""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class EnrichmentQueueFullError(Exception):
+    """Raised by GeminiEnrichmentQueue.submit when too many jobs are already waiting."""
+
+
+class GeminiEnrichmentQueue:
+    """
+    Runs Gemini enrichment off the request path.
+    
+    Jobs execute on a small thread pool (Gemini calls are network-bound) and
+    their results are kept for ``result_ttl_seconds`` so a client can fetch
+    them with a follow-up request. Expired jobs are pruned on each submit. At
+    most ``max_pending`` jobs may be queued or running; past that, submit()
+    raises EnrichmentQueueFullError so a burst of requests cannot pile up
+    unlimited Gemini work.
+    """
+    
+    def __init__(self, max_workers: int = 4, result_ttl_seconds: float = 600.0,
+                 max_pending: int = 64):
+        """
+        Initialize the queue.
+        
+        Args:
+            max_workers: Number of background threads running enrichment
+            result_ttl_seconds: How long finished results stay available
+            max_pending: Most jobs queued or running at once
+        """
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gemini-enrichment')
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args: Any) -> str:
+        """
+        Schedule an enrichment call.
+        
+        Args:
+            fn: Callable returning the enrichment payload
+            *args: Arguments for fn
+        
+        Returns:
+            Job ID to pass to get()
+        
+        Raises:
+            EnrichmentQueueFullError: If max_pending jobs are already queued or running
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            if self.pending_count() >= self.max_pending:
+                raise EnrichmentQueueFullError(f'{self.max_pending} enrichment jobs already pending')
+            self._jobs[job_id] = {'submitted_at': time.time(), 'finished_at': None, 'future': None}
+        
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._jobs[job_id]['future'] = future
+        future.add_done_callback(lambda f: self._mark_finished(job_id))
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+        
+        Returns:
+            Dict with job_id, status ('pending', 'done' or 'failed') and either
+            result or error; None if the job is unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        
+        future: Optional[Future] = job['future']
+        if future is None or not future.done():
+            return {'job_id': job_id, 'status': 'pending'}
+        
+        error = future.exception()
+        if error is not None:
+            return {'job_id': job_id, 'status': 'failed', 'error': str(error)}
+        return {'job_id': job_id, 'status': 'done', 'result': future.result()}
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes (or timeout) and return get(job_id)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job['future'] is not None:
+            try:
+                job['future'].result(timeout=timeout)
+            except Exception:
+                pass
+        return self.get(job_id)
+    
+    def pending_count(self) -> int:
+        """Jobs queued or running."""
+        return sum(1 for job in list(self._jobs.values()) if job['finished_at'] is None)
+    
+    def status(self) -> Dict[str, Any]:
+        """Queue depth for health reporting."""
+        with self._lock:
+            return {
+                'pending': self.pending_count(),
+                'max_pending': self.max_pending,
+                'tracked_jobs': len(self._jobs)
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and release the worker threads."""
+        self._executor.shutdown(wait=wait)
+    
+    def _mark_finished(self, job_id: str) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]['finished_at'] = time.time()
+    
+    def _prune(self) -> None:
+        """Drop finished jobs older than the TTL (caller holds the lock)."""
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
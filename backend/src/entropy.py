@@ -1,9 +1,10 @@
 """Entropy and randomness calculations for behavioral analysis."""
 
 import numpy as np
-from scipy.stats import entropy
+import pandas as pd
 from typing import List, Tuple
-from collections import Counter
+
+from .utils import to_epoch_ns
 
 
 class BehavioralEntropyAnalyzer:
@@ -15,12 +16,12 @@ class BehavioralEntropyAnalyzer:
     """
     
     @staticmethod
-    def calculate_timing_entropy(timestamps: List, bins: int = 10) -> float:
+    def calculate_timing_entropy(timestamps, bins: int = 10) -> float:
         """
         Calculate Shannon entropy of interaction timing distribution.
         
         Args:
-            timestamps: List of datetime objects
+            timestamps: Datetimes, or int64 epoch nanoseconds
             bins: Number of bins for histogram
         
         Returns:
@@ -30,14 +31,25 @@ class BehavioralEntropyAnalyzer:
             return 0.0
         
         # Convert to seconds since first interaction
-        time_deltas = [(ts - timestamps[0]).total_seconds() for ts in timestamps]
+        epochs = to_epoch_ns(timestamps)
+        time_deltas = (epochs - epochs[0]) / 1e9
         
-        if len(set(time_deltas)) == 1:
+        if np.all(time_deltas == time_deltas[0]):
             return 0.0  # All identical timestamps -> zero entropy
         
         # Create histogram of interaction times
         hist, _ = np.histogram(time_deltas, bins=bins)
         
+        return BehavioralEntropyAnalyzer.histogram_entropy(hist)
+    
+    @staticmethod
+    def histogram_entropy(hist: np.ndarray) -> float:
+        """
+        Shannon entropy (bits) of a timing histogram, as calculate_timing_entropy computes it.
+        
+        Args:
+            hist: Interaction counts per time bin
+        """
         # Normalize to probability distribution
         prob_dist = hist / np.sum(hist)
         
@@ -45,35 +57,55 @@ class BehavioralEntropyAnalyzer:
         prob_dist = prob_dist[prob_dist > 0]
         
         # Calculate Shannon entropy (bits)
-        shannon_entropy = entropy(prob_dist, base=2)
-        
-        return shannon_entropy
+        return BehavioralEntropyAnalyzer._shannon_bits(prob_dist)
     
     @staticmethod
-    def calculate_action_entropy(action_sequence: List[str]) -> float:
+    def calculate_action_entropy(action_sequence) -> float:
         """
         Calculate entropy of action type distribution.
         
         Args:
-            action_sequence: List of action types [share, repost, like, comment]
+            action_sequence: Action types [share, repost, like, comment], as a
+                list, array or (categorical) Series
         
         Returns:
             Entropy value in bits
         """
-        if not action_sequence:
+        if len(action_sequence) == 0:
             return 0.0
         
         # Count frequency of each action type
-        action_counts = Counter(action_sequence)
-        total_actions = len(action_sequence)
+        action_codes, _ = pd.factorize(pd.Series(action_sequence), use_na_sentinel=False)
+        return BehavioralEntropyAnalyzer.count_entropy(np.bincount(action_codes))
+    
+    @staticmethod
+    def count_entropy(action_counts: np.ndarray) -> float:
+        """
+        Entropy (bits) of action counts, as calculate_action_entropy computes it.
+        
+        Args:
+            action_counts: Count of each action type, in first-seen order
+        """
+        total_actions = np.sum(action_counts)
         
         # Calculate probability distribution
-        prob_dist = [count / total_actions for count in action_counts.values()]
+        prob_dist = action_counts / total_actions
         
         # Calculate Shannon entropy
-        shannon_entropy = entropy(prob_dist, base=2)
+        return BehavioralEntropyAnalyzer._shannon_bits(prob_dist)
+    
+    @staticmethod
+    def _shannon_bits(prob_dist: np.ndarray) -> float:
+        """
+        scipy.stats.entropy(prob_dist, base=2), computed the same way.
         
-        return shannon_entropy
+        Its argument-handling wrapper costs ~0.3 ms a call, far more than the
+        sum itself, which adds up when posts are re-scored per event batch.
+        scipy.special is slow to import, so it is loaded on first use.
+        """
+        from scipy.special import entr
+        prob_dist = 1.0 * prob_dist / np.sum(prob_dist)
+        return np.sum(entr(prob_dist)) / np.log(2)
     
     @staticmethod
     def calculate_sequence_randomness(intervals: List[float]) -> float:
@@ -100,25 +132,103 @@ class BehavioralEntropyAnalyzer:
         
         return cv
     
-    def analyze_post_behavior(self, timestamps: List, actions: List[str]) -> Tuple[float, float, float]:
+    @staticmethod
+    def entropy_by_row(counts: np.ndarray) -> np.ndarray:
+        """
+        Shannon entropy (bits) of each row of a count matrix.
+        
+        Args:
+            counts: 2-D array, one row of category counts per group
+        
+        Returns:
+            1-D array of entropies; rows with no counts get 0
+        """
+        counts = np.asarray(counts, dtype=np.float64)
+        totals = counts.sum(axis=1, keepdims=True)
+        prob = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        terms = np.zeros_like(prob)
+        np.log2(prob, out=terms, where=prob > 0)
+        return -(prob * terms).sum(axis=1)
+    
+    @staticmethod
+    def timing_entropy_by_group(group_codes: np.ndarray, time_deltas: np.ndarray,
+                                num_groups: int, bins: int = 10) -> np.ndarray:
+        """
+        Vectorized calculate_timing_entropy for many groups at once.
+        
+        Args:
+            group_codes: Integer group id (0..num_groups-1) of each interaction
+            time_deltas: Seconds since the group's first interaction
+            num_groups: Number of groups
+            bins: Number of histogram bins per group
+        
+        Returns:
+            Timing entropy per group (0 for groups with < 2 interactions or a
+            single distinct time)
+        """
+        sizes = np.bincount(group_codes, minlength=num_groups)
+        lo = np.full(num_groups, np.inf)
+        hi = np.full(num_groups, -np.inf)
+        np.minimum.at(lo, group_codes, time_deltas)
+        np.maximum.at(hi, group_codes, time_deltas)
+        valid = (sizes >= 2) & (hi > lo)
+        
+        # Same binning as np.histogram: equal-width edges between min and max,
+        # last bin closed, with the edge corrections it applies for rounding
+        span = np.where(valid, hi - lo, 1.0)
+        edges = lo[:, None] + np.arange(bins + 1)[None, :] * (span / bins)[:, None]
+        edges[:, -1] = np.where(valid, hi, edges[:, -1])
+        
+        rows = group_codes
+        idx = ((time_deltas - lo[rows]) * (bins / span[rows])).astype(np.intp)
+        idx = np.clip(idx, 0, bins - 1)
+        idx[time_deltas < edges[rows, idx]] -= 1
+        idx = np.clip(idx, 0, bins - 1)
+        bump = (time_deltas >= edges[rows, idx + 1]) & (idx != bins - 1)
+        idx[bump] += 1
+        
+        keep = valid[rows]
+        counts = np.bincount(rows[keep] * bins + idx[keep], minlength=num_groups * bins)
+        result = BehavioralEntropyAnalyzer.entropy_by_row(counts.reshape(num_groups, bins))
+        result[~valid] = 0.0
+        return result
+    
+    @staticmethod
+    def action_entropy_by_group(group_codes: np.ndarray, action_codes: np.ndarray,
+                                num_groups: int, num_actions: int) -> np.ndarray:
+        """
+        Vectorized calculate_action_entropy for many groups at once.
+        
+        Args:
+            group_codes: Integer group id (0..num_groups-1) of each interaction
+            action_codes: Integer action id (0..num_actions-1) of each interaction
+            num_groups: Number of groups
+            num_actions: Number of distinct actions
+        
+        Returns:
+            Action entropy per group
+        """
+        counts = np.bincount(group_codes * num_actions + action_codes,
+                             minlength=num_groups * num_actions)
+        return BehavioralEntropyAnalyzer.entropy_by_row(counts.reshape(num_groups, num_actions))
+    
+    def analyze_post_behavior(self, timestamps, actions) -> Tuple[float, float, float]:
         """
         Comprehensive behavioral randomness analysis for a post.
         
         Args:
-            timestamps: List of interaction timestamps
-            actions: List of action types
+            timestamps: Interaction timestamps, or int64 epoch nanoseconds
+            actions: Action types
         
         Returns:
             Tuple of (timing_entropy, action_entropy, interval_regularity)
         """
-        timing_entropy = self.calculate_timing_entropy(timestamps)
+        epochs = to_epoch_ns(timestamps)
+        timing_entropy = self.calculate_timing_entropy(epochs)
         action_entropy = self.calculate_action_entropy(actions)
         
         # Calculate intervals between consecutive timestamps
-        intervals = []
-        for i in range(1, len(timestamps)):
-            interval = (timestamps[i] - timestamps[i-1]).total_seconds()
-            intervals.append(interval)
+        intervals = np.diff(epochs) / 1e9
         
         interval_regularity = self.calculate_sequence_randomness(intervals)
         
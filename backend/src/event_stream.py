@@ -0,0 +1,682 @@
+"""
+Event-stream consumer that labels posts as their interactions arrive.
+
+Interaction events are read from a pluggable source, grouped by post and
+applied to StreamingPostState, and a record is emitted whenever a post's
+confidence changes. Sources are chosen by URL:
+
+- file:PATH follows a JSON Lines file as it grows (the local stand-in)
+- redis://HOST:PORT/DB?stream=interactions&group=ai-labeler reads a Redis
+  stream through a consumer group (any Redis-compatible server; needs the
+  optional ``redis`` package)
+
+Run with:
+    python -m src.event_stream replay data/sample_interactions.csv --to file:/tmp/events.jsonl
+    python -m src.event_stream consume --source file:/tmp/events.jsonl --checkpoint /tmp/consumer.ckpt
+"""
+
+import argparse
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .detector import InstagramAIConfidenceLabeler, StreamingPostState
+from .loader import InteractionDataLoader
+from .utils import epoch_ns
+
+
+class FileTailSource:
+    """
+    Follows a JSON Lines file of events as it grows, like ``tail -f``.
+    
+    A position is (generation, inode, offset), where offset is the byte
+    offset just past an event's line. A line without its trailing newline
+    is left for the next read, since the writer may still be appending it.
+    If the file shrinks (truncated) or the path is replaced by a new file
+    (rotated, once the old one is drained), reading restarts from the
+    beginning under the next generation, so positions keep increasing and
+    a checkpoint taken before the rotation does not hide the new events.
+    The same check runs on resume, against the inode and offset in the
+    checkpointed position.
+    """
+    
+    def __init__(self, path: str, poll_interval: float = 0.2):
+        """
+        Args:
+            path: File to follow; it need not exist yet
+            poll_interval: Seconds between checks for new data while idle
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self._generation = 0
+        self._inode = None
+        self._position = 0
+        self._file = None
+    
+    def start_after(self, position: Optional[Tuple[int, int, int]]) -> None:
+        """Resume after a checkpointed position (None starts from the beginning)."""
+        self._generation, self._inode, self._position = position or (0, None, 0)
+    
+    def read(self, max_events: int, timeout: float) -> List[Tuple[Tuple[int, int, int], Dict[str, Any]]]:
+        """
+        Read up to ``max_events`` events, waiting up to ``timeout`` seconds for the first.
+        
+        Returns:
+            List of (position, event) pairs; lines that are not JSON objects
+            are returned as None events so they are counted and skipped
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self._read_available(max_events)
+            if events or time.monotonic() >= deadline:
+                return events
+            time.sleep(self.poll_interval)
+    
+    def _restart(self, reason: str) -> None:
+        print(f"⚠️ {self.path} {reason}; reading it again from the start", file=sys.stderr)
+        self._generation += 1
+        self._position = 0
+    
+    def _open(self) -> bool:
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(self._file.fileno())
+        if self._inode is not None and stat.st_ino != self._inode:
+            self._restart('was replaced')
+        self._inode = stat.st_ino
+        return True
+    
+    def _replaced(self) -> bool:
+        """True if the path now names a different file than the one open."""
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            # Moved away and not recreated yet: keep draining the old file
+            return False
+    
+    def _read_available(self, max_events: int) -> List[Tuple[Tuple[int, int, int], Dict[str, Any]]]:
+        if self._file is None and not self._open():
+            return []
+        
+        if os.fstat(self._file.fileno()).st_size < self._position:
+            self._restart('shrank')
+        
+        events = self._read_lines(max_events)
+        if not events and self._replaced():
+            # The old file is drained; switch to the new one
+            self._file.close()
+            self._file = None
+            if self._open():
+                events = self._read_lines(max_events)
+        return events
+    
+    def _read_lines(self, max_events: int) -> List[Tuple[Tuple[int, int, int], Dict[str, Any]]]:
+        self._file.seek(self._position)
+        events = []
+        while len(events) < max_events:
+            line = self._file.readline()
+            if not line.endswith(b'\n'):
+                break
+            self._position += len(line)
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            events.append(((self._generation, self._inode, self._position),
+                           event if isinstance(event, dict) else None))
+        return events
+    
+    def commit(self, position: Tuple[int, int, int]) -> None:
+        """Nothing to acknowledge; the consumer's checkpoint holds the position."""
+    
+    def backlog(self) -> Dict[str, Any]:
+        """Bytes written but not yet read (of the file now at the path)."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {'bytes': 0}
+        if stat.st_ino != self._inode:
+            return {'bytes': stat.st_size}
+        return {'bytes': max(0, stat.st_size - self._position)}
+    
+    def append(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Write events to the file (the producer side); returns how many were written."""
+        count = 0
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+                count += 1
+        return count
+    
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RedisStreamSource:
+    """
+    Reads a Redis stream through a consumer group.
+    
+    Entries hold the event either as fields (post_id, user_id, timestamp,
+    action_type) or as JSON in an ``event`` field. A position is the entry
+    ID as a (milliseconds, sequence) tuple. Entries are acknowledged (XACK)
+    only on commit, so after a crash the group redelivers everything
+    since the last checkpoint: this consumer's pending entries are read
+    first, then new ones.
+    """
+    
+    def __init__(self, url: str = 'redis://localhost:6379/0', stream: str = 'interactions',
+                 group: str = 'ai-labeler', consumer: Optional[str] = None, client=None):
+        """
+        Args:
+            url: Server URL
+            stream: Stream key
+            group: Consumer group, created (with the stream) if missing
+            consumer: Consumer name within the group (default: host name)
+            client: Existing redis-py client to use instead of connecting to ``url``
+        """
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("The redis source needs the redis package: pip install redis")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or socket.gethostname()
+        self._client = client
+        self._replaying = True
+        self._replay_from = '0'
+        self._unacked: List[str] = []
+        
+        try:
+            self._client.xgroup_create(stream, group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+    
+    @staticmethod
+    def _position(entry_id: str) -> Tuple[int, int]:
+        milliseconds, sequence = entry_id.split('-')
+        return int(milliseconds), int(sequence)
+    
+    def start_after(self, position: Optional[Tuple[int, int]]) -> None:
+        """Redelivery comes from the group; the consumer skips entries at or before ``position``."""
+        self._replaying = True
+        self._replay_from = '0'
+    
+    def read(self, max_events: int, timeout: float) -> List[Tuple[Tuple[int, int], Optional[Dict[str, Any]]]]:
+        """Read up to ``max_events`` entries, blocking up to ``timeout`` seconds for new ones."""
+        if self._replaying:
+            # Entries delivered to this consumer before a restart but never acknowledged
+            reply = self._client.xreadgroup(self.group, self.consumer, {self.stream: self._replay_from},
+                                            count=max_events)
+            entries = reply[0][1] if reply else []
+            if entries:
+                self._replay_from = entries[-1][0]
+            else:
+                self._replaying = False
+        if not self._replaying:
+            reply = self._client.xreadgroup(self.group, self.consumer, {self.stream: '>'}, count=max_events,
+                                            block=max(1, int(timeout * 1000)))
+            entries = reply[0][1] if reply else []
+        
+        events = []
+        for entry_id, fields in entries:
+            self._unacked.append(entry_id)
+            if fields and 'event' in fields:
+                try:
+                    fields = json.loads(fields['event'])
+                except ValueError:
+                    fields = None
+            events.append((self._position(entry_id), fields if isinstance(fields, dict) else None))
+        
+        if self._replaying and len(entries) < max_events:
+            self._replaying = False
+        return events
+    
+    def commit(self, position: Tuple[int, int]) -> None:
+        """Acknowledge every entry read up to ``position``."""
+        done, kept = [], []
+        for entry_id in self._unacked:
+            (done if self._position(entry_id) <= position else kept).append(entry_id)
+        if done:
+            self._client.xack(self.stream, self.group, *done)
+            self._unacked = kept
+    
+    def backlog(self) -> Dict[str, Any]:
+        """Entries not yet delivered to the group (Redis 7+) and delivered but unacknowledged."""
+        backlog = {'pending': None, 'undelivered': None}
+        try:
+            for info in self._client.xinfo_groups(self.stream):
+                if info.get('name') == self.group:
+                    backlog['pending'] = info.get('pending')
+                    backlog['undelivered'] = info.get('lag')
+        except Exception:
+            pass
+        return backlog
+    
+    def append(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Add events to the stream (the producer side); returns how many were added."""
+        count = 0
+        pipeline = self._client.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(self.stream, {'event': json.dumps(event)})
+            count += 1
+            if count % 1000 == 0:
+                pipeline.execute()
+        pipeline.execute()
+        return count
+    
+    def close(self) -> None:
+        self._client.close()
+
+
+EVENT_SOURCES = {
+    'file': FileTailSource,
+    'redis': RedisStreamSource
+}
+
+
+def open_event_source(url: str):
+    """
+    Build a source from a URL.
+    
+    Args:
+        url: ``file:PATH`` or ``redis://HOST:PORT/DB?stream=...&group=...&consumer=...``
+    """
+    scheme = url.split(':', 1)[0] if ':' in url else ''
+    if scheme not in EVENT_SOURCES:
+        raise ValueError(f"Unknown event source '{url}'. Choose from {list(EVENT_SOURCES)}")
+    if scheme == 'file':
+        return FileTailSource(url[len('file:'):])
+    
+    parsed = urlparse(url)
+    options = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    server = parsed._replace(query='').geturl()
+    return RedisStreamSource(server, stream=options.get('stream', 'interactions'),
+                             group=options.get('group', 'ai-labeler'), consumer=options.get('consumer'))
+
+
+class StreamConsumer:
+    """
+    Applies streamed interactions to per-post StreamingPostState and emits label changes.
+    
+    Each read is grouped by post, so a post is re-scored once per batch
+    rather than once per event, and ``on_change`` is called with a record
+    whenever a post's confidence differs from the last one emitted.
+    
+    Delivery is at least once. Every ``checkpoint_interval_seconds`` (and
+    on a clean stop) the posts changed since the last checkpoint, the posts
+    dropped since then and the last applied position are written in one
+    SQLite transaction to ``checkpoint_path``, so a checkpoint costs what
+    changed rather than everything tracked. Only then is the source told
+    to commit. After a crash, the states are restored and the source
+    replays from the checkpoint. Replayed events at or before the
+    checkpointed position are skipped. Exact repeats (same post, user, time
+    and action, which the loader also drops) are not applied twice if they
+    arrive within ``dedup_window_seconds`` of event time of the newest event
+    seen; older keys are forgotten. Label changes emitted after the last
+    checkpoint may be emitted again, so sinks should be idempotent on
+    (post_id, confidence).
+    
+    A post with no events for ``post_idle_seconds`` of event time is treated
+    as finished and dropped, and at most ``max_posts`` posts are tracked
+    (the least recently updated is dropped past that). A dropped post
+    starts over if it gets events again.
+    """
+    
+    def __init__(self, source, labeler: Optional[InstagramAIConfidenceLabeler] = None,
+                 checkpoint_path: Optional[str] = None, batch_size: int = 1000,
+                 poll_timeout: float = 1.0, checkpoint_interval_seconds: float = 5.0,
+                 max_posts: int = 100_000, dedup_window_seconds: float = 3600.0,
+                 post_idle_seconds: Optional[float] = 24 * 3600.0,
+                 on_change: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Initialize the consumer, restoring state from the checkpoint if there is one.
+        
+        Args:
+            source: Event source (see EVENT_SOURCES)
+            labeler: Labeler whose thresholds and graph backend the states use
+                (a Gemini-less one is created if omitted)
+            checkpoint_path: File for state snapshots (None: no checkpoints)
+            batch_size: Most events read and applied per batch
+            poll_timeout: Seconds a read waits for events
+            checkpoint_interval_seconds: Minimum time between checkpoints
+            max_posts: Posts tracked at once
+            dedup_window_seconds: Event-time span over which exact repeats are dropped
+            post_idle_seconds: Event-time gap after which a post is finished and
+                dropped (None keeps posts until max_posts evicts them)
+            on_change: Called with each label-change record
+        """
+        self.source = source
+        self.labeler = labeler or InstagramAIConfidenceLabeler(enable_gemini=False)
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        self.max_posts = max_posts
+        self.dedup_window_seconds = dedup_window_seconds
+        self.post_idle_seconds = post_idle_seconds
+        self.on_change = on_change or (lambda change: None)
+        self.valid_actions = set(InteractionDataLoader().valid_actions)
+        
+        # post_id -> {'state', 'seen', 'confidence', 'last_event'}, least recently updated first
+        self._posts: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._position = None
+        # Newest event time applied (epoch ns); drives dedup pruning and expiry
+        self._watermark = None
+        # Changes since the last checkpoint: updated posts (in update order) and dropped ones
+        self._dirty: 'OrderedDict[str, None]' = OrderedDict()
+        self._dropped = set()
+        self._db = None
+        self._stopping = threading.Event()
+        self.counters = {'events': 0, 'duplicates': 0, 'replayed': 0, 'invalid': 0,
+                         'batches': 0, 'label_changes': 0, 'evicted_posts': 0, 'expired_posts': 0,
+                         'checkpoints': 0}
+        self._started = time.monotonic()
+        self._recent = deque(maxlen=64)
+        self._last_batch_seconds = 0.0
+        self._event_lag_seconds = None
+        self._last_checkpoint = None
+        
+        if checkpoint_path:
+            self._open_checkpoint()
+        self.source.start_after(self._position)
+    
+    def _open_checkpoint(self) -> None:
+        self._db = sqlite3.connect(self.checkpoint_path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS posts (post_id TEXT PRIMARY KEY, post BLOB NOT NULL)")
+        self._db.commit()
+        
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'position'").fetchone()
+        if row is None:
+            return
+        self._position = pickle.loads(row[0])
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        self._watermark = pickle.loads(row[0]) if row else None
+        # INSERT OR REPLACE gives a rewritten row a new rowid, so rowid order is update order
+        for post_id, blob in self._db.execute("SELECT post_id, post FROM posts ORDER BY rowid"):
+            post = pickle.loads(blob)
+            post['state'].labeler = self.labeler
+            self._posts[post_id] = post
+        print(f"♻️ Restored {len(self._posts)} posts from {self.checkpoint_path}", file=sys.stderr)
+    
+    def _drop(self, post_id: str) -> None:
+        del self._posts[post_id]
+        self._dirty.pop(post_id, None)
+        self._dropped.add(post_id)
+    
+    def _parse_event(self, event: Optional[Dict[str, Any]]) -> Optional[Tuple[str, Any, int, str]]:
+        """(post_id, user_id, epoch ns, action_type), or None for a malformed or unknown-action event."""
+        try:
+            if event['action_type'] not in self.valid_actions:
+                return None
+            return str(event['post_id']), event['user_id'], epoch_ns(event['timestamp']), event['action_type']
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def process_batch(self, events: List[Tuple[Any, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Apply a batch of (position, event) pairs.
+        
+        Returns:
+            Label-change records for posts whose confidence changed
+        """
+        started = time.monotonic()
+        by_post: Dict[str, List[Tuple[Any, int, str]]] = {}
+        newest = None
+        for position, event in events:
+            if self._position is not None and position <= self._position:
+                self.counters['replayed'] += 1
+                continue
+            parsed = self._parse_event(event)
+            if parsed is None:
+                self.counters['invalid'] += 1
+                continue
+            post_id, user_id, epoch, action_type = parsed
+            by_post.setdefault(post_id, []).append((user_id, epoch, action_type))
+            newest = epoch if newest is None else max(newest, epoch)
+        if newest is not None:
+            self._watermark = newest if self._watermark is None else max(self._watermark, newest)
+        
+        changes = []
+        for post_id, post_events in by_post.items():
+            post = self._posts.get(post_id)
+            if post is None:
+                post = {'state': StreamingPostState(post_id, self.labeler), 'seen': set(), 'confidence': 0,
+                        'last_event': None}
+                self._posts[post_id] = post
+                self._dropped.discard(post_id)
+                if len(self._posts) > self.max_posts:
+                    self._drop(next(iter(self._posts)))
+                    self.counters['evicted_posts'] += 1
+            else:
+                self._posts.move_to_end(post_id)
+            self._dirty[post_id] = None
+            self._dirty.move_to_end(post_id)
+            
+            state, seen = post['state'], post['seen']
+            for key in post_events:
+                if key in seen:
+                    self.counters['duplicates'] += 1
+                    continue
+                seen.add(key)
+                state.add(*key)
+                self.counters['events'] += 1
+            newest_for_post = max(epoch for _, epoch, _ in post_events)
+            if post['last_event'] is None or newest_for_post > post['last_event']:
+                post['last_event'] = newest_for_post
+            
+            result = state.result()
+            if result['confidence'] != post['confidence']:
+                changes.append({
+                    'post_id': post_id,
+                    'previous_confidence': post['confidence'],
+                    'confidence': result['confidence'],
+                    'label': result['label'],
+                    'abnormal_signal_count': result['abnormal_signal_count'],
+                    'triggered_signals': result['triggered_signals'],
+                    'total_interactions': result['total_interactions'],
+                    'emitted_at': time.time()
+                })
+                post['confidence'] = result['confidence']
+        
+        self.counters['batches'] += 1
+        self.counters['label_changes'] += len(changes)
+        now = time.monotonic()
+        self._recent.append((now, len(events)))
+        self._last_batch_seconds = now - started
+        if newest is not None:
+            self._event_lag_seconds = time.time() - newest / 1e9
+        return changes
+    
+    def run(self, stop_when_idle: bool = False, on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None,
+            metrics_interval_seconds: float = 10.0) -> None:
+        """
+        Consume until stop() is called (or the source is drained, with ``stop_when_idle``).
+        
+        Args:
+            stop_when_idle: Return once a read comes back empty
+            on_metrics: Called with metrics() every ``metrics_interval_seconds``
+            metrics_interval_seconds: Interval for on_metrics
+        """
+        self._stopping.clear()
+        last_checkpoint = last_metrics = time.monotonic()
+        between_batches = True
+        try:
+            while not self._stopping.is_set():
+                events = self.source.read(self.batch_size, self.poll_timeout)
+                if events:
+                    between_batches = False
+                    for change in self.process_batch(events):
+                        self.on_change(change)
+                    # Applied and emitted: the batch may now be checkpointed (a replayed
+                    # batch ending before the checkpoint leaves the position where it was)
+                    if self._position is None or events[-1][0] > self._position:
+                        self._position = events[-1][0]
+                    between_batches = True
+                elif stop_when_idle:
+                    break
+                
+                now = time.monotonic()
+                if now - last_checkpoint >= self.checkpoint_interval_seconds:
+                    self.checkpoint()
+                    last_checkpoint = now
+                if on_metrics is not None and now - last_metrics >= metrics_interval_seconds:
+                    on_metrics(self.metrics())
+                    last_metrics = now
+        finally:
+            # A batch cut short is not checkpointed; it is replayed on restart
+            if between_batches:
+                self.checkpoint()
+    
+    def stop(self) -> None:
+        """Ask run() to return after the current batch."""
+        self._stopping.set()
+    
+    def _compact(self) -> None:
+        """Drop finished posts and dedup keys that fell out of the window."""
+        if self._watermark is None:
+            return
+        if self.post_idle_seconds is not None:
+            cutoff = self._watermark - int(self.post_idle_seconds * 1_000_000_000)
+            # Least recently updated first, so stop at the first post still active
+            while self._posts:
+                post_id, post = next(iter(self._posts.items()))
+                if post['last_event'] >= cutoff:
+                    break
+                self._drop(post_id)
+                self.counters['expired_posts'] += 1
+        
+        cutoff = self._watermark - int(self.dedup_window_seconds * 1_000_000_000)
+        for post_id in self._dirty:
+            post = self._posts[post_id]
+            if any(key[1] < cutoff for key in post['seen']):
+                post['seen'] = {key for key in post['seen'] if key[1] >= cutoff}
+    
+    def checkpoint(self) -> None:
+        """Write the changes since the last checkpoint in one transaction, then commit the position to the source."""
+        if self._position is None:
+            return
+        self._compact()
+        if self._db is not None:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO posts (post_id, post) VALUES (?, ?)",
+                    ((post_id, pickle.dumps(self._posts[post_id], protocol=pickle.HIGHEST_PROTOCOL))
+                     for post_id in self._dirty))
+                self._db.executemany("DELETE FROM posts WHERE post_id = ?",
+                                     ((post_id,) for post_id in self._dropped))
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [('position', pickle.dumps(self._position)), ('watermark', pickle.dumps(self._watermark))])
+        self._dirty.clear()
+        self._dropped.clear()
+        self.source.commit(self._position)
+        self.counters['checkpoints'] += 1
+        self._last_checkpoint = time.monotonic()
+    
+    def close(self) -> None:
+        """Close the checkpoint database (the source is left to its owner)."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Throughput, lag and counters for monitoring."""
+        now = time.monotonic()
+        recent = [(t, n) for t, n in self._recent if now - t <= 10.0]
+        recent_span = now - recent[0][0] if len(recent) > 1 else None
+        return {
+            **self.counters,
+            'posts_tracked': len(self._posts),
+            'events_per_second': round(self.counters['events'] / max(now - self._started, 1e-9), 1),
+            'recent_events_per_second': round(sum(n for _, n in recent[1:]) / recent_span, 1) if recent_span else None,
+            'last_batch_seconds': round(self._last_batch_seconds, 4),
+            # Wall clock minus the newest event time in the last batch
+            'event_lag_seconds': round(self._event_lag_seconds, 3) if self._event_lag_seconds is not None else None,
+            'backlog': self.source.backlog(),
+            'seconds_since_checkpoint': round(now - self._last_checkpoint, 1) if self._last_checkpoint else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Interaction event-stream consumer')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    consume = subparsers.add_parser('consume', help='Label posts as their events arrive')
+    consume.add_argument('--source', required=True, help='file:PATH or redis://HOST:PORT/DB?stream=...&group=...')
+    consume.add_argument('--checkpoint', help='Checkpoint file (resume from it on restart)')
+    consume.add_argument('--output', '-o', help='Append label changes as JSON Lines here (default: stdout)')
+    consume.add_argument('--batch-size', type=int, default=1000)
+    consume.add_argument('--checkpoint-interval', type=float, default=5.0, help='Seconds between checkpoints')
+    consume.add_argument('--metrics-interval', type=float, default=10.0, help='Seconds between metrics lines on stderr')
+    consume.add_argument('--graph-backend', choices=['networkx', 'sparse'], default='sparse')
+    consume.add_argument('--exit-when-idle', action='store_true', help='Stop once the source has no more events')
+    
+    replay = subparsers.add_parser('replay', help='Publish a CSV of interactions to a source, in timestamp order')
+    replay.add_argument('file', help='CSV, Parquet or Arrow file of interactions')
+    replay.add_argument('--to', required=True, help='file:PATH or redis://... to publish to')
+    replay.add_argument('--rate', type=float, help='Events per second (default: as fast as possible)')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'replay':
+        df = InteractionDataLoader(data_source=args.file).load_data()
+        target = open_event_source(args.to)
+        events = ({'post_id': row.post_id, 'user_id': row.user_id, 'timestamp': row.timestamp.isoformat(),
+                   'action_type': row.action_type} for row in df.itertuples(index=False))
+        if args.rate:
+            published = 0
+            started = time.monotonic()
+            for event in events:
+                published += target.append([event])
+                time.sleep(max(0.0, started + published / args.rate - time.monotonic()))
+        else:
+            published = target.append(events)
+        target.close()
+        print(f"📤 Published {published} events to {args.to}", file=sys.stderr)
+        return
+    
+    out = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    
+    def emit(change):
+        out.write(json.dumps(change) + '\n')
+        out.flush()
+    
+    source = open_event_source(args.source)
+    consumer = StreamConsumer(source, labeler=InstagramAIConfidenceLabeler(graph_backend=args.graph_backend,
+                                                                           enable_gemini=False),
+                              checkpoint_path=args.checkpoint, batch_size=args.batch_size,
+                              checkpoint_interval_seconds=args.checkpoint_interval, on_change=emit)
+    print(f"📥 Consuming {args.source}", file=sys.stderr)
+    try:
+        consumer.run(stop_when_idle=args.exit_when_idle, metrics_interval_seconds=args.metrics_interval,
+                     on_metrics=lambda metrics: print(f"📈 {json.dumps(metrics)}", file=sys.stderr))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📈 {json.dumps(consumer.metrics())}", file=sys.stderr)
+        source.close()
+        consumer.close()
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,7 @@ Feature extraction with proper timestamp handling.
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Any
-from datetime import datetime
-from .utils import DetectionThresholds
+from .utils import DetectionThresholds, to_epoch_ns
 from .entropy import BehavioralEntropyAnalyzer
 
 class BehavioralFeatureExtractor:
@@ -14,68 +13,64 @@ class BehavioralFeatureExtractor:
         self.thresholds = DetectionThresholds()
         self.entropy = BehavioralEntropyAnalyzer()
     
-    def _convert_to_datetime(self, timestamps: List) -> List[datetime]:
-        """Convert string timestamps to datetime objects."""
-        converted = []
-        for ts in timestamps:
-            if isinstance(ts, str):
-                converted.append(pd.to_datetime(ts))
-            else:
-                converted.append(ts)
-        return converted
-    
-    def extract_spread_speed(self, timestamps: List) -> Dict:
+    def extract_spread_speed(self, timestamps) -> Dict:
         """Detect abnormally fast spread speeds."""
-        timestamps = self._convert_to_datetime(timestamps)
+        epochs = to_epoch_ns(timestamps)
         
-        if len(timestamps) < 2:
+        if len(epochs) < 2:
             return {'value': 999, 'is_abnormal': False}
         
-        gaps = []
-        for i in range(1, len(timestamps)):
-            gap = (timestamps[i] - timestamps[i-1]).total_seconds()
-            gaps.append(gap)
-        
-        avg_gap = np.mean(gaps) if gaps else 999
+        avg_gap = np.mean(np.diff(epochs) / 1e9)
         return {'value': avg_gap, 'is_abnormal': avg_gap < self.thresholds.SPREAD_SPEED_THRESHOLD_SECONDS}
     
-    def extract_early_burst(self, timestamps: List) -> Dict:
+    def extract_early_burst(self, timestamps) -> Dict:
         """Detect if interactions happen immediately after posting."""
-        timestamps = self._convert_to_datetime(timestamps)
+        epochs = to_epoch_ns(timestamps)
         
-        if len(timestamps) < 2:
+        if len(epochs) < 2:
             return {'value': 0, 'is_abnormal': False}
         
-        first, last = timestamps[0], timestamps[-1]
-        lifetime = (last - first).total_seconds()
+        first, last = epochs[0], epochs[-1]
+        lifetime = (last - first) / 1e9
         
         if lifetime == 0:
             return {'value': 1.0, 'is_abnormal': True}
         
-        early = sum(1 for t in timestamps if (t - first).total_seconds() <= lifetime * 0.1)
-        ratio = early / len(timestamps)
+        early = np.count_nonzero((epochs - first) / 1e9 <= lifetime * 0.1)
+        ratio = early / len(epochs)
         return {'value': ratio, 'is_abnormal': ratio > self.thresholds.EARLY_BURST_THRESHOLD_PERCENT}
     
+    @staticmethod
+    def _synchronized_event_mask(sorted_epochs: np.ndarray, window: int) -> np.ndarray:
+        """
+        Flag events that have at least one other event within the window.
+        
+        On a sorted timeline the closest event to any point is always one of its
+        direct neighbours, so checking the adjacent gaps is enough to find every
+        pair the exhaustive scan would have found.
+        """
+        gaps = np.diff(sorted_epochs)
+        close = gaps <= window
+        mask = np.zeros(len(sorted_epochs), dtype=bool)
+        mask[:-1] |= close
+        mask[1:] |= close
+        return mask
+    
     def extract_synchronization(self, df: pd.DataFrame) -> Dict:
-        """Detect users acting within 2-second windows."""
+        """Detect users acting within the configured sync window."""
         if len(df) < 2:
             return {'value': 0, 'is_abnormal': False}
         
-        df = df.copy()
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df_sorted = df.sort_values('timestamp')
-        
-        times = df_sorted['timestamp'].tolist()
-        users = df_sorted['user_id'].tolist()
+        epochs = to_epoch_ns(df['timestamp'])
+        user_codes, _ = pd.factorize(df['user_id'])
+        order = np.argsort(epochs, kind='stable')
         
-        sync_users = set()
-        for i in range(len(times)):
-            for j in range(i+1, len(times)):
-                if (times[j] - times[i]).total_seconds() <= 2:
-                    sync_users.add(users[i])
-                    sync_users.add(users[j])
+        window = int(self.thresholds.SYNC_WINDOW_SECONDS * 1_000_000_000)
+        sync_mask = self._synchronized_event_mask(epochs[order], window)
+        sync_users = np.unique(user_codes[order][sync_mask])
         
-        ratio = len(sync_users) / df['user_id'].nunique() if df['user_id'].nunique() > 0 else 0
+        unique_users = df['user_id'].nunique()
+        ratio = len(sync_users) / unique_users if unique_users > 0 else 0
         return {'value': ratio, 'is_abnormal': ratio > self.thresholds.SYNC_THRESHOLD_PERCENT}
     
     def extract_user_diversity(self, df: pd.DataFrame) -> Dict:
@@ -83,21 +78,16 @@ class BehavioralFeatureExtractor:
         ratio = df['user_id'].nunique() / len(df) if len(df) > 0 else 1
         return {'value': ratio, 'is_abnormal': ratio < self.thresholds.USER_DIVERSITY_THRESHOLD}
     
-    def extract_behavioral_entropy(self, timestamps: List, actions: List) -> Dict:
+    def extract_behavioral_entropy(self, timestamps, actions) -> Dict:
         """Detect low randomness in behavior."""
-        timestamps = self._convert_to_datetime(timestamps)
-        
-        timing, action, _ = self.entropy.analyze_post_behavior(timestamps, actions)
+        timing, action, _ = self.entropy.analyze_post_behavior(to_epoch_ns(timestamps), actions)
         combined = (timing * 0.6 + action * 0.4) if (timing > 0 or action > 0) else 0
         return {'value': combined, 'is_abnormal': combined < self.thresholds.ENTROPY_THRESHOLD}
     
     def extract_all_features(self, post_id: str, df: pd.DataFrame) -> Dict:
         """Extract all behavioral features for a post."""
-        df = df.copy()
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        timestamps = df['timestamp'].tolist()
-        actions = df['action_type'].tolist()
+        timestamps = to_epoch_ns(df['timestamp'])
+        actions = df['action_type']
         
         return {
             'spread_speed': self.extract_spread_speed(timestamps),
@@ -106,3 +96,94 @@ class BehavioralFeatureExtractor:
             'user_diversity': self.extract_user_diversity(df),
             'behavioral_entropy': self.extract_behavioral_entropy(timestamps, actions)
         }
+    
+    def extract_frame_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Extract behavioral features for every post in one vectorized pass.
+        
+        Produces the same values as calling extract_all_features per post, using
+        segment reductions over the whole frame instead of per-post filtering.
+        Rows keep their relative order within each post, as in the per-post path.
+        
+        Args:
+            df: Interaction DataFrame covering any number of posts
+        
+        Returns:
+            DataFrame indexed by post_id (first-seen order) with total_interactions,
+            unique_users and a value plus ``*_abnormal`` flag column per signal
+        """
+        post_codes, post_index = pd.factorize(df['post_id'])
+        if (post_codes < 0).any():
+            # Rows without a post_id belong to no post, as in the per-post groupby
+            df = df[post_codes >= 0]
+            post_codes = post_codes[post_codes >= 0]
+        num_posts = len(post_index)
+        sizes = np.bincount(post_codes, minlength=num_posts)
+        epochs = to_epoch_ns(df['timestamp'])
+        
+        # Row positions grouped by post, keeping row order inside each post
+        by_post = np.argsort(post_codes, kind='stable')
+        starts = np.cumsum(sizes) - sizes
+        nonempty = sizes > 0
+        first = np.zeros(num_posts, dtype=np.int64)
+        last = np.zeros(num_posts, dtype=np.int64)
+        first[nonempty] = epochs[by_post[starts[nonempty]]]
+        last[nonempty] = epochs[by_post[starts[nonempty] + sizes[nonempty] - 1]]
+        multi = sizes >= 2
+        
+        # Spread speed: the mean consecutive gap telescopes to (last - first) / (n - 1)
+        lifetime = (last - first) / 1e9
+        spread = np.full(num_posts, 999.0)
+        spread[multi] = lifetime[multi] / (sizes[multi] - 1)
+        
+        # Early burst: share of interactions within the first 10% of the lifetime
+        deltas = (epochs - first[post_codes]) / 1e9
+        early = np.bincount(post_codes, weights=deltas <= lifetime[post_codes] * 0.1, minlength=num_posts)
+        burst = np.zeros(num_posts)
+        burst[multi] = early[multi] / sizes[multi]
+        burst[multi & (lifetime == 0)] = 1.0
+        burst_abnormal = multi & ((lifetime == 0) | (burst > self.thresholds.EARLY_BURST_THRESHOLD_PERCENT))
+        
+        # Unique users per post
+        user_codes, user_index = pd.factorize(df['user_id'])
+        has_user = user_codes >= 0
+        pair_keys = np.unique(post_codes[has_user].astype(np.int64) * len(user_index) + user_codes[has_user])
+        unique_users = np.bincount(pair_keys // max(len(user_index), 1), minlength=num_posts)
+        
+        diversity = np.ones(num_posts)
+        diversity[nonempty] = unique_users[nonempty] / sizes[nonempty]
+        
+        # Synchronization: adjacent-gap sweep over the (post, time) ordering
+        timeline = np.lexsort((epochs, post_codes))
+        window = int(self.thresholds.SYNC_WINDOW_SECONDS * 1_000_000_000)
+        close = (np.diff(post_codes[timeline]) == 0) & (np.diff(epochs[timeline]) <= window)
+        synced = np.zeros(len(timeline), dtype=bool)
+        synced[:-1] |= close
+        synced[1:] |= close
+        synced_rows = timeline[synced & has_user[timeline]]
+        synced_keys = np.unique(post_codes[synced_rows].astype(np.int64) * len(user_index) + user_codes[synced_rows])
+        synced_users = np.bincount(synced_keys // max(len(user_index), 1), minlength=num_posts)
+        sync = np.zeros(num_posts)
+        has_users = multi & (unique_users > 0)
+        sync[has_users] = synced_users[has_users] / unique_users[has_users]
+        
+        # Behavioral entropy
+        action_codes, action_index = pd.factorize(df['action_type'])
+        timing = self.entropy.timing_entropy_by_group(post_codes, deltas, num_posts)
+        action = self.entropy.action_entropy_by_group(post_codes, action_codes, num_posts, len(action_index))
+        combined = np.where((timing > 0) | (action > 0), timing * 0.6 + action * 0.4, 0.0)
+        
+        return pd.DataFrame({
+            'total_interactions': sizes,
+            'unique_users': unique_users,
+            'spread_speed': spread,
+            'spread_speed_abnormal': multi & (spread < self.thresholds.SPREAD_SPEED_THRESHOLD_SECONDS),
+            'early_burst': burst,
+            'early_burst_abnormal': burst_abnormal,
+            'synchronization': sync,
+            'synchronization_abnormal': multi & (sync > self.thresholds.SYNC_THRESHOLD_PERCENT),
+            'user_diversity': diversity,
+            'user_diversity_abnormal': diversity < self.thresholds.USER_DIVERSITY_THRESHOLD,
+            'behavioral_entropy': combined,
+            'behavioral_entropy_abnormal': combined < self.thresholds.ENTROPY_THRESHOLD,
+        }, index=pd.Index(post_index, name='post_id'))
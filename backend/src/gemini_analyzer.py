@@ -3,23 +3,101 @@ Gemini API integration with quota handling.
 """
 
 import os
-import time
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from .gemini_client import CLIENT_BACKENDS, get_gemini_client
+from .rate_limit import CircuitBreaker, GeminiRateLimiter, get_shared_gemini_guards
+from .response_cache import GeminiResponseCache, get_shared_response_cache
+
 load_dotenv()
 
+class GeminiUnavailable(Exception):
+    """A Gemini request was refused locally or rate limited by the API."""
+    
+    def __init__(self, reason: str, retry_after: float = 0.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+_SECTION_PATTERN = re.compile(r'^[ \t#*]*POST\s+(\d+)\W*$', re.MULTILINE | re.IGNORECASE)
+
+INSIGHT_FIELDS = {'SUMMARY': 'summary', 'RISK': 'risk_factors', 'ACTION': 'recommendation'}
+NOTE_FIELDS = {'NOTE': 'note'}
+COMPARISON_FIELDS = {'COMPARISON': 'comparison'}
+
+UNAVAILABLE_INSIGHTS = {
+    'summary': 'Gemini unavailable',
+    'risk_factors': '',
+    'recommendation': 'Continue with basic analysis'
+}
+MISSING_INSIGHTS = {
+    'summary': 'No insight returned for this post',
+    'risk_factors': '',
+    'recommendation': ''
+}
+
+
 class GeminiPostAnalyzer:
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv('GEMINI_API_KEY')
+    # Longest a caller waits for a rate-limit slot before degrading
+    SLOT_TIMEOUT_SECONDS = 15.0
+    
+    # Batch prompt sizing: flash models accept far more input than they can
+    # write back, so the reply budget is what usually bounds a batch
+    BATCH_SIZE = 50
+    INPUT_TOKEN_BUDGET = 30_000
+    MAX_OUTPUT_TOKENS = 8192
+    INSIGHT_TOKENS_PER_POST = 120
+    NOTE_TOKENS_PER_POST = 60
+    COMPARISON_TOKENS_PER_POST = 60
+    
+    INSIGHTS_BATCH_INSTRUCTION = ('Briefly analyze each of these social media posts for coordinated or '
+                                  'automated engagement (1 sentence per field).')
+    NOTES_BATCH_INSTRUCTION = ('Write a one-sentence note for a content moderator reviewing each of '
+                               'these posts for inauthentic engagement.')
+    
+    def __init__(self, api_key: Optional[str] = None,
+                 rate_limiter: Optional[GeminiRateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 response_cache: Optional[GeminiResponseCache] = None,
+                 client: Optional[Any] = None, enabled: bool = True):
+        """
+        Args:
+            api_key: Gemini API key; GEMINI_API_KEY is used if omitted
+            rate_limiter: Shared limiter used if omitted
+            circuit_breaker: Shared breaker used if omitted
+            response_cache: Shared reply cache used if omitted
+            client: Prebuilt client; one is built from GEMINI_BACKEND if omitted
+            enabled: If False, never read the environment, build a client or
+                probe models, so the analyzer stays unavailable
+        """
+        self.api_key = (api_key or os.getenv('GEMINI_API_KEY')) if enabled else None
+        self.client = client
         self.model = None
+        self.model_name = None
         self.is_available = False
-        self.quota_exceeded = False
         
-        if self.api_key:
+        shared_limiter, shared_breaker = get_shared_gemini_guards()
+        self.rate_limiter = rate_limiter or shared_limiter
+        self.circuit_breaker = circuit_breaker or shared_breaker
+        self.response_cache = response_cache or get_shared_response_cache()
+        
+        if not enabled:
+            self.client = None
+            return
+        
+        if client is None:
+            backend = os.getenv('GEMINI_BACKEND', 'google')
+            needs_key = getattr(CLIENT_BACKENDS.get(backend), 'requires_api_key', True)
+        else:
+            needs_key = client.requires_api_key
+        
+        if self.api_key or not needs_key:
             try:
-                genai.configure(api_key=self.api_key)
+                if self.client is None:
+                    self.client = get_gemini_client(backend, api_key=self.api_key)
                 
                 # Try models in order of preference
                 models_to_try = [
@@ -32,86 +110,415 @@ class GeminiPostAnalyzer:
                 print("\n🔍 Initializing Gemini...")
                 
                 for model_name in models_to_try:
+                    # The probe is a real request, so it goes through the same
+                    # guards as _call. If they refuse it, stop probing and keep
+                    # this model unverified, as for a 429: the breaker and
+                    # limiter gate every later call anyway
+                    refusal = None
+                    if not self.circuit_breaker.allow_request():
+                        refusal = f"circuit open, retry in {self.circuit_breaker.retry_after():.0f}s"
+                    elif not self.rate_limiter.acquire(tokens=1, timeout=self.SLOT_TIMEOUT_SECONDS):
+                        if self.circuit_breaker.state == CircuitBreaker.HALF_OPEN:
+                            self.circuit_breaker.release_trial()
+                        refusal = "rate limit busy"
+                    if refusal:
+                        self.model = self.client.model(model_name)
+                        self.is_available = True
+                        self.model_name = model_name
+                        print(f"⚠️ Not probing Gemini ({refusal}); using {model_name} unverified")
+                        break
                     try:
-                        self.model = genai.GenerativeModel(model_name)
+                        self.model = self.client.model(model_name)
                         # Very quick test
                         response = self.model.generate_content("OK", generation_config={"max_output_tokens": 1})
+                        self.circuit_breaker.record_success()
                         self.is_available = True
+                        self.model_name = model_name
                         print(f"✅ Gemini ready with {model_name}")
                         break
                     except Exception as e:
                         if '429' in str(e):
-                            self.quota_exceeded = True
+                            # The model exists but is throttled; keep it and let
+                            # the breaker decide when to try again
+                            self.circuit_breaker.record_failure(rate_limited=True)
+                            self.is_available = True
+                            self.model_name = model_name
                             print(f"⚠️ Quota exceeded for {model_name}")
                             break
+                        # Not a verdict on the service; let the next candidate take the trial
+                        if self.circuit_breaker.state == CircuitBreaker.HALF_OPEN:
+                            self.circuit_breaker.release_trial()
                         continue
                 
             except Exception as e:
                 print(f"⚠️ Gemini init failed: {e}")
     
-    def generate_post_insights(self, post_data: Dict[str, Any]) -> Dict[str, str]:
-        """Generate insights with quota handling."""
+    @property
+    def quota_exceeded(self) -> bool:
+        """True while the circuit breaker is refusing calls."""
+        return self.circuit_breaker.state == CircuitBreaker.OPEN
+    
+    @property
+    def cache_namespace(self) -> Optional[str]:
+        """Model identity used in cache keys, so stub replies never answer real calls."""
+        if self.client is None or self.client.name == 'google':
+            return self.model_name
+        return f'{self.client.name}:{self.model_name}'
+    
+    def status(self) -> Dict[str, Any]:
+        """Current Gemini state for health reporting."""
+        return {
+            'configured': self.client is not None,
+            'backend': self.client.name if self.client is not None else None,
+            'available': self.is_available,
+            'model': self.model_name,
+            'quota_exceeded': self.quota_exceeded,
+            'circuit': self.circuit_breaker.status(),
+            'rate_limit': self.rate_limiter.status(),
+            'cache': self.response_cache.stats()
+        }
+    
+    @staticmethod
+    def estimate_tokens(prompt: str, max_output_tokens: int = 256) -> int:
+        """Rough token estimate (about 4 characters per token) plus the reply budget."""
+        return len(prompt) // 4 + max_output_tokens
+    
+    def _call(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
+        """
+        Send one prompt through the circuit breaker and rate limiter.
         
-        if self.quota_exceeded:
-            return {
-                'summary': '⚠️ API quota exceeded. Try again later.',
-                'risk_factors': '• Rate limit reached\n• Wait 60 seconds',
-                'recommendation': 'Use without Gemini for now'
-            }
+        Raises:
+            GeminiUnavailable: If the circuit is open, no rate-limit slot freed
+                up in time, or the API answered with a 429
+        """
+        if not self.circuit_breaker.allow_request():
+            raise GeminiUnavailable('quota', self.circuit_breaker.retry_after())
         
-        if not self.is_available:
-            return {
-                'summary': 'Gemini unavailable',
-                'risk_factors': '',
-                'recommendation': 'Continue with basic analysis'
-            }
+        if not self.rate_limiter.acquire(tokens=self.estimate_tokens(prompt, max_output_tokens or 256),
+                                         timeout=self.SLOT_TIMEOUT_SECONDS):
+            # Give back a half-open trial slot we could not use
+            if self.circuit_breaker.state == CircuitBreaker.HALF_OPEN:
+                self.circuit_breaker.release_trial()
+            raise GeminiUnavailable('busy')
         
         try:
-            # Add small delay to avoid quota issues
-            time.sleep(1)
-            
-            prompt = f"""
-            Briefly analyze this post (1 sentence each):
-            
-            Post: {post_data.get('post_id', 'Unknown')}
-            Confidence: {post_data.get('confidence', 0)}%
-            Patterns: {len(post_data.get('triggered_signals', []))} detected
-            
-            SUMMARY:
-            RISK:
-            ACTION:
-            """
-            
-            response = self.model.generate_content(prompt)
-            
-            # Parse response
-            lines = response.text.split('\n')
-            result = {
-                'summary': '',
-                'risk_factors': '',
-                'recommendation': ''
-            }
-            
-            for line in lines:
-                if line.startswith('SUMMARY:'):
-                    result['summary'] = line[8:].strip()
-                elif line.startswith('RISK:'):
-                    result['risk_factors'] = line[5:].strip()
-                elif line.startswith('ACTION:'):
-                    result['recommendation'] = line[7:].strip()
-            
-            return result
-            
+            if max_output_tokens:
+                response = self.model.generate_content(
+                    prompt, generation_config={"max_output_tokens": max_output_tokens})
+            else:
+                response = self.model.generate_content(prompt)
+            text = response.text
         except Exception as e:
             if '429' in str(e):
-                self.quota_exceeded = True
+                self.circuit_breaker.record_failure(rate_limited=True)
+                raise GeminiUnavailable('rate_limited', self.circuit_breaker.retry_after()) from e
+            self.circuit_breaker.record_failure()
+            raise
+        
+        self.circuit_breaker.record_success()
+        return text
+    
+    @staticmethod
+    def _parse_fields(lines: List[str], fields: Dict[str, str]) -> Dict[str, str]:
+        """Map 'LABEL: value' lines onto result keys ({label: key})."""
+        result = {key: '' for key in fields.values()}
+        for line in lines:
+            line = line.replace('**', '').strip()
+            for label, key in fields.items():
+                if line.startswith(f'{label}:'):
+                    result[key] = line[len(label) + 1:].strip()
+        return result
+    
+    @staticmethod
+    def _insights_fallback(error: Exception) -> Dict[str, str]:
+        """Placeholder insights when Gemini could not answer."""
+        if isinstance(error, GeminiUnavailable):
+            retry_after = int(error.retry_after) + 1
+            if error.reason == 'quota':
+                return {
+                    'summary': '⚠️ API quota exceeded. Try again later.',
+                    'risk_factors': f'• Rate limit reached\n• Wait {retry_after} seconds',
+                    'recommendation': 'Use without Gemini for now'
+                }
+            if error.reason == 'rate_limited':
                 return {
                     'summary': 'Quota exceeded',
                     'risk_factors': 'Rate limit reached',
-                    'recommendation': 'Try again in 60 seconds'
+                    'recommendation': f'Try again in {retry_after} seconds'
                 }
             return {
-                'summary': f'Error: {str(e)[:50]}',
-                'risk_factors': '',
-                'recommendation': ''
-            }
\ No newline at end of file
+                'summary': 'Gemini busy',
+                'risk_factors': 'Local request budget exhausted',
+                'recommendation': 'Try again shortly'
+            }
+        return {
+            'summary': f'Error: {str(error)[:50]}',
+            'risk_factors': '',
+            'recommendation': ''
+        }
+    
+    @staticmethod
+    def _insights_prompt(post_data: Dict[str, Any]) -> str:
+        """
+        Single-post insights prompt, built only from the scored signals.
+        
+        The post_id is left out so posts that scored the same get the same
+        prompt, and with it the same response cache entry.
+        """
+        return f"""
+        Briefly analyze this post (1 sentence each):
+        
+        Confidence: {post_data.get('confidence', 0)}%
+        Patterns: {len(post_data.get('triggered_signals', []))} detected
+        
+        SUMMARY:
+        RISK:
+        ACTION:
+        """
+    
+    def generate_post_insights(self, post_data: Dict[str, Any]) -> Dict[str, str]:
+        """Generate insights with quota handling."""
+        
+        if not self.is_available:
+            return dict(UNAVAILABLE_INSIGHTS)
+        
+        prompt = self._insights_prompt(post_data)
+        cache_key = self.response_cache.make_key(prompt, self.cache_namespace)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            text = self._call(prompt)
+        except Exception as e:
+            return self._insights_fallback(e)
+        
+        result = self._parse_fields(text.split('\n'), INSIGHT_FIELDS)
+        self.response_cache.put(cache_key, result)
+        return result
+    
+    # ------------------------------------------------------------------
+    # Batched prompts: several posts per request
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _post_brief(result: Dict[str, Any]) -> str:
+        """One-line description of an analysis result for a batch prompt."""
+        signals = '; '.join(result.get('triggered_signals') or []) or 'none'
+        return (f"post {result.get('post_id', 'Unknown')}: "
+                f"label {result.get('label', 'n/a')}, "
+                f"confidence {result.get('confidence', 0)}%, "
+                f"{result.get('total_interactions', 0)} interactions from "
+                f"{result.get('unique_users', 0)} users, "
+                f"patterns: {signals}")
+    
+    def _pack_batches(self, briefs: List[str], output_tokens_per_post: int) -> Iterator[List[int]]:
+        """
+        Group post indices so each prompt fits the model's context window.
+        
+        A batch closes when it reaches BATCH_SIZE posts, when the listed posts
+        would pass INPUT_TOKEN_BUDGET, or when the expected replies would pass
+        MAX_OUTPUT_TOKENS.
+        """
+        batch = []
+        input_tokens = 0
+        for index, brief in enumerate(briefs):
+            brief_tokens = self.estimate_tokens(brief, 0) + 1
+            if batch and (len(batch) >= self.BATCH_SIZE
+                          or input_tokens + brief_tokens > self.INPUT_TOKEN_BUDGET
+                          or (len(batch) + 1) * output_tokens_per_post > self.MAX_OUTPUT_TOKENS):
+                yield batch
+                batch = []
+                input_tokens = 0
+            batch.append(index)
+            input_tokens += brief_tokens
+        if batch:
+            yield batch
+    
+    def _ask_batch(self, briefs: List[str], instruction: str, fields: Dict[str, str],
+                   output_tokens_per_post: int, preamble: str = '') -> Tuple[List[Optional[Dict[str, str]]], List[str]]:
+        """
+        Ask about several posts in one prompt and split the reply per post.
+        
+        Returns:
+            (sections, leading lines): one parsed field dict per brief (None if
+            the reply had no section for it) and the reply lines before the
+            first section
+        """
+        field_lines = '\n'.join(f'{label}: <one sentence>' for label in fields)
+        listing = '\n'.join(f'{number}. {brief}' for number, brief in enumerate(briefs, 1))
+        prompt = (f"{instruction}\n\n{preamble}"
+                  f"Reply with one section per post, in order, exactly in this format:\n"
+                  f"### POST <number>\n{field_lines}\n\n"
+                  f"Posts:\n{listing}\n")
+        
+        text = self._call(prompt, max_output_tokens=min(self.MAX_OUTPUT_TOKENS,
+                                                        (len(briefs) + 1) * output_tokens_per_post))
+        
+        parts = _SECTION_PATTERN.split(text)
+        sections = [None] * len(briefs)
+        for number, body in zip(parts[1::2], parts[2::2]):
+            index = int(number) - 1
+            if 0 <= index < len(briefs):
+                sections[index] = self._parse_fields(body.split('\n'), fields)
+        return sections, parts[0].split('\n')
+    
+    def _batch_key(self, instruction: str, brief: str) -> str:
+        """
+        Cache key for one post's section of a batch reply.
+        
+        Batch answers come from a different prompt than the single-post ones,
+        so they are keyed on what was actually sent for the post (the batch
+        instruction and its brief) and never answer a single-post call.
+        """
+        return self.response_cache.make_key(f'batch\n{instruction}\n{brief}', self.cache_namespace)
+    
+    def generate_insights_batch(self, results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        generate_post_insights for many posts, several posts per request.
+        
+        Posts answered by an earlier batch are served from the response cache;
+        the rest are packed into batch prompts and each parsed section is
+        cached under its own batch key (see _batch_key).
+        
+        Args:
+            results: Analysis results from InstagramAIConfidenceLabeler.analyze_post
+        
+        Returns:
+            One insights dict per result, in order
+        """
+        if not self.is_available:
+            return [dict(UNAVAILABLE_INSIGHTS) for _ in results]
+        
+        insights = [None] * len(results)
+        all_briefs = [self._post_brief(r) for r in results]
+        keys = [self._batch_key(self.INSIGHTS_BATCH_INSTRUCTION, brief) for brief in all_briefs]
+        missing = []
+        for index, key in enumerate(keys):
+            insights[index] = self.response_cache.get(key)
+            if insights[index] is None:
+                missing.append(index)
+        
+        briefs = [all_briefs[index] for index in missing]
+        for batch in self._pack_batches(briefs, self.INSIGHT_TOKENS_PER_POST):
+            try:
+                sections, _ = self._ask_batch(
+                    [briefs[i] for i in batch], self.INSIGHTS_BATCH_INSTRUCTION,
+                    INSIGHT_FIELDS, self.INSIGHT_TOKENS_PER_POST)
+            except Exception as e:
+                for i in batch:
+                    insights[missing[i]] = self._insights_fallback(e)
+                continue
+            
+            for i, section in zip(batch, sections):
+                if section is None:
+                    insights[missing[i]] = dict(MISSING_INSIGHTS)
+                else:
+                    insights[missing[i]] = section
+                    self.response_cache.put(keys[missing[i]], section)
+        
+        return insights
+    
+    def generate_moderation_notes(self, results: List[Dict[str, Any]]) -> List[str]:
+        """
+        One-sentence moderation note per analysis result, several posts per request.
+        
+        Args:
+            results: Analysis results from InstagramAIConfidenceLabeler.analyze_post
+        
+        Returns:
+            One note per result, in order
+        """
+        if not self.is_available:
+            return ['Moderation note unavailable' for _ in results]
+        
+        notes = [None] * len(results)
+        briefs = [self._post_brief(r) for r in results]
+        keys = [self._batch_key(self.NOTES_BATCH_INSTRUCTION, brief) for brief in briefs]
+        missing = []
+        for index, key in enumerate(keys):
+            cached = self.response_cache.get(key)
+            if cached is None:
+                missing.append(index)
+            else:
+                notes[index] = cached['note']
+        
+        for batch in self._pack_batches([briefs[i] for i in missing], self.NOTE_TOKENS_PER_POST):
+            try:
+                sections, _ = self._ask_batch(
+                    [briefs[missing[i]] for i in batch], self.NOTES_BATCH_INSTRUCTION,
+                    NOTE_FIELDS, self.NOTE_TOKENS_PER_POST)
+            except Exception as e:
+                reason = 'Gemini quota exceeded' if isinstance(e, GeminiUnavailable) else f'Error: {str(e)[:50]}'
+                for i in batch:
+                    notes[missing[i]] = f'Moderation note unavailable ({reason})'
+                continue
+            
+            for i, section in zip(batch, sections):
+                if section is None or not section['note']:
+                    notes[missing[i]] = 'Moderation note unavailable'
+                else:
+                    notes[missing[i]] = section['note']
+                    self.response_cache.put(keys[missing[i]], section)
+        
+        return notes
+    
+    def generate_moderation_note(self, result: Dict[str, Any]) -> str:
+        """One-sentence moderation note for a single analysis result."""
+        return self.generate_moderation_notes([result])[0]
+    
+    def compare_posts(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compare a set of analyzed posts with each other.
+        
+        Posts are packed into batches; each batch prompt carries the statistics
+        of the whole set so per-post comparisons stay relative to all posts.
+        When there is more than one batch, the per-batch overviews are merged
+        with one more request.
+        
+        Args:
+            results: Analysis results from InstagramAIConfidenceLabeler.analyze_post
+        
+        Returns:
+            Dictionary with an overall 'summary' and a 'posts' mapping of
+            post_id to a one-sentence comparison
+        """
+        comparison = {'summary': '', 'posts': {}}
+        if not self.is_available or not results:
+            comparison['summary'] = 'Gemini unavailable'
+            return comparison
+        
+        confidences = [r.get('confidence', 0) for r in results]
+        flagged = sum(1 for r in results if r.get('abnormal_signal_count', 0) > 0)
+        preamble = (f"Across all {len(results)} posts: mean confidence "
+                    f"{sum(confidences) / len(confidences):.1f}%, max {max(confidences)}%, "
+                    f"{flagged} with abnormal signals.\n"
+                    f"Start the reply with one line 'OVERALL: <one sentence on the group>'.\n")
+        
+        briefs = [self._post_brief(r) for r in results]
+        overviews = []
+        try:
+            for batch in self._pack_batches(briefs, self.COMPARISON_TOKENS_PER_POST):
+                sections, lead = self._ask_batch(
+                    [briefs[i] for i in batch],
+                    'Compare these social media posts with each other: which look most and '
+                    'least like coordinated or automated engagement, and why.',
+                    COMPARISON_FIELDS, self.COMPARISON_TOKENS_PER_POST, preamble=preamble)
+                overview = self._parse_fields(lead, {'OVERALL': 'overall'})['overall']
+                if overview:
+                    overviews.append(overview)
+                for i, section in zip(batch, sections):
+                    if section is not None:
+                        comparison['posts'][results[i].get('post_id')] = section['comparison']
+            
+            if len(overviews) > 1:
+                comparison['summary'] = self._call(
+                    'Merge these observations about groups of social media posts into a '
+                    'two-sentence summary:\n' + '\n'.join(f'- {o}' for o in overviews),
+                    max_output_tokens=self.COMPARISON_TOKENS_PER_POST * 2).strip()
+            else:
+                comparison['summary'] = overviews[0] if overviews else ''
+        except Exception as e:
+            comparison['summary'] = self._insights_fallback(e)['summary']
+        
+        return comparison
@@ -0,0 +1,95 @@
+"""
+Pluggable client backends for GeminiPostAnalyzer.
+
+A backend hands out model objects with a ``generate_content(prompt,
+generation_config=None)`` method whose reply has a ``.text`` attribute, the
+subset of google.generativeai the analyzer uses. ``google`` talks to the real
+API; ``stub`` talks to a local src.gemini_stub server for offline load tests.
+"""
+
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional
+
+
+class GoogleGeminiClient:
+    """Backend for the hosted Gemini API via google.generativeai."""
+    
+    name = 'google'
+    requires_api_key = True
+    
+    def __init__(self, api_key: Optional[str] = None):
+        import google.generativeai as genai
+        
+        self._genai = genai
+        if api_key:
+            genai.configure(api_key=api_key)
+    
+    def model(self, model_name: str):
+        return self._genai.GenerativeModel(model_name)
+
+
+class StubResponse:
+    """Reply from the stub server, shaped like a GenerateContentResponse."""
+    
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiModel:
+    """Model handle that sends generate_content calls to a stub server."""
+    
+    def __init__(self, base_url: str, model_name: str, timeout: float):
+        self.url = f"{base_url.rstrip('/')}/v1/models/{model_name}:generateContent"
+        self.timeout = timeout
+    
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> StubResponse:
+        body = json.dumps({'contents': prompt, 'generation_config': generation_config or {}}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return StubResponse(json.loads(response.read())['text'])
+        except urllib.error.HTTPError as e:
+            # Same shape as the google client's errors, which callers match on '429'
+            raise RuntimeError(f"{e.code} {e.read().decode('utf-8', 'replace')}") from e
+
+
+class StubGeminiClient:
+    """Backend for a local src.gemini_stub server (no API key, no network egress)."""
+    
+    name = 'stub'
+    requires_api_key = False
+    
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 30.0):
+        self.base_url = base_url or os.getenv('GEMINI_STUB_URL', 'http://127.0.0.1:8765')
+        self.timeout = timeout
+    
+    def model(self, model_name: str) -> StubGeminiModel:
+        return StubGeminiModel(self.base_url, model_name, self.timeout)
+
+
+CLIENT_BACKENDS = {
+    'google': GoogleGeminiClient,
+    'stub': StubGeminiClient
+}
+
+
+def get_gemini_client(backend: Optional[str] = None, api_key: Optional[str] = None):
+    """
+    Build a client backend.
+    
+    Args:
+        backend: 'google' or 'stub'; defaults to GEMINI_BACKEND, then 'google'
+        api_key: API key for backends that need one
+    
+    Returns:
+        Client instance with a model(model_name) method
+    """
+    backend = backend or os.getenv('GEMINI_BACKEND', 'google')
+    if backend not in CLIENT_BACKENDS:
+        raise ValueError(f"Unknown Gemini backend '{backend}'. Choose from {list(CLIENT_BACKENDS)}")
+    if backend == 'google':
+        return GoogleGeminiClient(api_key)
+    return CLIENT_BACKENDS[backend]()
@@ -0,0 +1,165 @@
+"""
+Local stand-in for the Gemini generateContent endpoint.
+
+Serves canned SUMMARY/RISK/ACTION replies (and per-post sections for batch
+prompts) with configurable latency and 429 injection, so the rate limiter,
+response cache and enrichment queue can be load tested without network.
+
+Run with:
+    python -m src.gemini_stub --port 8765 --latency lognormal:-1.2,0.5 --error-rate 0.02
+
+and point the backend at it with GEMINI_BACKEND=stub GEMINI_STUB_URL=http://127.0.0.1:8765.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Build a latency sampler (seconds) from a 'kind:params' spec.
+    
+    Supported kinds: fixed:S, uniform:LO,HI, normal:MEAN,SD,
+    lognormal:MU,SIGMA (of the underlying normal) and exponential:MEAN.
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(',')] if params else []
+    samplers = {
+        'fixed': lambda: values[0],
+        'uniform': lambda: random.uniform(values[0], values[1]),
+        'normal': lambda: random.gauss(values[0], values[1]),
+        'lognormal': lambda: random.lognormvariate(values[0], values[1]),
+        'exponential': lambda: random.expovariate(1.0 / values[0])
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}'. Choose from {list(samplers)}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+def canned_reply(prompt: str) -> str:
+    """Reply in the format the prompt asks for."""
+    posts = re.findall(r'^(\d+)\. ', prompt, re.MULTILINE)
+    if not posts:
+        return ("SUMMARY: Engagement shows a mix of organic and clustered activity.\n"
+                "RISK: Some interactions arrive in tight bursts.\n"
+                "ACTION: Monitor the post for further coordinated activity.")
+    
+    fields = re.findall(r'^([A-Z]+): <one sentence>', prompt, re.MULTILINE)
+    lines = []
+    if 'OVERALL' in prompt:
+        lines.append('OVERALL: Most posts look organic; a few show coordinated bursts.')
+    for number in posts:
+        lines.append(f'### POST {number}')
+        lines.extend(f'{field}: Stub {field.lower()} for post {number}.' for field in fields)
+    return '\n'.join(lines)
+
+
+class GeminiStubServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub's behaviour and counters."""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, latency: Callable[[], float], error_rate: float = 0.0,
+                 requests_per_minute: Optional[int] = None):
+        """
+        Args:
+            address: (host, port) to bind
+            latency: Sampler returning the delay before each reply, in seconds
+            error_rate: Probability of answering any request with a 429
+            requests_per_minute: Server-side quota; requests past it get a 429
+        """
+        super().__init__(address, _StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.counters = {'requests': 0, 'ok': 0, 'rate_limited': 0}
+        self._recent = deque()
+        self._lock = threading.Lock()
+    
+    def admit(self) -> bool:
+        """Count a request and decide whether it gets a 429."""
+        now = time.monotonic()
+        with self._lock:
+            self.counters['requests'] += 1
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            over_quota = self.requests_per_minute is not None and len(self._recent) >= self.requests_per_minute
+            if over_quota or random.random() < self.error_rate:
+                self.counters['rate_limited'] += 1
+                return False
+            self._recent.append(now)
+            self.counters['ok'] += 1
+            return True
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    
+    def do_POST(self):
+        if not self.path.endswith(':generateContent'):
+            self._send(404, {'error': 'not found'})
+            return
+        
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.server.latency())
+        
+        if not self.server.admit():
+            self._send(429, {'error': 'Resource has been exhausted (e.g. check quota).'})
+            return
+        self._send(200, {'text': canned_reply(payload.get('contents', ''))})
+    
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send(200, self.server.stats())
+        else:
+            self._send(404, {'error': 'not found'})
+    
+    def _send(self, code: int, body: Dict) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        # Keep load tests quiet
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Gemini stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0.3',
+                        help='Latency distribution, e.g. fixed:0.3, uniform:0.1,0.6, lognormal:-1.2,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a 429 per request')
+    parser.add_argument('--rpm', type=int, default=None, help='Server-side requests-per-minute quota')
+    args = parser.parse_args()
+    
+    server = GeminiStubServer((args.host, args.port), parse_latency(args.latency),
+                              error_rate=args.error_rate, requests_per_minute=args.rpm)
+    print(f"🧪 Gemini stub listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency}, 429 rate {args.error_rate}, rpm {args.rpm or 'unlimited'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
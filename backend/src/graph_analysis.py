@@ -2,54 +2,124 @@
 Graph-based analysis with proper timestamp handling.
 """
 
-import networkx as nx
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from scipy import sparse
+from scipy.sparse import csgraph
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple
 from collections import defaultdict
 
+if TYPE_CHECKING:
+    import networkx as nx
+
+from .utils import to_epoch_ns
+
 class InteractionGraphAnalyzer:
-    def __init__(self):
+    """
+    Builds user co-interaction graphs and scores them for coordination.
+    
+    Metrics can be computed with networkx (default) or with a scipy.sparse
+    backend that works directly on the weighted adjacency matrix, which is
+    much faster on posts with thousands of users.
+    """
+    
+    BACKENDS = ('networkx', 'sparse')
+    
+    def __init__(self, backend: str = 'networkx'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown graph backend: {backend} (expected one of {self.BACKENDS})")
+        self.backend = backend
         self.thresholds = type('Thresholds', (), {'GRAPH_CLUSTERING_THRESHOLD': 0.3})()
     
-    def build_post_interaction_graph(self, df: pd.DataFrame, time_window_seconds: int = 10) -> nx.Graph:
-        """Build graph where edges connect users who interact within time window."""
-        G = nx.Graph()
+    @staticmethod
+    def _windowed_pairs(sorted_epochs: np.ndarray, window: int, max_pairs: int = 5_000_000):
+        """
+        Yield (left, right) index arrays for every event pair within the window.
         
-        # Add all users as nodes
-        users = df['user_id'].unique()
-        G.add_nodes_from(users)
+        Only pairs that fall inside the window are visited; they are emitted in
+        batches of at most ``max_pairs`` (or one event's worth, if larger) so
+        bursty posts do not materialise every pair at once.
+        """
+        n = len(sorted_epochs)
+        ends = np.searchsorted(sorted_epochs, sorted_epochs + window, side='right')
+        counts = ends - np.arange(n) - 1
+        cumulative = np.cumsum(counts)
+        
+        start = 0
+        while start < n:
+            done = cumulative[start - 1] if start > 0 else 0
+            stop = max(int(np.searchsorted(cumulative, done + max_pairs, side='right')), start + 1)
+            batch_counts = counts[start:stop]
+            left = np.repeat(np.arange(start, stop), batch_counts)
+            run_starts = np.repeat(np.cumsum(batch_counts) - batch_counts, batch_counts)
+            right = left + 1 + (np.arange(len(left)) - run_starts)
+            yield left, right
+            start = stop
+    
+    def build_interaction_matrix(self, df: pd.DataFrame, time_window_seconds: int = 10) -> Tuple[List, sparse.csr_matrix]:
+        """
+        Aggregate co-interaction counts into a sparse weight matrix.
+        
+        Args:
+            df: Interaction DataFrame for one post
+            time_window_seconds: Maximum gap between two interactions to link their users
+        
+        Returns:
+            Tuple of (user labels in first-seen order, upper-triangular CSR matrix
+            where entry (i, j) counts interaction pairs between users i and j)
+        """
+        user_codes, user_index = pd.factorize(df['user_id'])
+        labels = user_index.tolist()
+        num_users = len(labels)
+        weights = sparse.csr_matrix((num_users, num_users), dtype=np.int64)
         
         if len(df) < 2:
-            return G
-        
-        # Make sure timestamps are datetime
-        df = df.copy()
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df_sorted = df.sort_values('timestamp')
-        
-        timestamps = df_sorted['timestamp'].tolist()
-        user_ids = df_sorted['user_id'].tolist()
-        
-        # Create edges between users who interact within the time window
-        for i in range(len(df_sorted)):
-            for j in range(i + 1, len(df_sorted)):
-                time_diff = (timestamps[j] - timestamps[i]).total_seconds()
-                
-                if time_diff <= time_window_seconds:
-                    user_i = user_ids[i]
-                    user_j = user_ids[j]
-                    
-                    if user_i != user_j:
-                        if G.has_edge(user_i, user_j):
-                            G[user_i][user_j]['weight'] += 1
-                        else:
-                            G.add_edge(user_i, user_j, weight=1)
+            return labels, weights
+        
+        epochs = to_epoch_ns(df['timestamp'])
+        order = np.argsort(epochs, kind='stable')
+        sorted_epochs = epochs[order]
+        sorted_codes = user_codes[order]
+        
+        window = int(time_window_seconds * 1_000_000_000)
+        for left, right in self._windowed_pairs(sorted_epochs, window):
+            a, b = sorted_codes[left], sorted_codes[right]
+            distinct = a != b
+            a, b = a[distinct], b[distinct]
+            weights = weights + sparse.coo_matrix(
+                (np.ones(len(a), dtype=np.int64), (np.minimum(a, b), np.maximum(a, b))),
+                shape=(num_users, num_users)
+            ).tocsr()
+        
+        return labels, weights
+    
+    def build_post_interaction_graph(self, df: pd.DataFrame, time_window_seconds: int = 10) -> 'nx.Graph':
+        """Build graph where edges connect users who interact within time window."""
+        labels, weights = self.build_interaction_matrix(df, time_window_seconds)
+        return self.graph_from_matrix(labels, weights)
+    
+    @staticmethod
+    def graph_from_matrix(labels: List, weights: sparse.csr_matrix) -> 'nx.Graph':
+        """Build the networkx graph for a co-interaction matrix from build_interaction_matrix."""
+        # networkx is only needed by this backend; the sparse one never imports it
+        import networkx as nx
+        
+        G = nx.Graph()
+        G.add_nodes_from(labels)
+        
+        # Build the graph once from the aggregated edge list
+        edges = weights.tocoo()
+        G.add_weighted_edges_from(
+            (labels[i], labels[j], w)
+            for i, j, w in zip(edges.row.tolist(), edges.col.tolist(), edges.data.tolist())
+        )
         
         return G
     
-    def calculate_graph_metrics(self, G: nx.Graph) -> Dict[str, Any]:
+    def calculate_graph_metrics(self, G: 'nx.Graph') -> Dict[str, Any]:
         """Calculate graph metrics for coordination detection."""
+        import networkx as nx
+        
         metrics = {
             'num_nodes': G.number_of_nodes(),
             'num_edges': G.number_of_edges(),
@@ -80,26 +150,129 @@ class InteractionGraphAnalyzer:
         
         return metrics
     
+    @staticmethod
+    def _weighted_clustering(weights: sparse.csr_matrix) -> np.ndarray:
+        """
+        Per-node weighted clustering, matching ``nx.clustering(G, weight='weight')``.
+        
+        Weights are normalised by the maximum weight and the triangle intensity
+        of node u is the sum of geometric means over its triangles, i.e. the
+        diagonal of A^3 with A = (W / max(W)) ** (1/3).
+        """
+        num_nodes = weights.shape[0]
+        if weights.nnz == 0:
+            return np.zeros(num_nodes)
+        
+        adjacency = weights.astype(np.float64)
+        adjacency.data = np.cbrt(adjacency.data / adjacency.data.max())
+        triangles = np.asarray((adjacency @ adjacency).multiply(adjacency).sum(axis=1)).ravel()
+        degree = np.diff(adjacency.indptr).astype(np.float64)
+        possible = degree * (degree - 1)
+        
+        clustering = np.zeros(num_nodes)
+        np.divide(triangles, possible, out=clustering, where=possible > 0)
+        return clustering
+    
+    def calculate_sparse_graph_metrics(self, weights: sparse.csr_matrix) -> Dict[str, Any]:
+        """
+        Calculate the same metrics as ``calculate_graph_metrics`` on a sparse matrix.
+        
+        Args:
+            weights: Upper-triangular co-interaction matrix from build_interaction_matrix
+        
+        Returns:
+            Metrics dictionary with the same keys as the networkx path
+        """
+        num_nodes = weights.shape[0]
+        num_edges = weights.nnz
+        metrics = {
+            'num_nodes': num_nodes,
+            'num_edges': num_edges,
+            'density': 0,
+            'avg_clustering': 0,
+            'connected_components': num_nodes,
+            'is_abnormal': False,
+            'value': 0
+        }
+        
+        if num_nodes < 2:
+            return metrics
+        
+        metrics['density'] = 2 * num_edges / (num_nodes * (num_nodes - 1))
+        
+        symmetric = (weights + weights.T).tocsr()
+        metrics['avg_clustering'] = float(self._weighted_clustering(symmetric).mean())
+        
+        num_components, _ = csgraph.connected_components(symmetric, directed=False)
+        metrics['connected_components'] = int(num_components)
+        
+        # COORDINATED: High clustering coefficient (>0.3)
+        metrics['is_abnormal'] = metrics['avg_clustering'] > self.thresholds.GRAPH_CLUSTERING_THRESHOLD
+        metrics['value'] = metrics['avg_clustering']
+        
+        return metrics
+    
+    def _find_sparse_clusters(self, labels: List, weights: sparse.csr_matrix) -> List[List]:
+        """Find components of 3+ users whose internal density exceeds 0.3."""
+        if len(labels) < 3:
+            return []
+        
+        num_components, component_of = csgraph.connected_components(weights, directed=False)
+        sizes = np.bincount(component_of, minlength=num_components)
+        edge_rows = weights.tocoo().row
+        edge_counts = np.bincount(component_of[edge_rows], minlength=num_components)
+        
+        possible = sizes * (sizes - 1) / 2
+        density = np.zeros(num_components)
+        np.divide(edge_counts, possible, out=density, where=possible > 0)
+        
+        clusters = []
+        for component in np.flatnonzero((sizes >= 3) & (density > 0.3)):
+            members = np.flatnonzero(component_of == component)
+            clusters.append([labels[i] for i in members])
+        return clusters
+    
     def analyze_post_patterns(self, post_id: str, df: pd.DataFrame) -> Dict[str, Any]:
         """Complete graph analysis for a post."""
         # Build graph with 10-second window
-        G = self.build_post_interaction_graph(df, time_window_seconds=10)
-        metrics = self.calculate_graph_metrics(G)
-        
-        # Find dense clusters
-        coordinated_clusters = []
-        if G.number_of_nodes() >= 3:
-            components = list(nx.connected_components(G))
-            for component in components:
-                if len(component) >= 3:
-                    subgraph = G.subgraph(component)
-                    density = nx.density(subgraph)
-                    if density > 0.3:
-                        coordinated_clusters.append(list(component))
+        labels, weights = self.build_interaction_matrix(df, time_window_seconds=10)
+        return self.analyze_interaction_matrix(post_id, labels, weights)
+    
+    def analyze_interaction_matrix(self, post_id: str, labels: List, weights: sparse.csr_matrix) -> Dict[str, Any]:
+        """
+        Graph analysis of an already aggregated co-interaction matrix.
+        
+        Args:
+            post_id: Post the matrix belongs to
+            labels: User labels in first-seen order
+            weights: Upper-triangular co-interaction matrix, as from build_interaction_matrix
+        
+        Returns:
+            Same dictionary as analyze_post_patterns
+        """
+        if self.backend == 'sparse':
+            metrics = self.calculate_sparse_graph_metrics(weights)
+            coordinated_clusters = self._find_sparse_clusters(labels, weights)
+        else:
+            import networkx as nx
+            
+            G = self.graph_from_matrix(labels, weights)
+            metrics = self.calculate_graph_metrics(G)
+            
+            # Find dense clusters
+            coordinated_clusters = []
+            if G.number_of_nodes() >= 3:
+                components = list(nx.connected_components(G))
+                for component in components:
+                    if len(component) >= 3:
+                        subgraph = G.subgraph(component)
+                        density = nx.density(subgraph)
+                        if density > 0.3:
+                            coordinated_clusters.append(list(component))
         
         return {
             'post_id': post_id,
             'graph_metrics': metrics,
             'coordinated_clusters': coordinated_clusters[:3],
             'is_abnormal': metrics['is_abnormal']
-        }
+        }
\ No newline at end of file
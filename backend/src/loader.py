@@ -3,28 +3,59 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Iterator, Tuple, Optional
 import os
+import tempfile
+
+from .utils import to_epoch_ns
 
 
 class InteractionDataLoader:
     """
     Loads and validates platform interaction events.
     
-    In production, this would connect to event streams or data lakes.
-    For this implementation, we support CSV and in-memory data structures.
+    This covers CSV, Parquet and Arrow IPC files and in-memory data
+    structures; live event streams are consumed by src.event_stream.
     """
     
-    def __init__(self, data_source: Optional[str] = None):
+    # File extensions read through pyarrow.dataset instead of pandas' CSV reader
+    COLUMNAR_FORMATS = {
+        '.parquet': 'parquet',
+        '.pq': 'parquet',
+        '.arrow': 'ipc',
+        '.feather': 'ipc',
+        '.ipc': 'ipc'
+    }
+    
+    # Column dtypes of the spill files written by _spill_chunk
+    SPILL_DTYPES = {'post_id': str, 'user_id': str, 'action_type': str}
+    # Written for missing values in spill files, so IDs such as "NA" or "null"
+    # read back as the strings they are
+    SPILL_NA = '\\N'
+    # How many times an oversized spill partition may be re-split
+    MAX_RESPLIT_LEVELS = 8
+    
+    def __init__(self, data_source: Optional[str] = None, compact: bool = False,
+                 post_ids: Optional[List[str]] = None,
+                 start_time: Optional[str] = None, end_time: Optional[str] = None):
         """
         Initialize the data loader.
         
         Args:
             data_source: Either a file path (str) or pandas DataFrame
+            compact: Emit the compact representation (see to_compact)
+            post_ids: Only load interactions for these posts
+            start_time: Only load interactions at or after this time
+            end_time: Only load interactions at or before this time
         """
         self.data_source = data_source
+        self.compact = compact
+        self.post_ids = list(post_ids) if post_ids is not None else None
+        self.start_time = pd.Timestamp(start_time) if start_time is not None else None
+        self.end_time = pd.Timestamp(end_time) if end_time is not None else None
         self.required_columns = ['post_id', 'user_id', 'timestamp', 'action_type']
         self.valid_actions = ['share', 'repost', 'like', 'comment']
+        self.csv_dtypes = {'post_id': str, 'user_id': str, 'timestamp': str, 'action_type': str}
     
     def load_data(self) -> pd.DataFrame:
         """
@@ -48,11 +79,19 @@ class InteractionDataLoader:
             if not os.path.exists(self.data_source):
                 raise FileNotFoundError(f"Data file not found: {self.data_source}")
             
-            try:
-                df = pd.read_csv(self.data_source)
-                print(f"✓ Successfully loaded data from {self.data_source}")
-            except Exception as e:
-                raise ValueError(f"Failed to read CSV file: {e}")
+            if self._source_format() == 'csv':
+                try:
+                    df = pd.read_csv(self.data_source)
+                except Exception as e:
+                    raise ValueError(f"Failed to read CSV file: {e}")
+            else:
+                dataset = self._columnar_dataset()
+                try:
+                    df = dataset.to_table(columns=self.required_columns,
+                                          filter=self._pushdown_filter(dataset)).to_pandas()
+                except Exception as e:
+                    raise ValueError(f"Failed to read {self._source_format()} file: {e}")
+            print(f"✓ Successfully loaded data from {self.data_source}")
                 
         elif isinstance(self.data_source, pd.DataFrame):
             df = self.data_source.copy()
@@ -60,17 +99,271 @@ class InteractionDataLoader:
         else:
             raise ValueError(f"Unsupported data source type: {type(self.data_source)}")
         
-        # Validate and clean data
-        df = self._validate_data(df)
+        # Validate and clean data (df is already our own copy)
+        df = self._apply_filters(self._validate_data(df, copy=False))
+        
+        if self.compact:
+            df = self.to_compact(df)
         
         return df
     
-    def _validate_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    def to_compact(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert validated interactions to the compact internal representation.
+        
+        post_id, user_id and action_type become categoricals and timestamp
+        becomes int64 epoch nanoseconds. The feature, entropy and graph modules
+        consume this form directly, without per-element datetime arithmetic.
+        
+        Args:
+            df: Validated interaction DataFrame
+        
+        Returns:
+            DataFrame with compact dtypes
+        """
+        return df.assign(
+            post_id=df['post_id'].astype('category'),
+            user_id=df['user_id'].astype('category'),
+            action_type=pd.Categorical(df['action_type'], categories=self.valid_actions),
+            timestamp=to_epoch_ns(df['timestamp'])
+        )
+    
+    def iter_post_groups(self, chunksize: int = 500_000, num_buckets: Optional[int] = None,
+                         spill_dir: Optional[str] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Stream a file source as complete, validated per-post groups.
+        
+        The file is read in chunks (CSV with explicit dtypes, Parquet/Arrow as
+        record batches with column projection and filter pushdown); each chunk is validated
+        and spilled to one of ``num_buckets`` on-disk partitions by a hash of
+        post_id. Every post therefore lands in exactly one partition, which is
+        then loaded, deduplicated, sorted and split into posts on its own. A
+        partition that ends up with more than ``chunksize`` rows (a larger file
+        than estimated, or skewed post sizes) is re-split by a second hash
+        before it is loaded. Peak memory is therefore bounded by about two
+        chunks rather than the whole file (a single post is always loaded whole).
+        
+        Args:
+            chunksize: Rows read from the file per chunk, and the target
+                number of rows per partition
+            num_buckets: Number of spill partitions (default: estimated row
+                count / chunksize)
+            spill_dir: Directory for spill files (defaults to the system temp dir)
+        
+        Yields:
+            (post_id, DataFrame) pairs, each sorted by timestamp (and compact
+            if the loader was built with compact=True). Posts are ordered by
+            partition, then post_id, not by position in the file.
+        
+        Raises:
+            ValueError: If the source is not a file path or has invalid columns
+            FileNotFoundError: If data file doesn't exist
+        """
+        if not isinstance(self.data_source, str):
+            raise ValueError("Streaming mode requires a file path as data source")
+        if not os.path.exists(self.data_source):
+            raise FileNotFoundError(f"Data file not found: {self.data_source}")
+        
+        with tempfile.TemporaryDirectory(prefix='interactions_', dir=spill_dir) as tmp_dir:
+            try:
+                if num_buckets is None:
+                    num_buckets = max(1, -(-self._estimate_rows() // chunksize))
+                bucket_paths = [os.path.join(tmp_dir, f'bucket_{i:04d}.csv') for i in range(num_buckets)]
+                bucket_rows = [0] * num_buckets
+                
+                for chunk in self._iter_raw_chunks(chunksize):
+                    chunk = self._apply_filters(self._validate_data(chunk, copy=False, sort=False))
+                    self._spill_chunk(chunk, bucket_paths, bucket_rows)
+            except (ValueError, ImportError):
+                raise
+            except Exception as e:
+                raise ValueError(f"Failed to read {self._source_format()} file: {e}")
+            
+            for path, rows in zip(bucket_paths, bucket_rows):
+                if not rows:
+                    continue
+                for bucket in self._load_partition(path, rows, chunksize):
+                    # Duplicates of a post always share a bucket, so this dedups globally
+                    bucket = bucket.drop_duplicates(subset=self.required_columns)
+                    if self.compact:
+                        bucket = self.to_compact(bucket)
+                    for post_id, group in bucket.groupby('post_id', observed=True):
+                        yield post_id, group.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    
+    def _estimate_rows(self) -> int:
+        """
+        Estimate the source's row count without reading it all.
+        
+        Parquet/Arrow files report it from their metadata; for CSV the file
+        size is divided by the average line length of the first megabyte.
+        """
+        if self._source_format() != 'csv':
+            return self._columnar_dataset().count_rows()
+        
+        with open(self.data_source, 'rb') as f:
+            sample = f.read(1 << 20)
+        lines = max(1, sample.count(b'\n'))
+        return int(os.path.getsize(self.data_source) * lines / max(1, len(sample)))
+    
+    def _load_partition(self, path: str, rows: int, chunksize: int,
+                        level: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Load a spill partition, re-splitting it first if it has more than chunksize rows.
+        
+        Each re-split hashes post_id with a different key, so posts that shared
+        a partition are spread out again; it stops once a partition holds a
+        single post, or after MAX_RESPLIT_LEVELS levels.
+        """
+        if rows > chunksize and level < self.MAX_RESPLIT_LEVELS:
+            sub_count = -(-rows // chunksize)
+            sub_paths = [f'{path[:-4]}_{i:04d}.csv' for i in range(sub_count)]
+            sub_rows = [0] * sub_count
+            post_ids = set()
+            for piece in self._read_spill(path, chunksize=chunksize):
+                post_ids.update(piece['post_id'].unique())
+                self._write_partitions(piece, sub_paths, sub_rows, level + 1)
+            os.remove(path)
+            
+            if len(post_ids) > 1:
+                for sub_path, count in zip(sub_paths, sub_rows):
+                    if count:
+                        yield from self._load_partition(sub_path, count, chunksize, level + 1)
+                return
+            path = sub_paths[sub_rows.index(rows)]
+        
+        bucket = self._read_spill(path)
+        os.remove(path)
+        bucket['timestamp'] = pd.to_datetime(bucket['timestamp'], unit='ns')
+        yield bucket
+    
+    def _source_format(self) -> str:
+        """Return 'csv', 'parquet' or 'ipc' based on the source file extension."""
+        extension = os.path.splitext(self.data_source)[1].lower()
+        return self.COLUMNAR_FORMATS.get(extension, 'csv')
+    
+    def _columnar_dataset(self):
+        """Open the source as a pyarrow dataset (Parquet or Arrow IPC)."""
+        try:
+            import pyarrow.dataset as ds
+        except ImportError:
+            raise ImportError("pyarrow is required to read Parquet/Arrow files (pip install pyarrow)")
+        
+        dataset = ds.dataset(self.data_source, format=self._source_format())
+        missing_cols = set(self.required_columns) - set(dataset.schema.names)
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        return dataset
+    
+    def _pushdown_filter(self, dataset):
+        """
+        Build a pyarrow filter expression for the configured post/time filters.
+        
+        Time bounds are only pushed down when the file stores a real timestamp
+        column; string timestamps are filtered after parsing by _apply_filters.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        
+        conditions = []
+        if self.post_ids is not None:
+            post_type = dataset.schema.field('post_id').type
+            if pa.types.is_dictionary(post_type):
+                # Categorical column: match against the dictionary's values
+                post_type = post_type.value_type
+            conditions.append(ds.field('post_id').isin(pa.array(self.post_ids).cast(post_type)))
+        
+        time_type = dataset.schema.field('timestamp').type
+        if pa.types.is_timestamp(time_type):
+            if self.start_time is not None:
+                start = self._align_timezone(self.start_time, time_type.tz)
+                conditions.append(ds.field('timestamp') >= pa.scalar(start, type=time_type))
+            if self.end_time is not None:
+                end = self._align_timezone(self.end_time, time_type.tz)
+                conditions.append(ds.field('timestamp') <= pa.scalar(end, type=time_type))
+        
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+    
+    def _iter_raw_chunks(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Yield raw DataFrame chunks from a CSV, Parquet or Arrow IPC source."""
+        if self._source_format() == 'csv':
+            yield from pd.read_csv(self.data_source, dtype=self.csv_dtypes, chunksize=chunksize)
+            return
+        
+        dataset = self._columnar_dataset()
+        for batch in dataset.to_batches(columns=self.required_columns,
+                                        filter=self._pushdown_filter(dataset),
+                                        batch_size=chunksize):
+            yield batch.to_pandas()
+    
+    @staticmethod
+    def _align_timezone(bound: pd.Timestamp, tz) -> pd.Timestamp:
+        """
+        Express a time bound in a timestamp column's timezone so the two compare.
+        
+        A naive bound against a tz-aware column is read as local time in that
+        column's zone; a tz-aware bound against a naive column is converted to
+        UTC, the zone naive timestamps are taken to be in (see to_epoch_ns).
+        """
+        if tz is None:
+            return bound.tz_convert('UTC').tz_localize(None) if bound.tzinfo is not None else bound
+        return bound.tz_localize(tz) if bound.tzinfo is None else bound.tz_convert(tz)
+    
+    def _apply_filters(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the post/time filters to a validated DataFrame."""
+        if self.post_ids is None and self.start_time is None and self.end_time is None:
+            return df
+        
+        keep = pd.Series(True, index=df.index)
+        if self.post_ids is not None:
+            keep &= df['post_id'].astype(str).isin([str(p) for p in self.post_ids])
+        tz = getattr(df['timestamp'].dtype, 'tz', None)
+        if self.start_time is not None:
+            keep &= df['timestamp'] >= self._align_timezone(self.start_time, tz)
+        if self.end_time is not None:
+            keep &= df['timestamp'] <= self._align_timezone(self.end_time, tz)
+        return df[keep].reset_index(drop=True)
+    
+    def _spill_chunk(self, chunk: pd.DataFrame, bucket_paths: List[str], bucket_rows: List[int]) -> None:
+        """Append a validated chunk to its hash partitions on disk."""
+        if chunk.empty:
+            return
+        
+        chunk = chunk[self.required_columns]
+        chunk = chunk.assign(timestamp=to_epoch_ns(chunk['timestamp']))
+        self._write_partitions(chunk, bucket_paths, bucket_rows)
+    
+    def _read_spill(self, path: str, **kwargs):
+        """Read a spill file, keeping every ID string as written."""
+        return pd.read_csv(path, dtype=self.SPILL_DTYPES, keep_default_na=False,
+                           na_values=[self.SPILL_NA], **kwargs)
+    
+    @staticmethod
+    def _write_partitions(frame: pd.DataFrame, paths: List[str], rows: List[int], level: int = 0) -> None:
+        """
+        Append rows to ``paths`` by a hash of post_id, counting rows per path.
+        
+        ``level`` selects the hash key, so re-splitting a partition at the next
+        level does not send its rows back to a single path.
+        """
+        hashes = pd.util.hash_pandas_object(frame['post_id'].astype(str), index=False,
+                                            hash_key=f'{level:016d}')
+        for bucket_id, part in frame.groupby(hashes.to_numpy() % len(paths)):
+            path = paths[bucket_id]
+            part.to_csv(path, mode='a', header=not os.path.exists(path), index=False,
+                        na_rep=InteractionDataLoader.SPILL_NA)
+            rows[bucket_id] += len(part)
+    
+    def _validate_data(self, df: pd.DataFrame, copy: bool = True, sort: bool = True) -> pd.DataFrame:
         """
         Validate and clean interaction data.
         
         Args:
             df: Raw DataFrame to validate
+            copy: Whether to copy df first; pass False when the caller owns it
+            sort: Whether to sort the result by timestamp
         
         Returns:
             Cleaned and validated DataFrame
@@ -81,7 +374,7 @@ class InteractionDataLoader:
             raise ValueError(f"Missing required columns: {missing_cols}")
         
         # Make a copy to avoid modifying original
-        df_clean = df.copy()
+        df_clean = df.copy() if copy else df
         
         # Convert timestamp to datetime
         try:
@@ -102,7 +395,8 @@ class InteractionDataLoader:
         )
         
         # Sort by timestamp
-        df_clean = df_clean.sort_values('timestamp')
+        if sort:
+            df_clean = df_clean.sort_values('timestamp')
         
         # Reset index
         df_clean = df_clean.reset_index(drop=True)
@@ -123,7 +417,7 @@ class InteractionDataLoader:
             return {}
         
         groups = {}
-        for post_id, group in df.groupby('post_id'):
+        for post_id, group in df.groupby('post_id', observed=True):
             groups[post_id] = group.sort_values('timestamp').reset_index(drop=True)
         
         return groups
@@ -0,0 +1,196 @@
+"""Rate limiting and circuit breaking for Gemini API calls."""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class GeminiRateLimiter:
+    """
+    Token-bucket limiter over both requests-per-minute and tokens-per-minute.
+    
+    Each call takes one request and its estimated token count from two
+    buckets that refill continuously. Callers wait for capacity up to a
+    timeout instead of sleeping a fixed amount, and get False back if the
+    budget will not free up in time so they can degrade fast.
+    """
+    
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """
+        Initialize the limiter.
+        
+        Args:
+            requests_per_minute: Sustained request budget (also the burst size)
+            tokens_per_minute: Sustained token budget (also the burst size)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_budget = min(self.requests_per_minute,
+                                   self._request_budget + elapsed * self.requests_per_minute / 60.0)
+        self._token_budget = min(self.tokens_per_minute,
+                                 self._token_budget + elapsed * self.tokens_per_minute / 60.0)
+    
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """
+        Take one request and ``tokens`` tokens, waiting for capacity if needed.
+        
+        Args:
+            tokens: Estimated tokens for the call (clamped to the bucket size)
+            timeout: Maximum seconds to wait; None waits indefinitely
+        
+        Returns:
+            True if the budget was taken, False if it would not be available in time
+        """
+        tokens = min(float(tokens), float(self.tokens_per_minute))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._request_budget >= 1 and self._token_budget >= tokens:
+                    self._request_budget -= 1
+                    self._token_budget -= tokens
+                    return True
+                
+                wait = max(
+                    (1 - self._request_budget) * 60.0 / self.requests_per_minute,
+                    (tokens - self._token_budget) * 60.0 / self.tokens_per_minute,
+                    0.0
+                )
+            
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+    
+    def status(self) -> Dict[str, Any]:
+        """Current budgets for health reporting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'requests_available': round(self._request_budget, 2),
+                'tokens_available': int(self._token_budget)
+            }
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker with jittered exponential backoff.
+    
+    A rate-limit error opens the circuit at once; other errors open it after
+    ``failure_threshold`` consecutive failures. While open, calls are refused
+    immediately. Once the backoff expires a single trial call is let through
+    (half-open): success closes the circuit, failure re-opens it with a
+    longer backoff.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 3, base_backoff_seconds: float = 10.0,
+                 max_backoff_seconds: float = 300.0, jitter: float = 0.2):
+        """
+        Initialize the breaker.
+        
+        Args:
+            failure_threshold: Consecutive non-rate-limit failures that open the circuit
+            base_backoff_seconds: Backoff after the first opening
+            max_backoff_seconds: Upper bound for the backoff
+            jitter: Relative random spread applied to each backoff
+        """
+        self.failure_threshold = failure_threshold
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.jitter = jitter
+        self.state = self.CLOSED
+        self._failures = 0
+        self._openings = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        """Whether a call may proceed now (claims the trial slot when half-opening)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self._open_until:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def release_trial(self) -> None:
+        """Hand back an unused half-open trial so the next caller can take it."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._open_until = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._openings = 0
+    
+    def record_failure(self, rate_limited: bool = False) -> None:
+        with self._lock:
+            self._failures += 1
+            if rate_limited or self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+    
+    def _open(self) -> None:
+        """Open the circuit (caller holds the lock)."""
+        backoff = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** self._openings))
+        backoff *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._openings += 1
+        self._failures = 0
+        self._open_until = time.monotonic() + backoff
+        self.state = self.OPEN
+    
+    def retry_after(self) -> float:
+        """Seconds until a trial call will be allowed (0 when closed)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+    
+    def status(self) -> Dict[str, Any]:
+        return {'state': self.state, 'retry_after_seconds': round(self.retry_after(), 1)}
+
+
+_shared_limiter: Optional[GeminiRateLimiter] = None
+_shared_breaker: Optional[CircuitBreaker] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_gemini_guards():
+    """
+    Process-wide limiter and breaker shared by every GeminiPostAnalyzer.
+    
+    Budgets come from GEMINI_RPM and GEMINI_TPM (defaults match the free tier
+    of the flash models), so rebuilding an analyzer does not reset them.
+    
+    Returns:
+        Tuple of (GeminiRateLimiter, CircuitBreaker)
+    """
+    global _shared_limiter, _shared_breaker
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = GeminiRateLimiter(
+                requests_per_minute=float(os.getenv('GEMINI_RPM', '10')),
+                tokens_per_minute=float(os.getenv('GEMINI_TPM', '250000'))
+            )
+            _shared_breaker = CircuitBreaker()
+        return _shared_limiter, _shared_breaker
@@ -0,0 +1,203 @@
+"""Content-addressed caches for Gemini responses and video analysis results."""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def json_default(value: Any) -> Any:
+    """``json.dumps`` fallback for the numpy scalars and arrays analysis results contain."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class ResponseCache:
+    """
+    Two-level (memory LRU + SQLite) cache of JSON-serializable dicts.
+    
+    Both levels honour the same TTL; the memory level is bounded by
+    ``max_memory_entries`` and the disk level by ``max_disk_entries``, evicting
+    least recently used entries first. Several processes may share one SQLite
+    file; if it is locked or unwritable, lookups count as misses and stores
+    are skipped rather than failing the caller.
+    """
+    
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = 24 * 3600,
+                 max_memory_entries: int = 1024, max_disk_entries: int = 50_000):
+        """
+        Initialize the cache.
+        
+        Args:
+            path: SQLite file for the disk level; None keeps the cache in memory only
+            ttl_seconds: Age after which an entry is treated as missing
+            max_memory_entries: Size of the in-process LRU
+            max_disk_entries: Rows kept in the SQLite file
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created REAL NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Response cache disabled on disk ({path}): {e}")
+                self._db = None
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+        
+        Returns:
+            A copy of the cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return dict(value)
+                del self._memory[key]
+            
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        if now - row[1] <= self.ttl_seconds:
+                            self._db.execute(
+                                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                            )
+                            self._db.commit()
+                            value = json.loads(row[0])
+                            self._remember(key, row[1], value)
+                            self.hits += 1
+                            self.disk_hits += 1
+                            return dict(value)
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error:
+                    self._db.rollback()
+            
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response in both levels, evicting the oldest entries past the bounds."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, dict(value))
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created, accessed) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(value, default=json_default), now, now)
+                    )
+                    self._db.execute(
+                        "DELETE FROM responses WHERE created < ? OR key IN ("
+                        "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                        (now - self.ttl_seconds, self.max_disk_entries)
+                    )
+                    self._db.commit()
+                except sqlite3.Error:
+                    self._db.rollback()
+    
+    def _remember(self, key: str, created: float, value: Dict[str, Any]) -> None:
+        """Insert into the memory LRU (caller holds the lock)."""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes for health reporting."""
+        with self._lock:
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'path': self.path
+            }
+
+
+class GeminiResponseCache(ResponseCache):
+    """
+    Cache for parsed Gemini responses.
+    
+    Entries are keyed on a hash of the model name and the whitespace-normalized
+    prompt. Prompts that do not name the post (see
+    GeminiPostAnalyzer._insights_prompt) are therefore shared by every post
+    that scored the same, and cost one API call between them.
+    """
+    
+    @staticmethod
+    def make_key(prompt: str, model_name: Optional[str]) -> str:
+        """Hash of the model name and the prompt with whitespace collapsed."""
+        normalized = re.sub(r'\s+', ' ', prompt).strip()
+        return hashlib.sha256(f"{model_name}\n{normalized}".encode('utf-8')).hexdigest()
+
+
+_shared_cache: Optional[GeminiResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_response_cache() -> GeminiResponseCache:
+    """
+    Process-wide cache shared by every GeminiPostAnalyzer.
+    
+    The SQLite file comes from GEMINI_CACHE_PATH (set it empty for a
+    memory-only cache) and the TTL from GEMINI_CACHE_TTL seconds.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            path = os.getenv('GEMINI_CACHE_PATH',
+                             os.path.join(tempfile.gettempdir(), 'gemini_response_cache.sqlite3'))
+            _shared_cache = GeminiResponseCache(
+                path=path or None,
+                ttl_seconds=float(os.getenv('GEMINI_CACHE_TTL', str(24 * 3600)))
+            )
+        return _shared_cache
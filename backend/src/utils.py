@@ -5,6 +5,9 @@ Utility functions and thresholds for Instagram AI Confidence Labeler.
 from dataclasses import dataclass
 from typing import Dict
 
+import numpy as np
+import pandas as pd
+
 @dataclass
 class DetectionThresholds:
     SPREAD_SPEED_THRESHOLD_SECONDS: float = 60.0
@@ -15,6 +18,24 @@ class DetectionThresholds:
     ENTROPY_THRESHOLD: float = 2.5
     GRAPH_CLUSTERING_THRESHOLD: float = 0.30
 
+def to_epoch_ns(timestamps) -> np.ndarray:
+    """
+    Convert timestamps to an int64 array of nanosecond epochs.
+    
+    Integer arrays/Series are taken to already be epoch nanoseconds (the
+    compact form emitted by InteractionDataLoader); anything else is parsed
+    with pd.to_datetime.
+    """
+    if isinstance(timestamps, (pd.Series, pd.Index, np.ndarray)) and pd.api.types.is_integer_dtype(timestamps.dtype):
+        return np.asarray(timestamps, dtype=np.int64)
+    return pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+def epoch_ns(timestamp) -> int:
+    """Epoch nanoseconds of a single timestamp; integers are taken as epoch ns, as in to_epoch_ns."""
+    if isinstance(timestamp, (int, np.integer)) and not isinstance(timestamp, bool):
+        return int(timestamp)
+    return pd.Timestamp(timestamp).value
+
 def calculate_confidence_score(abnormal_count: int) -> int:
     """Calculate confidence score based on number of abnormal signals."""
     if abnormal_count >= 5:
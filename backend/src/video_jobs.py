@@ -0,0 +1,398 @@
+"""Background video analysis on a bounded pool of worker processes."""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from .analyzers import create_analyzer
+from .response_cache import json_default
+
+
+class QueueFullError(Exception):
+    """Raised by VideoJobQueue.submit when too many jobs are already waiting."""
+
+
+# Analyzer reused by every job a worker process runs
+_worker_analyzer = None
+
+
+def _init_video_worker(analyzer_options: Dict[str, Any]) -> None:
+    """Build the video analyzer once per worker process."""
+    global _worker_analyzer
+    _worker_analyzer = create_analyzer('video', **analyzer_options)
+
+
+def _worker_analyzer_options(analyzer_options: Optional[Dict[str, Any]], max_workers: int) -> Dict[str, Any]:
+    """Analyzer options for pool workers: unless set, each worker's stage threads get its share of the cores."""
+    return {'stage_workers': max(1, (os.cpu_count() or 1) // max_workers), **(analyzer_options or {})}
+
+
+def _run_video_job(video_path: str) -> Dict[str, Any]:
+    return _worker_analyzer.analyze_video(video_path)
+
+
+def _init_video_batch_worker(analyzer_options: Dict[str, Any]) -> None:
+    """Batch worker setup: progress prints go to stderr so stdout can carry JSON Lines."""
+    sys.stdout = sys.stderr
+    _init_video_worker(analyzer_options)
+
+
+def _run_video_batch_item(video_path: str) -> Dict[str, Any]:
+    """Analyze one batch video, returning a record instead of raising so one bad file does not stop the batch."""
+    started = time.time()
+    try:
+        result = _worker_analyzer.analyze_video(video_path)
+    except Exception as e:
+        return {'video_path': video_path, 'status': 'failed', 'error': f'{type(e).__name__}: {e}',
+                'elapsed_seconds': round(time.time() - started, 3)}
+    return {'video_path': video_path, 'status': 'done', 'result': result,
+            'elapsed_seconds': round(time.time() - started, 3)}
+
+
+class VideoJobQueue:
+    """
+    Runs VideoAIAnalyzer.analyze_video off the request path.
+    
+    Jobs go to a process pool (decoding and OpenCV work are CPU-bound) whose
+    workers each keep one warm analyzer. At most ``max_pending`` jobs may be
+    queued or running; past that, submit() raises QueueFullError so callers
+    can push back instead of piling up work. Finished results are kept for
+    ``result_ttl_seconds`` and pruned on each submit. If a worker dies (e.g.
+    out of memory), the jobs that were in the broken pool fail and the next
+    submit starts a new pool.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 16,
+                 result_ttl_seconds: float = 3600.0,
+                 analyzer_options: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the queue.
+        
+        Args:
+            max_workers: Worker processes (default: CPU count, at most 4)
+            max_pending: Most jobs queued or running at once
+            result_ttl_seconds: How long finished results stay available
+            analyzer_options: Keyword arguments for each worker's VideoAIAnalyzer
+                (stage_workers defaults to the CPU count divided by max_workers)
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.result_ttl_seconds = result_ttl_seconds
+        self.analyzer_options = _worker_analyzer_options(analyzer_options, self.max_workers)
+        self.pool_restarts = 0
+        self._executor = self._start_pool()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, video_path: str, on_finished: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Queue a video for analysis.
+        
+        Args:
+            video_path: Path of the video file, readable by the worker processes
+            on_finished: Called with the job ID once the job finishes (e.g. to
+                delete an uploaded file)
+        
+        Returns:
+            Job ID to pass to get()
+        
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            if self.pending_count() >= self.max_pending:
+                raise QueueFullError(f'{self.max_pending} video jobs already pending')
+            try:
+                future = self._executor.submit(_run_video_job, video_path)
+            except BrokenProcessPool:
+                # A worker died earlier; its jobs have already failed, later ones get a new pool
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._start_pool()
+                self.pool_restarts += 1
+                future = self._executor.submit(_run_video_job, video_path)
+            self._jobs[job_id] = {'submitted_at': time.time(), 'finished_at': None, 'future': future}
+        
+        def finished(f: Future) -> None:
+            self._mark_finished(job_id)
+            if on_finished is not None:
+                on_finished(job_id)
+        
+        future.add_done_callback(finished)
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+        
+        Returns:
+            Dict with job_id, status ('queued', 'running', 'done' or 'failed')
+            and either result or error; None if the job is unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        
+        future: Future = job['future']
+        if not future.done():
+            return {'job_id': job_id, 'status': 'running' if future.running() else 'queued'}
+        
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            return {'job_id': job_id, 'status': 'failed', 'error': f'Worker process died: {error}'}
+        if error is not None:
+            return {'job_id': job_id, 'status': 'failed', 'error': str(error)}
+        return {
+            'job_id': job_id,
+            'status': 'done',
+            'elapsed_seconds': round(job['finished_at'] - job['submitted_at'], 3) if job['finished_at'] else None,
+            'result': future.result()
+        }
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes (or timeout) and return get(job_id)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            try:
+                job['future'].result(timeout=timeout)
+            except Exception:
+                pass
+        return self.get(job_id)
+    
+    def pending_count(self) -> int:
+        """Jobs queued or running."""
+        return sum(1 for job in list(self._jobs.values()) if not job['future'].done())
+    
+    def status(self) -> Dict[str, Any]:
+        """Queue depth for health reporting."""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': self.pending_count(),
+                'max_pending': self.max_pending,
+                'tracked_jobs': len(self._jobs),
+                'pool_restarts': self.pool_restarts
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and stop the worker processes."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+    
+    def _start_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_video_worker,
+                                   initargs=(self.analyzer_options,))
+    
+    def _mark_finished(self, job_id: str) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]['finished_at'] = time.time()
+    
+    def _prune(self) -> None:
+        """Drop finished jobs older than the TTL (caller holds the lock)."""
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.avi', '.mkv', '.webm')
+
+
+def discover_videos(source: str) -> List[str]:
+    """
+    List the videos a batch should analyze.
+    
+    Args:
+        source: A directory (searched recursively for VIDEO_EXTENSIONS files)
+            or a manifest file with one path per line. Manifest lines may
+            instead be JSON objects with a ``video_path`` key; blank lines and
+            ``#`` comments are skipped, and relative paths are resolved
+            against the manifest's directory.
+    
+    Returns:
+        Absolute paths in a stable order, without duplicates
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if name.lower().endswith(VIDEO_EXTENSIONS))
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        paths = []
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('{'):
+                    line = json.loads(line)['video_path']
+                paths.append(os.path.join(base_dir, line))
+    
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+
+def load_completed_videos(resume_path: str) -> Set[str]:
+    """
+    Videos a resume file records as done.
+    
+    Failed videos are not included, so a resumed run retries them. A line
+    cut short by an interruption is ignored.
+    """
+    completed = set()
+    if not os.path.exists(resume_path):
+        return completed
+    with open(resume_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('status') == 'done':
+                completed.add(entry['video_path'])
+    return completed
+
+
+def to_json_line(record: Dict[str, Any]) -> str:
+    """One batch record as a JSON Lines row (with trailing newline)."""
+    return json.dumps(record, default=json_default) + '\n'
+
+
+class VideoBatchRunner:
+    """
+    Analyzes many videos on a process pool and yields results as they finish.
+    
+    Each worker builds one analyzer and keeps it for the whole batch. Only
+    ``max_in_flight`` videos are submitted at a time, so a 50k-video backfill
+    never holds 50k futures. With a ``resume_path``, every finished video is
+    appended to that file (flushed per line) and videos it records as done
+    are skipped on the next run; the file is only written after the record
+    is yielded, so an interruption can repeat a result but never lose one.
+    A worker crash (e.g. out of memory) breaks the whole pool and with it
+    every video in flight, not only the one that crashed. The pool is
+    restarted and those videos are rerun one at a time before new ones are
+    submitted; a video that crashes a worker while running alone is
+    recorded as failed, and the rest finish normally.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, analyzer_options: Optional[Dict[str, Any]] = None,
+                 resume_path: Optional[str] = None, max_in_flight: Optional[int] = None):
+        """
+        Initialize the runner.
+        
+        Args:
+            max_workers: Worker processes (default: CPU count)
+            analyzer_options: Keyword arguments for each worker's VideoAIAnalyzer
+                (stage_workers defaults to the CPU count divided by max_workers)
+            resume_path: JSON Lines file recording finished videos (None to disable)
+            max_in_flight: Videos submitted ahead of results (default: 4 per worker)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.analyzer_options = _worker_analyzer_options(analyzer_options, self.max_workers)
+        self.resume_path = resume_path
+        self.max_in_flight = max_in_flight or 4 * self.max_workers
+        self.stats = {'total': 0, 'skipped': 0, 'done': 0, 'failed': 0, 'rerun': 0, 'pool_restarts': 0}
+    
+    def _start_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_video_batch_worker,
+                                   initargs=(self.analyzer_options,))
+    
+    def run(self, video_paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze videos, yielding one record per video in completion order.
+        
+        Records have video_path, status ('done' or 'failed'),
+        elapsed_seconds and either result or error.
+        """
+        completed = load_completed_videos(self.resume_path) if self.resume_path else set()
+        pending_paths = []
+        for path in video_paths:
+            self.stats['total'] += 1
+            if path in completed:
+                self.stats['skipped'] += 1
+            else:
+                pending_paths.append(path)
+        
+        resume_file = open(self.resume_path, 'a', encoding='utf-8') if self.resume_path else None
+        executor = self._start_pool()
+        in_flight: Dict[Future, str] = {}
+        # Videos not yet submitted: first any whose submit hit a broken pool, then the rest
+        unsubmitted = deque()
+        queue = iter(pending_paths)
+        # Videos caught in a pool crash, rerun alone to find the one that caused it
+        suspects = deque()
+        try:
+            while True:
+                submit_failed = False
+                if suspects:
+                    if not in_flight:
+                        path = suspects.popleft()
+                        try:
+                            in_flight[executor.submit(_run_video_batch_item, path)] = path
+                        except BrokenProcessPool:
+                            suspects.appendleft(path)
+                            submit_failed = True
+                else:
+                    while len(in_flight) < self.max_in_flight:
+                        path = unsubmitted.popleft() if unsubmitted else next(queue, None)
+                        if path is None:
+                            break
+                        try:
+                            in_flight[executor.submit(_run_video_batch_item, path)] = path
+                        except BrokenProcessPool:
+                            # The pool broke under work already in flight; this video never ran
+                            unsubmitted.appendleft(path)
+                            submit_failed = True
+                            break
+                
+                if not in_flight:
+                    if not submit_failed:
+                        break
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = self._start_pool()
+                    self.stats['pool_restarts'] += 1
+                    continue
+                
+                running_alone = len(in_flight) == 1
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                if submit_failed or any(isinstance(future.exception(), BrokenProcessPool) for future in finished):
+                    # Every future of a broken pool fails; collect them all, then start a new pool
+                    finished, _ = wait(in_flight)
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = self._start_pool()
+                    self.stats['pool_restarts'] += 1
+                
+                for future in finished:
+                    path = in_flight.pop(future)
+                    error = future.exception()
+                    if isinstance(error, BrokenProcessPool) and not running_alone:
+                        suspects.append(path)
+                        self.stats['rerun'] += 1
+                        continue
+                    if isinstance(error, BrokenProcessPool):
+                        record = {'video_path': path, 'status': 'failed',
+                                  'error': f'Worker process died: {error}', 'elapsed_seconds': None}
+                    else:
+                        record = future.result()
+                    self.stats[record['status']] += 1
+                    yield record
+                    if resume_file is not None:
+                        resume_file.write(json.dumps({'video_path': path, 'status': record['status']}) + '\n')
+                        resume_file.flush()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if resume_file is not None:
+                resume_file.close()
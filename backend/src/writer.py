@@ -0,0 +1,165 @@
+"""Columnar (Parquet / Arrow IPC) output for analysis results."""
+
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .utils import get_signal_descriptions
+
+
+class AnalysisResultWriter:
+    """
+    Writes analyze_post result dicts to a Parquet or Arrow IPC file.
+    
+    Results are buffered and flushed as record batches against a fixed schema,
+    so any number of results can be written with bounded memory. Nested fields
+    are flattened: one float column per behavioral signal and one string
+    column per Gemini insight.
+    """
+    
+    FORMATS = {
+        '.parquet': 'parquet',
+        '.pq': 'parquet',
+        '.arrow': 'ipc',
+        '.feather': 'ipc',
+        '.ipc': 'ipc'
+    }
+    
+    INSIGHT_FIELDS = ['summary', 'risk_factors', 'recommendation']
+    
+    def __init__(self, path: str, file_format: Optional[str] = None, batch_size: int = 10_000):
+        """
+        Initialize the writer.
+        
+        Args:
+            path: Output file path
+            file_format: 'parquet' or 'ipc'; inferred from the extension if omitted
+            batch_size: Number of results buffered per record batch
+        """
+        self.path = path
+        self.file_format = file_format or self.FORMATS.get(os.path.splitext(path)[1].lower())
+        if self.file_format not in ('parquet', 'ipc'):
+            raise ValueError(f"Cannot infer output format for {path}; use .parquet or .arrow")
+        
+        self.batch_size = batch_size
+        self.signal_names = list(get_signal_descriptions())
+        self.schema = pa.schema(
+            [
+                ('post_id', pa.string()),
+                ('total_interactions', pa.int64()),
+                ('unique_users', pa.int64()),
+                ('abnormal_signal_count', pa.int64()),
+                ('confidence', pa.int64()),
+                ('label', pa.string()),
+                ('tap_detail', pa.string()),
+                ('triggered_signals', pa.list_(pa.string())),
+                ('message', pa.string())
+            ]
+            + [(name, pa.float64()) for name in self.signal_names]
+            + [(f'gemini_{field}', pa.string()) for field in self.INSIGHT_FIELDS]
+            + [('moderation_note', pa.string())]
+        )
+        
+        self._rows: List[Dict[str, Any]] = []
+        self._sink = None
+        self.rows_written = 0
+        self.closed = False
+    
+    @staticmethod
+    def _missing(value: Any) -> bool:
+        """True for None and scalar NaN (how DataFrame records spell missing)."""
+        return value is None or (not isinstance(value, (list, tuple, dict)) and pd.isna(value))
+    
+    def _flatten(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Map one result dict onto the flat output schema."""
+        signals = result.get('detailed_signals') or {}
+        insights = result.get('gemini_insights') or {}
+        row = {
+            'post_id': str(result.get('post_id')),
+            'total_interactions': result.get('total_interactions'),
+            'unique_users': result.get('unique_users'),
+            'abnormal_signal_count': result.get('abnormal_signal_count'),
+            'confidence': result.get('confidence'),
+            'label': result.get('label'),
+            'tap_detail': result.get('tap_detail'),
+            'triggered_signals': list(result.get('triggered_signals', [])),
+            'message': result.get('message')
+        }
+        for name in self.signal_names:
+            row[name] = signals.get(name, result.get(name))
+        for field in self.INSIGHT_FIELDS:
+            row[f'gemini_{field}'] = insights.get(field)
+        row['moderation_note'] = result.get('moderation_note')
+        
+        for key, value in row.items():
+            if self._missing(value):
+                row[key] = None
+            elif key in self.signal_names:
+                row[key] = float(value)
+        return row
+    
+    def write(self, result: Dict[str, Any]) -> None:
+        """Buffer one result dict, flushing a batch when the buffer is full."""
+        self._rows.append(self._flatten(result))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+    
+    def write_many(self, results: Iterable[Dict[str, Any]]) -> None:
+        """Write an iterable of result dicts."""
+        for result in results:
+            self.write(result)
+    
+    def write_frame(self, df: pd.DataFrame) -> None:
+        """Write a result DataFrame such as the one analyze_frame returns."""
+        self.write_many(df.to_dict('records'))
+    
+    def _open_sink(self):
+        """Open the underlying Parquet or Arrow IPC file writer."""
+        if self.file_format == 'parquet':
+            return pq.ParquetWriter(self.path, self.schema)
+        return pa.ipc.new_file(self.path, self.schema)
+    
+    def flush(self) -> None:
+        """Write buffered results as one record batch."""
+        if not self._rows:
+            return
+        
+        if self._sink is None:
+            self._sink = self._open_sink()
+        
+        self._sink.write_batch(pa.RecordBatch.from_pylist(self._rows, schema=self.schema))
+        self.rows_written += len(self._rows)
+        self._rows = []
+    
+    def close(self) -> None:
+        """Flush remaining results and finalize the file (empty if nothing was written)."""
+        self.flush()
+        if self._sink is None:
+            self._sink = self._open_sink()
+        self._sink.close()
+        self.closed = True
+    
+    def abort(self) -> None:
+        """Discard buffered results and delete the partly written file, which would not be readable."""
+        self._rows = []
+        if self._sink is not None:
+            try:
+                self._sink.close()
+            except Exception:
+                pass
+            self._sink = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.closed = True
+    
+    def __enter__(self) -> 'AnalysisResultWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif not self.closed:
+            self.abort()
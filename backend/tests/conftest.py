@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import the backend the way app.py and main.py do: ``from src...``
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py warms the shared labeler on a background thread at import; tests that
+# need a labeler build or patch it themselves
+os.environ.setdefault('LABELER_WARMUP', '0')
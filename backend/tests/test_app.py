@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+
+import pytest
+
+app_module = pytest.importorskip('app')
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    (tmp_path / 'videos').mkdir()
+    monkeypatch.setattr(app_module, 'VIDEO_INPUT_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'VIDEO_BATCH_STATE_DIR', str(tmp_path / 'state'))
+    monkeypatch.setitem(app_module.app.config, 'TESTING', True)
+    return app_module.app.test_client()
+
+
+def test_video_batch_lock_is_released_when_setup_fails(client, monkeypatch, tmp_path):
+    # A state "directory" that is a file makes os.makedirs raise
+    (tmp_path / 'blocked').write_text('')
+    monkeypatch.setattr(app_module, 'VIDEO_BATCH_STATE_DIR', str(tmp_path / 'blocked' / 'state'))
+    monkeypatch.setitem(app_module.app.config, 'PROPAGATE_EXCEPTIONS', False)
+    response = client.post('/api/video/batch', json={'source': str(tmp_path / 'videos'), 'resume': True})
+    assert response.status_code == 500
+    
+    monkeypatch.setattr(app_module, 'VIDEO_BATCH_STATE_DIR', str(tmp_path / 'state'))
+    response = client.post('/api/video/batch', json={'source': str(tmp_path / 'videos'), 'resume': True})
+    assert response.status_code == 200
+    assert response.get_data() == b''
+    response.close()
+    assert not app_module._video_batch_lock.locked()
+
+
+def fake_batch_item(video_path):
+    return {'video_path': video_path, 'status': 'done', 'result': {'ai_score': 0}}
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='fake workers rely on forked processes inheriting patched globals')
+def test_video_batch_resume_is_opt_in(client, monkeypatch, tmp_path):
+    from src import video_jobs
+    
+    monkeypatch.setattr(video_jobs, '_init_video_batch_worker', lambda options: None)
+    monkeypatch.setattr(video_jobs, '_run_video_batch_item', fake_batch_item)
+    for name in ('a.mp4', 'b.mp4', 'c.mp4'):
+        (tmp_path / 'videos' / name).write_bytes(b'')
+    
+    def run_batch(**options):
+        response = client.post('/api/video/batch', json={'source': str(tmp_path / 'videos'), **options})
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        response.close()
+        return response.headers, records
+    
+    for options in ({}, {}, {'resume': True}):
+        headers, records = run_batch(**options)
+        assert headers['X-Video-Count'] == '3'
+        assert len(records) == 3
+    
+    headers, records = run_batch(resume=True)
+    assert (headers['X-Video-Count'], headers['X-Video-Skipped']) == ('0', '3')
+    assert records == []
+
+
+def test_labeler_is_warmed_at_startup_without_blocking(monkeypatch):
+    import threading
+    
+    release = threading.Event()
+    built = []
+    
+    def slow_build():
+        release.wait(10)
+        built.append(object())
+        return built[-1]
+    
+    monkeypatch.setattr(app_module, 'build_labeler', slow_build)
+    monkeypatch.setattr(app_module, '_labeler', None)
+    app_module.warm_labeler()
+    assert app_module.labeler_status() == {'initialized': False}
+    
+    release.set()
+    assert app_module.get_labeler() is built[0]
+    assert len(built) == 1
+
+
+def test_full_enrichment_queue_returns_429(client, monkeypatch):
+    from src.enrichment import EnrichmentQueueFullError
+    
+    class FullLabeler:
+        def analyze_post(self, *args, **kwargs):
+            raise EnrichmentQueueFullError('64 enrichment jobs already pending')
+    
+    monkeypatch.setattr(app_module, 'get_labeler', FullLabeler)
+    interactions = [{'user_id': f'u{i}', 'timestamp': f'2024-01-01 00:00:0{i}', 'action_type': 'like'} for i in range(3)]
+    response = client.post('/api/analyze/reel', json={'reel': {'id': '1'}, 'interactions': interactions})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
+
+
+@pytest.fixture
+def fake_refresh(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, 'refresh_labeler', lambda: calls.append(1))
+    monkeypatch.setattr(app_module, 'labeler_status', lambda: {'initialized': True})
+    monkeypatch.setattr(app_module, '_last_refresh', None)
+    return calls
+
+
+def test_gemini_refresh_needs_admin_token(client, monkeypatch, fake_refresh):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/api/gemini/refresh').status_code == 401
+    assert client.post('/api/gemini/refresh', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    assert client.post('/api/gemini/refresh', headers={'X-Admin-Token': 'secret'}).status_code == 200
+    assert fake_refresh == [1]
+
+
+def test_gemini_refresh_without_token_is_localhost_only_and_rate_limited(client, monkeypatch, fake_refresh):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', None)
+    remote = client.post('/api/gemini/refresh', environ_base={'REMOTE_ADDR': '203.0.113.5'})
+    assert remote.status_code == 403
+    
+    assert client.post('/api/gemini/refresh').status_code == 200
+    repeat = client.post('/api/gemini/refresh')
+    assert repeat.status_code == 429
+    assert int(repeat.headers['Retry-After']) > 0
+    assert fake_refresh == [1]
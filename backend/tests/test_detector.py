@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.detector import InstagramAIConfidenceLabeler, StreamingPostState
+
+
+def random_frame(seed, num_posts=6):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 40, num_posts)
+    rows = []
+    for post, size in enumerate(sizes):
+        start = pd.Timestamp('2024-01-01') + pd.Timedelta(hours=int(rng.integers(0, 48)))
+        # Tight bursts for some posts, scattered activity for others
+        offsets = rng.exponential(rng.choice([1, 30, 600]), size).cumsum()
+        for offset in offsets:
+            rows.append({
+                'post_id': f'post_{post}',
+                'user_id': f'user_{rng.integers(0, max(2, size // 2))}',
+                'timestamp': start + pd.Timedelta(seconds=float(offset)),
+                'action_type': rng.choice(['like', 'comment', 'share', 'save'])
+            })
+    df = pd.DataFrame(rows)
+    # Interleave posts, as in a real export
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def labeler():
+    return InstagramAIConfidenceLabeler(graph_backend='sparse', enable_gemini=False)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_analyze_frame_matches_per_post_analysis(labeler, seed):
+    df = random_frame(seed)
+    if seed % 4 == 0:
+        # Rows without a post_id are ignored by both paths
+        df.loc[len(df)] = {'post_id': None, 'user_id': 'user_0',
+                           'timestamp': pd.Timestamp('2024-01-01'), 'action_type': 'like'}
+    
+    frame = labeler.analyze_frame(df)
+    expected = labeler.analyze_multiple_posts(df, use_gemini=False)
+    assert list(frame['post_id']) == [r['post_id'] for r in expected]
+    
+    for row, result in zip(frame.to_dict('records'), expected):
+        for key in ('total_interactions', 'unique_users', 'abnormal_signal_count', 'confidence',
+                    'label', 'tap_detail', 'triggered_signals'):
+            assert row[key] == result[key], (result['post_id'], key)
+        for name, value in result.get('detailed_signals', {}).items():
+            assert row[name] == pytest.approx(value), (result['post_id'], name)
+
+
+def assert_same_result(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if key == 'detailed_signals':
+            assert actual[key].keys() == value.keys()
+            for name, signal in value.items():
+                assert actual[key][name] == pytest.approx(signal), name
+        else:
+            assert actual[key] == value, key
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_streaming_state_matches_analyze_post(labeler, seed):
+    df = random_frame(seed, num_posts=3)
+    if seed % 2:
+        # In-order arrival; the shuffled frame covers out-of-order events
+        df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    
+    for post_id, events in df.groupby('post_id', sort=False):
+        state = StreamingPostState(post_id, labeler)
+        for count, row in enumerate(events.itertuples(index=False), 1):
+            state.add(row.user_id, row.timestamp, row.action_type)
+            if count in (1, 3, len(events) // 2, len(events)):
+                expected = labeler.analyze_post(post_id, events.iloc[:count], use_gemini=False)
+                assert_same_result(state.result(), expected)
+
+
+def test_worker_processes_match_in_process_analysis(labeler):
+    df = random_frame(7, num_posts=15)
+    serial = list(labeler.iter_analyze_posts(df, workers=1))
+    parallel = list(labeler.iter_analyze_posts(df, workers=2, chunk_size=2))
+    assert [r['post_id'] for r in parallel] == [r['post_id'] for r in serial]
+    assert parallel == serial
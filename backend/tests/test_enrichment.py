@@ -0,0 +1,23 @@
+import threading
+
+import pytest
+
+from src.enrichment import EnrichmentQueueFullError, GeminiEnrichmentQueue
+
+
+def test_submit_rejects_past_max_pending():
+    queue = GeminiEnrichmentQueue(max_workers=1, max_pending=2)
+    release = threading.Event()
+    try:
+        jobs = [queue.submit(release.wait, 10) for _ in range(2)]
+        with pytest.raises(EnrichmentQueueFullError):
+            queue.submit(release.wait, 10)
+        assert queue.status()['pending'] == 2
+        
+        release.set()
+        assert all(queue.wait(job_id, timeout=10)['status'] == 'done' for job_id in jobs)
+        assert queue.status()['pending'] == 0
+        assert queue.wait(queue.submit(dict), timeout=10)['status'] == 'done'
+    finally:
+        release.set()
+        queue.shutdown()
@@ -0,0 +1,269 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.detector import InstagramAIConfidenceLabeler
+from src.event_stream import FileTailSource, RedisStreamSource, StreamConsumer
+
+
+def make_events(post_id, users, start_second=0, day=1):
+    return [{'post_id': post_id, 'user_id': f'u{user}', 'action_type': 'like',
+             'timestamp': f'2024-01-{day:02d}T00:{(start_second + i) // 60:02d}:{(start_second + i) % 60:02d}'}
+            for i, user in enumerate(users)]
+
+
+def consume(path, checkpoint_path):
+    source = FileTailSource(path, poll_interval=0.01)
+    changes = []
+    consumer = StreamConsumer(source, checkpoint_path=checkpoint_path, poll_timeout=0.05,
+                              on_change=changes.append)
+    consumer.run(stop_when_idle=True)
+    source.close()
+    return consumer, changes
+
+
+def test_truncated_file_is_read_again(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    source = FileTailSource(path, poll_interval=0.01)
+    source.append(make_events('p1', range(20)))
+    consumer = StreamConsumer(source, poll_timeout=0.05)
+    consumer.run(stop_when_idle=True)
+    assert consumer.counters['events'] == 20
+    
+    open(path, 'w').close()
+    source.append(make_events('p1', range(20, 25), start_second=20))
+    consumer.run(stop_when_idle=True)
+    source.close()
+    assert consumer.counters['events'] == 25
+    assert consumer.counters['replayed'] == 0
+
+
+def test_rotated_file_is_followed(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    source = FileTailSource(path, poll_interval=0.01)
+    source.append(make_events('p1', range(20)))
+    consumer = StreamConsumer(source, poll_timeout=0.05)
+    consumer.run(stop_when_idle=True)
+    
+    # Events written to the old file after the rotation are still read
+    os.rename(path, path + '.1')
+    with open(path + '.1', 'a') as f:
+        f.write('{"post_id": "p1", "user_id": "late", "action_type": "like", "timestamp": "2024-01-01T00:00:30"}\n')
+    source.append(make_events('p2', range(5)))
+    consumer.run(stop_when_idle=True)
+    source.close()
+    assert consumer.counters['events'] == 26
+    assert consumer.counters['replayed'] == 0
+
+
+def test_rotation_while_stopped_is_not_skipped(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    checkpoint_path = str(tmp_path / 'consumer.ckpt')
+    FileTailSource(path).append(make_events('p1', range(50)))
+    consumer, _ = consume(path, checkpoint_path)
+    assert consumer.counters['events'] == 50
+    
+    # A shorter and a longer replacement file: neither may be skipped as already read
+    os.rename(path, path + '.1')
+    FileTailSource(path).append(make_events('p2', range(10)))
+    consumer, changes = consume(path, checkpoint_path)
+    assert consumer.counters['events'] == 10
+    assert {change['post_id'] for change in changes} == {'p2'}
+    
+    os.rename(path, path + '.2')
+    FileTailSource(path).append(make_events('p3', range(80)))
+    consumer, _ = consume(path, checkpoint_path)
+    assert consumer.counters['events'] == 80
+    
+    # Resuming the same file continues after the checkpoint
+    FileTailSource(path).append(make_events('p3', range(80, 85), start_second=80))
+    consumer, _ = consume(path, checkpoint_path)
+    assert consumer.counters['events'] == 5
+    assert consumer.counters['replayed'] == 0
+
+
+def checkpoint_rows(checkpoint_path):
+    with sqlite3.connect(checkpoint_path) as db:
+        return dict(db.execute("SELECT post_id, rowid FROM posts"))
+
+
+def test_checkpoint_writes_only_changed_posts(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    checkpoint_path = str(tmp_path / 'consumer.ckpt')
+    FileTailSource(path).append(make_events('p1', range(10)) + make_events('p2', range(10)))
+    consume(path, checkpoint_path)
+    before = checkpoint_rows(checkpoint_path)
+    
+    FileTailSource(path).append(make_events('p2', range(10, 15), start_second=10))
+    consumer, _ = consume(path, checkpoint_path)
+    after = checkpoint_rows(checkpoint_path)
+    assert after['p1'] == before['p1']
+    assert after['p2'] != before['p2']
+    assert consumer._posts['p2']['state'].total_interactions == 15
+
+
+def test_finished_posts_and_old_dedup_keys_are_dropped(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    checkpoint_path = str(tmp_path / 'consumer.ckpt')
+    events = make_events('p1', range(10)) + make_events('p2', range(10))
+    events += make_events('p2', [99], day=3)
+    FileTailSource(path).append(events)
+    consumer, _ = consume(path, checkpoint_path)
+    
+    assert consumer.counters['expired_posts'] == 1
+    assert set(checkpoint_rows(checkpoint_path)) == {'p2'}
+    assert len(consumer._posts['p2']['seen']) == 1
+    
+    # A post that went quiet starts over when it gets events again
+    FileTailSource(path).append(make_events('p1', range(3), day=3))
+    consumer, _ = consume(path, checkpoint_path)
+    assert consumer._posts['p1']['state'].total_interactions == 3
+    assert set(checkpoint_rows(checkpoint_path)) == {'p1', 'p2'}
+
+
+@pytest.fixture(scope='module')
+def labeler():
+    return InstagramAIConfidenceLabeler(graph_backend='sparse', enable_gemini=False)
+
+
+def random_events(seed, num_events=240):
+    """Interleaved events for a few posts within the dedup window, with unique timestamps."""
+    rng = np.random.default_rng(seed)
+    offsets = np.cumsum(rng.exponential(rng.choice([0.5, 5.0]), num_events) + 0.001)
+    timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(offsets, unit='s')
+    return [{'post_id': f'p{post}', 'user_id': f'u{user}', 'action_type': str(action),
+             'timestamp': timestamp.isoformat()}
+            for post, user, action, timestamp in zip(rng.integers(0, 3, num_events),
+                                                     rng.integers(0, 25, num_events),
+                                                     rng.choice(['like', 'comment', 'share'], num_events),
+                                                     timestamps)]
+
+
+def assert_states_match_analyze_post(consumer, labeler, events):
+    df = pd.DataFrame(events)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    assert set(consumer._posts) == set(df['post_id'])
+    for post_id, post_df in df.groupby('post_id'):
+        expected = labeler.analyze_post(post_id, post_df.reset_index(drop=True), use_gemini=False)
+        actual = consumer._posts[post_id]['state'].result()
+        assert actual.pop('detailed_signals') == pytest.approx(expected.pop('detailed_signals')), post_id
+        assert actual == expected, post_id
+
+
+def test_crash_between_checkpoints_replays_to_the_same_states(tmp_path, labeler):
+    path = str(tmp_path / 'events.jsonl')
+    checkpoint_path = str(tmp_path / 'consumer.ckpt')
+    events = random_events(0)
+    FileTailSource(path).append(events[:80])
+    consumer = StreamConsumer(FileTailSource(path), labeler, checkpoint_path=checkpoint_path, poll_timeout=0.05)
+    consumer.run(stop_when_idle=True)
+    consumer.close()
+    
+    # Apply more batches, then die without checkpointing them
+    FileTailSource(path).append(events[80:160])
+    source = FileTailSource(path)
+    crashed = StreamConsumer(source, labeler, checkpoint_path=checkpoint_path, batch_size=20)
+    while crashed.counters['events'] < 60:
+        crashed.process_batch(source.read(crashed.batch_size, 0.05))
+    crashed.close()
+    source.close()
+    
+    FileTailSource(path).append(events[160:])
+    source = FileTailSource(path, poll_interval=0.01)
+    consumer = StreamConsumer(source, labeler, checkpoint_path=checkpoint_path, poll_timeout=0.05)
+    consumer.run(stop_when_idle=True)
+    source.close()
+    assert consumer.counters['events'] == 160
+    assert_states_match_analyze_post(consumer, labeler, events)
+
+
+class FakeRedis:
+    """The stream and consumer-group commands RedisStreamSource uses, for a single group."""
+    
+    def __init__(self):
+        self.entries = []
+        self.delivered = 0
+        # entry ID -> consumer it was delivered to, until acknowledged
+        self.pending = {}
+        self.next_id = 1
+    
+    def xgroup_create(self, stream, group, id='0', mkstream=False):
+        pass
+    
+    def xadd(self, stream, fields, id=None):
+        entry_id = id or f'{self.next_id}-0'
+        self.next_id += 1
+        self.entries.append((entry_id, fields))
+        return entry_id
+    
+    def pipeline(self, transaction=True):
+        return self
+    
+    def execute(self):
+        return []
+    
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (stream, start), = streams.items()
+        if start == '>':
+            entries = self.entries[self.delivered:self.delivered + count]
+            self.delivered += len(entries)
+            self.pending.update((entry_id, consumer) for entry_id, _ in entries)
+        else:
+            after = RedisStreamSource._position(start) if start != '0' else (0, -1)
+            entries = [(entry_id, fields) for entry_id, fields in self.entries
+                       if self.pending.get(entry_id) == consumer
+                       and RedisStreamSource._position(entry_id) > after][:count]
+        return [[stream, entries]] if entries else []
+    
+    def xack(self, stream, group, *entry_ids):
+        acked = [entry_id for entry_id in entry_ids if self.pending.pop(entry_id, None) is not None]
+        return len(acked)
+    
+    def xinfo_groups(self, stream):
+        return [{'name': 'ai-labeler', 'pending': len(self.pending), 'lag': len(self.entries) - self.delivered}]
+
+
+def test_redis_commit_acknowledges_only_entries_up_to_the_position():
+    client = FakeRedis()
+    for entry_id in ['5-0', '9-0', '6-0', '8-0', '7-0']:
+        client.xadd('interactions', {'event': json.dumps(make_events('p1', [1])[0])}, id=entry_id)
+    source = RedisStreamSource(client=client, consumer='c1')
+    source.read(10, 0.05)
+    
+    source.commit((7, 0))
+    assert sorted(client.pending) == ['8-0', '9-0']
+    source.commit((8, 0))
+    assert sorted(client.pending) == ['9-0']
+    source.commit((9, 0))
+    assert client.pending == {}
+
+
+def test_redis_redelivery_after_a_lost_ack_is_skipped(tmp_path, labeler):
+    checkpoint_path = str(tmp_path / 'consumer.ckpt')
+    events = random_events(1)
+    client = FakeRedis()
+    source = RedisStreamSource(client=client, consumer='c1')
+    source.append(events[:120])
+    
+    # Die after the checkpoint is written but before the entries are acknowledged
+    def lost_ack(position):
+        raise ConnectionError('connection lost')
+    source.commit = lost_ack
+    consumer = StreamConsumer(source, labeler, checkpoint_path=checkpoint_path, batch_size=50, poll_timeout=0.05)
+    with pytest.raises(ConnectionError):
+        consumer.run(stop_when_idle=True)
+    consumer.close()
+    assert len(client.pending) == 120
+    
+    source = RedisStreamSource(client=client, consumer='c1')
+    source.append(events[120:])
+    consumer = StreamConsumer(source, labeler, checkpoint_path=checkpoint_path, batch_size=50, poll_timeout=0.05)
+    consumer.run(stop_when_idle=True)
+    assert consumer.counters['replayed'] == 120
+    assert consumer.counters['events'] == len(events) - 120
+    assert client.pending == {}
+    assert_states_match_analyze_post(consumer, labeler, events)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import BehavioralFeatureExtractor
+
+
+def pairwise_synchronization(df, window_seconds, threshold):
+    # The original O(n^2) definition the adjacent-gap mask replaced
+    if len(df) < 2:
+        return {'value': 0, 'is_abnormal': False}
+    df_sorted = df.sort_values('timestamp')
+    times = df_sorted['timestamp'].tolist()
+    users = df_sorted['user_id'].tolist()
+    sync_users = set()
+    for i in range(len(times)):
+        for j in range(i + 1, len(times)):
+            if (times[j] - times[i]).total_seconds() <= window_seconds:
+                sync_users.add(users[i])
+                sync_users.add(users[j])
+    ratio = len(sync_users) / df['user_id'].nunique() if df['user_id'].nunique() > 0 else 0
+    return {'value': ratio, 'is_abnormal': ratio > threshold}
+
+
+def random_post(seed):
+    rng = np.random.default_rng(seed)
+    size = int(rng.integers(1, 80))
+    # Whole seconds make gaps of exactly the window (and ties) common
+    offsets = rng.integers(0, rng.choice([10, 120, 3600]), size)
+    return pd.DataFrame({
+        'user_id': [f'user_{u}' for u in rng.integers(0, max(1, size // 3), size)],
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(offsets, unit='s'),
+        'action_type': 'like'
+    })
+
+
+@pytest.mark.parametrize('seed', range(60))
+def test_synchronization_matches_pairwise_definition(seed):
+    extractor = BehavioralFeatureExtractor()
+    df = random_post(seed)
+    expected = pairwise_synchronization(df, extractor.thresholds.SYNC_WINDOW_SECONDS,
+                                        extractor.thresholds.SYNC_THRESHOLD_PERCENT)
+    assert extractor.extract_synchronization(df) == expected
@@ -0,0 +1,115 @@
+import time
+
+from src.gemini_analyzer import GeminiPostAnalyzer
+from src.rate_limit import CircuitBreaker, GeminiRateLimiter
+from src.response_cache import GeminiResponseCache
+
+
+class FakeModel:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+    
+    def generate_content(self, prompt, generation_config=None):
+        self.client.calls.append(self.name)
+        if self.name in self.client.missing:
+            raise ValueError(f'404 model {self.name} not found')
+        return type('Reply', (), {'text': self.client.reply(prompt)})()
+
+
+class FakeClient:
+    name = 'fake'
+    requires_api_key = False
+    
+    def __init__(self, missing=(), reply=lambda prompt: 'OK'):
+        self.missing = set(missing)
+        self.reply = reply
+        self.calls = []
+    
+    def model(self, name):
+        return FakeModel(self, name)
+
+
+def make_analyzer(client, limiter=None, breaker=None):
+    return GeminiPostAnalyzer(client=client, rate_limiter=limiter or GeminiRateLimiter(60, 100_000),
+                              circuit_breaker=breaker or CircuitBreaker(), response_cache=GeminiResponseCache())
+
+
+def test_probe_skips_missing_models():
+    client = FakeClient(missing={'gemini-2.5-flash'})
+    analyzer = make_analyzer(client)
+    assert analyzer.is_available
+    assert analyzer.model_name == 'gemini-2.0-flash'
+    assert client.calls == ['gemini-2.5-flash', 'gemini-2.0-flash']
+
+
+def test_probe_respects_open_circuit():
+    breaker = CircuitBreaker()
+    breaker.record_failure(rate_limited=True)
+    client = FakeClient()
+    analyzer = make_analyzer(client, breaker=breaker)
+    assert client.calls == []
+    assert analyzer.model_name == 'gemini-2.5-flash'
+
+
+def test_probe_gives_up_when_rate_limit_is_exhausted(monkeypatch):
+    monkeypatch.setattr(GeminiPostAnalyzer, 'SLOT_TIMEOUT_SECONDS', 0.05)
+    limiter = GeminiRateLimiter(1, 100_000)
+    assert limiter.acquire()
+    client = FakeClient()
+    started = time.monotonic()
+    make_analyzer(client, limiter=limiter)
+    assert time.monotonic() - started < 5
+    assert client.calls == []
+
+
+def test_half_open_trial_moves_on_past_a_missing_model():
+    breaker = CircuitBreaker(base_backoff_seconds=0.01, jitter=0)
+    breaker.record_failure(rate_limited=True)
+    time.sleep(0.02)
+    client = FakeClient(missing={'gemini-2.5-flash'})
+    analyzer = make_analyzer(client, breaker=breaker)
+    assert client.calls == ['gemini-2.5-flash', 'gemini-2.0-flash']
+    assert analyzer.model_name == 'gemini-2.0-flash'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_posts_with_the_same_signals_share_one_call():
+    client = FakeClient()
+    analyzer = make_analyzer(client)
+    probes = len(client.calls)
+    signals = {'confidence': 72, 'triggered_signals': ['Synchronized Activity', 'Early Burst']}
+    
+    first = analyzer.generate_post_insights({'post_id': 'post_a', **signals})
+    second = analyzer.generate_post_insights({'post_id': 'post_b', **signals})
+    assert second == first
+    assert len(client.calls) - probes == 1
+    assert analyzer.response_cache.hits == 1
+    
+    analyzer.generate_post_insights({'post_id': 'post_c', **signals, 'confidence': 15})
+    assert len(client.calls) - probes == 2
+
+
+def batch_reply(prompt):
+    if 'Posts:' not in prompt:
+        return 'SUMMARY: single\nRISK: single\nACTION: single'
+    count = prompt.split('Posts:')[1].count('\n') - 1
+    return '\n'.join(f'### POST {n}\nSUMMARY: batch {n}\nRISK: r\nACTION: a' for n in range(1, count + 1))
+
+
+def test_batch_answers_never_answer_single_post_prompts():
+    client = FakeClient(reply=batch_reply)
+    analyzer = make_analyzer(client)
+    probes = len(client.calls)
+    results = [{'post_id': f'post_{i}', 'confidence': 72, 'triggered_signals': ['Early Burst']} for i in range(2)]
+    
+    batch = analyzer.generate_insights_batch(results)
+    assert [insights['summary'] for insights in batch] == ['batch 1', 'batch 2']
+    assert len(client.calls) - probes == 1
+    
+    assert analyzer.generate_post_insights(results[0])['summary'] == 'single'
+    assert len(client.calls) - probes == 2
+    
+    # Repeating the batch is served from its own cache entries
+    assert analyzer.generate_insights_batch(results) == batch
+    assert len(client.calls) - probes == 2
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+nx = pytest.importorskip('networkx')
+
+from src.graph_analysis import InteractionGraphAnalyzer
+
+
+def random_interactions(seed):
+    rng = np.random.default_rng(seed)
+    num_users = int(rng.integers(1, 40))
+    num_events = int(rng.integers(1, 200))
+    # Mix a few tight bursts (coordinated clusters) into scattered activity
+    offsets = rng.exponential(rng.choice([2, 20, 120]), num_events).cumsum()
+    return pd.DataFrame({
+        'post_id': 'p',
+        'user_id': [f'u{u}' for u in rng.integers(0, num_users, num_events)],
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(offsets, unit='s'),
+        'action_type': 'like'
+    })
+
+
+def clusters_as_sets(analyzer, labels, weights, G):
+    sparse_clusters = {frozenset(c) for c in analyzer._find_sparse_clusters(labels, weights)}
+    networkx_clusters = {
+        frozenset(c) for c in nx.connected_components(G)
+        if len(c) >= 3 and nx.density(G.subgraph(c)) > 0.3
+    }
+    return sparse_clusters, networkx_clusters
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_sparse_backend_matches_networkx(seed):
+    analyzer = InteractionGraphAnalyzer(backend='sparse')
+    labels, weights = analyzer.build_interaction_matrix(random_interactions(seed))
+    G = analyzer.graph_from_matrix(labels, weights)
+    
+    sparse_metrics = analyzer.calculate_sparse_graph_metrics(weights)
+    networkx_metrics = analyzer.calculate_graph_metrics(G)
+    assert sparse_metrics.keys() == networkx_metrics.keys()
+    for key, value in networkx_metrics.items():
+        assert sparse_metrics[key] == pytest.approx(value, abs=1e-12), key
+    
+    if weights.nnz:
+        symmetric = (weights + weights.T).tocsr()
+        expected = nx.clustering(G, weight='weight')
+        assert analyzer._weighted_clustering(symmetric) == pytest.approx(
+            [expected[label] for label in labels], abs=1e-12)
+    
+    sparse_clusters, networkx_clusters = clusters_as_sets(analyzer, labels, weights, G)
+    assert sparse_clusters == networkx_clusters
@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['pandas', 'numpy', 'scipy', 'networkx', 'google.generativeai', 'cv2']
+
+
+def test_importing_app_skips_heavy_modules():
+    # A fresh interpreter, so modules imported by other tests don't count
+    script = (
+        'import json, sys\n'
+        'import app\n'
+        f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n'
+    )
+    # Startup warms the labeler on a background thread; this checks the import alone
+    env = dict(os.environ, GEMINI_API_KEY='', LABELER_WARMUP='0')
+    completed = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                               capture_output=True, text=True, timeout=120)
+    
+    assert completed.returncode == 0, completed.stderr
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+from src.loader import InteractionDataLoader
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def write_interactions(path, tz):
+    timestamps = pd.date_range('2024-01-01', periods=96, freq='h', tz=tz)
+    df = pd.DataFrame({
+        'post_id': pd.Categorical([f'p{i % 4}' for i in range(96)]),
+        'user_id': [f'u{i}' for i in range(96)],
+        'timestamp': timestamps,
+        'action_type': 'like'
+    })
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+    df.assign(timestamp=timestamps.astype(str)).to_csv(str(path).replace('.parquet', '.csv'), index=False)
+    return df
+
+
+@pytest.mark.parametrize('tz', [None, 'UTC', 'Europe/Berlin'])
+@pytest.mark.parametrize('extension', ['.parquet', '.csv'])
+@pytest.mark.parametrize('since', ['2024-01-02 00:00', '2024-01-01 23:00+00:00'])
+def test_filters_on_categorical_post_ids_and_tz_aware_timestamps(tmp_path, tz, extension, since):
+    df = write_interactions(tmp_path / 'interactions.parquet', tz)
+    path = str(tmp_path / f'interactions{extension}')
+    
+    start = InteractionDataLoader._align_timezone(pd.Timestamp(since), tz)
+    end = InteractionDataLoader._align_timezone(pd.Timestamp('2024-01-03 00:00'), tz)
+    expected = df[df['post_id'].isin(['p1', 'p2']) & (df['timestamp'] >= start) & (df['timestamp'] <= end)]
+    
+    loaded = InteractionDataLoader(data_source=path, post_ids=['p1', 'p2'],
+                                   start_time=since, end_time='2024-01-03 00:00').load_data()
+    assert sorted(loaded['user_id']) == sorted(expected['user_id'])
+    
+    streamed = InteractionDataLoader(data_source=path, post_ids=['p1', 'p2'],
+                                     start_time=since, end_time='2024-01-03 00:00').iter_post_groups()
+    assert sorted(user for _, group in streamed for user in group['user_id']) == sorted(expected['user_id'])
+
+
+@pytest.mark.parametrize('num_buckets', [None, 1])
+def test_oversized_partitions_are_resplit(tmp_path, monkeypatch, num_buckets):
+    df = pd.DataFrame({
+        'post_id': [f'p{i % 7}' for i in range(700)],
+        'user_id': [f'u{i}' for i in range(700)],
+        'timestamp': pd.date_range('2024-01-01', periods=700, freq='min').astype(str),
+        'action_type': 'like'
+    })
+    path = tmp_path / 'interactions.csv'
+    df.to_csv(path, index=False)
+    
+    loaded = []
+    original = InteractionDataLoader._load_partition
+    
+    def spy(self, path, rows, chunksize, level=0):
+        for bucket in original(self, path, rows, chunksize, level):
+            loaded.append(len(bucket))
+            yield bucket
+    
+    monkeypatch.setattr(InteractionDataLoader, '_load_partition', spy)
+    groups = dict(InteractionDataLoader(data_source=str(path)).iter_post_groups(chunksize=150, num_buckets=num_buckets))
+    
+    assert sorted(groups) == [f'p{i}' for i in range(7)]
+    assert all(len(group) == 100 for group in groups.values())
+    assert max(loaded) <= 200
+
+
+@pytest.mark.parametrize('chunksize', [3, 1000])
+def test_streaming_keeps_na_like_ids(tmp_path, chunksize):
+    ids = ['NA', 'null', 'NaN', '', 'n/a', 'real']
+    df = pd.DataFrame({
+        'post_id': [post for post in ids for _ in range(3)],
+        'user_id': [user for _ in ids for user in ('NA', 'None', None)],
+        'timestamp': pd.date_range('2024-01-01', periods=3 * len(ids), freq='min'),
+        'action_type': 'like'
+    })
+    path = tmp_path / 'interactions.parquet'
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+    
+    loaded = InteractionDataLoader(data_source=str(path)).load_data()
+    expected = {post_id: sorted(map(str, group['user_id'])) for post_id, group in loaded.groupby('post_id')}
+    streamed = {post_id: sorted(map(str, group['user_id']))
+                for post_id, group in InteractionDataLoader(data_source=str(path)).iter_post_groups(chunksize=chunksize)}
+    assert streamed == expected
+    assert sorted(streamed) == sorted(ids)
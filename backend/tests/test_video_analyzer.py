@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+pytest.importorskip('skimage')
+
+from src.response_cache import ResponseCache
+from src.video_analyzer import VideoAIAnalyzer, file_content_hash
+
+
+def write_video(path, frame_count, size=(320, 180)):
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, size)
+    base = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(frame_count):
+        writer.write(np.roll(base, 4 * i, axis=1))
+    writer.release()
+    return str(path)
+
+
+def test_repeated_samples_are_resized_copies(tmp_path):
+    path = write_video(tmp_path / 'short.avi', 6)
+    frames = list(VideoAIAnalyzer(use_cache=False).iter_frames(path, num_frames=30, max_width=160))
+    assert len(frames) == 30
+    assert {frame.shape for frame in frames} == {(90, 160, 3)}
+    assert len({id(frame) for frame in frames}) == 30
+
+
+@pytest.mark.parametrize('stage_workers', [1, 4])
+def test_streamed_stages_match_frame_list(tmp_path, stage_workers):
+    path = write_video(tmp_path / 'clip.avi', 40)
+    analyzer = VideoAIAnalyzer(use_cache=False, stage_workers=stage_workers, num_frames=20)
+    frames = analyzer.extract_frames(path, analyzer.num_frames)
+    
+    stages, fallbacks = analyzer._run_stages(path, None)
+    assert not fallbacks
+    assert stages['facial'] == analyzer.analyze_facial_consistency(frames, analyzer.face_detect_width)
+    assert stages['artifacts'] == analyzer.detect_frame_artifacts(frames)
+    assert stages['temporal'] == analyzer.analyze_temporal_coherence(frames, analyzer.flow_width)
+
+
+def test_temporal_coherence_reuses_one_pool(tmp_path):
+    import threading
+    
+    path = write_video(tmp_path / 'clip.avi', 12)
+    analyzer = VideoAIAnalyzer(use_cache=False, stage_workers=2, num_frames=6)
+    frames = analyzer.extract_frames(path, analyzer.num_frames)
+    serial = analyzer.analyze_temporal_coherence(frames, workers=1)
+    
+    assert analyzer.analyze_temporal_coherence(frames) == serial
+    pool = analyzer._stage_pool()
+    threads = threading.active_count()
+    for _ in range(3):
+        assert analyzer.analyze_temporal_coherence(frames) == serial
+    assert analyzer._stage_pool() is pool
+    assert threading.active_count() == threads
+    
+    # From a stage thread it runs inline instead of waiting on its own pool
+    assert pool.submit(analyzer.analyze_temporal_coherence, frames).result(timeout=60) == serial
+
+
+def test_fallback_stages_are_not_cached(tmp_path, monkeypatch):
+    path = write_video(tmp_path / 'clip.avi', 12)
+    cache = ResponseCache(path=None)
+    analyzer = VideoAIAnalyzer(stage_workers=1, num_frames=6, result_cache=cache)
+    
+    def broken_audio(video_path):
+        raise RuntimeError('ffmpeg missing')
+    
+    monkeypatch.setattr(analyzer, '_audio_features', broken_audio)
+    analyzer.analyze_video(path)
+    content_hash = file_content_hash(path)
+    assert cache.get(analyzer._cache_key(content_hash, 'audio')) is None
+    assert cache.get(analyzer._cache_key(content_hash, 'result')) is None
+    assert cache.get(analyzer._cache_key(content_hash, 'temporal')) is not None
+    
+    # The next request retries the failed stage and then caches the result
+    monkeypatch.setattr(analyzer, '_audio_features', lambda video_path: dict(analyzer.AUDIO_FALLBACK))
+    result = analyzer.analyze_video(path)
+    assert cache.get(analyzer._cache_key(content_hash, 'result')) == result
+
+
+def ffmpeg_or_skip():
+    binary = VideoAIAnalyzer._ffmpeg_binary()
+    if binary is None:
+        pytest.skip('ffmpeg not available')
+    return binary
+
+
+def write_clip_with_tone(path, seconds=3, frequency=440):
+    import subprocess
+    
+    subprocess.run([ffmpeg_or_skip(), '-nostdin', '-v', 'error', '-y',
+                    '-f', 'lavfi', '-i', f'sine=frequency={frequency}:sample_rate=44100:duration={seconds}',
+                    '-f', 'lavfi', '-i', f'color=size=64x64:rate=10:duration={seconds}',
+                    '-shortest', str(path)], check=True)
+    return str(path)
+
+
+def test_load_audio_decodes_the_soundtrack_through_a_pipe(tmp_path):
+    path = write_clip_with_tone(tmp_path / 'tone.mkv')
+    analyzer = VideoAIAnalyzer(use_cache=False, audio_sample_rate=16000, audio_max_seconds=2)
+    
+    samples = analyzer.load_audio(path)
+    assert samples.dtype == np.float32
+    assert abs(len(samples) - 2 * 16000) <= 1024
+    spectrum = np.abs(np.fft.rfft(samples))
+    assert np.fft.rfftfreq(len(samples), 1 / 16000)[spectrum.argmax()] == pytest.approx(440, abs=2)
+    assert sorted(tmp_path.iterdir()) == [tmp_path / 'tone.mkv']
+    
+    silent = write_video(tmp_path / 'silent.avi', 5)
+    assert analyzer.load_audio(silent) is None
+
+
+def test_load_audio_gives_up_on_a_stuck_ffmpeg(tmp_path, monkeypatch):
+    import subprocess
+    from src import video_analyzer
+    
+    path = write_clip_with_tone(tmp_path / 'tone.mkv')
+    
+    def stuck(command, **kwargs):
+        raise subprocess.TimeoutExpired(command, kwargs['timeout'])
+    
+    monkeypatch.setattr(video_analyzer.subprocess, 'run', stuck)
+    assert VideoAIAnalyzer(use_cache=False).load_audio(path) is None
+
+
+def baseline_artifact_score(frame):
+    # The per-frame scoring score_frame_artifacts replaced
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    sharpness = np.var(cv2.Laplacian(gray, cv2.CV_64F))
+    color_uniformity = np.std(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[:, :, 0]) / 180
+    edges = cv2.Canny(gray, 50, 150)
+    edge_density = np.sum(edges > 0) / edges.size
+    return 0.3 * min(1.0, sharpness / 1000) + 0.3 * (1 - color_uniformity) + 0.4 * edge_density
+
+
+def test_batched_artifact_scores_match_per_frame_scoring(tmp_path):
+    path = write_video(tmp_path / 'clip.avi', 40, size=(640, 360))
+    analyzer = VideoAIAnalyzer(use_cache=False, num_frames=20)
+    frames = analyzer.extract_frames(path, analyzer.num_frames)
+    rng = np.random.default_rng(1)
+    # A noise frame, then an odd-sized one that breaks the batch
+    frames.insert(9, rng.integers(0, 256, frames[0].shape, dtype=np.uint8))
+    frames.insert(14, rng.integers(0, 256, (101, 77, 3), dtype=np.uint8))
+    expected = [baseline_artifact_score(frame) for frame in frames]
+    
+    # Twice, so the second call runs on the reused buffers
+    for _ in range(2):
+        scores, mean = analyzer.score_frame_artifacts(frames)
+        assert scores == pytest.approx(expected, rel=1e-9)
+        assert mean == pytest.approx(np.mean(expected), rel=1e-9)
+    assert analyzer.detect_frame_artifacts(frames) == pytest.approx(np.mean(expected), rel=1e-9)
+
+
+def test_shared_video_cache_is_built_once_under_concurrency(monkeypatch):
+    import threading
+    import time
+    from src import video_analyzer
+    
+    built = []
+    
+    class SlowCache:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)
+            built.append(self)
+    
+    monkeypatch.setenv('VIDEO_CACHE_PATH', '')
+    monkeypatch.setattr(video_analyzer, 'ResponseCache', SlowCache)
+    monkeypatch.setattr(video_analyzer, '_shared_video_cache', None)
+    caches = []
+    threads = [threading.Thread(target=lambda: caches.append(video_analyzer.get_shared_video_cache()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(built) == 1
+    assert all(cache is built[0] for cache in caches)
@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+
+import pytest
+
+from src import video_jobs
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason='fake workers rely on forked processes inheriting patched globals')
+
+
+def fake_init(analyzer_options):
+    pass
+
+
+def fake_analyze(video_path):
+    if os.path.basename(video_path).startswith('crash'):
+        os._exit(1)
+    return {'video_path': video_path, 'ai_score': 0}
+
+
+def fake_batch_item(video_path):
+    return {'video_path': video_path, 'status': 'done', 'result': fake_analyze(video_path)}
+
+
+@pytest.fixture
+def fake_worker(monkeypatch):
+    monkeypatch.setattr(video_jobs, '_init_video_worker', fake_init)
+    monkeypatch.setattr(video_jobs, '_init_video_batch_worker', fake_init)
+    monkeypatch.setattr(video_jobs, '_run_video_job', fake_analyze)
+
+
+def test_job_queue_recovers_from_a_dead_worker(fake_worker):
+    queue = video_jobs.VideoJobQueue(max_workers=1)
+    try:
+        crashed = queue.wait(queue.submit('/videos/crash.mp4'), timeout=30)
+        assert crashed['status'] == 'failed'
+        assert 'Worker process died' in crashed['error']
+        
+        ok = queue.wait(queue.submit('/videos/fine.mp4'), timeout=30)
+        assert ok['status'] == 'done'
+        assert queue.status()['pool_restarts'] == 1
+    finally:
+        queue.shutdown()
+
+
+def test_batch_runner_fails_only_the_video_that_crashes(fake_worker, monkeypatch, tmp_path):
+    monkeypatch.setattr(video_jobs, '_run_video_batch_item', fake_batch_item)
+    paths = [f'/videos/{i:02d}.mp4' for i in range(12)]
+    paths.insert(5, '/videos/crash.mp4')
+    resume_path = str(tmp_path / 'resume.jsonl')
+    
+    runner = video_jobs.VideoBatchRunner(max_workers=2, resume_path=resume_path, max_in_flight=6)
+    records = {record['video_path']: record for record in runner.run(paths)}
+    
+    assert set(records) == set(paths)
+    assert records['/videos/crash.mp4']['status'] == 'failed'
+    assert all(record['status'] == 'done' for path, record in records.items() if path != '/videos/crash.mp4')
+    assert video_jobs.load_completed_videos(resume_path) == set(paths) - {'/videos/crash.mp4'}
+
+
+def test_workers_split_the_cores_between_stage_pools(monkeypatch):
+    monkeypatch.setattr(video_jobs.os, 'cpu_count', lambda: 8)
+    assert video_jobs._worker_analyzer_options(None, 4) == {'stage_workers': 2}
+    assert video_jobs._worker_analyzer_options(None, 16) == {'stage_workers': 1}
+    assert video_jobs._worker_analyzer_options({'stage_workers': 3}, 4) == {'stage_workers': 3}
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.writer import AnalysisResultWriter
+
+
+RESULT = {'post_id': 'p1', 'total_interactions': 10, 'unique_users': 8, 'abnormal_signal_count': 0,
+          'confidence': 0, 'label': None, 'triggered_signals': []}
+
+
+@pytest.mark.parametrize('extension', ['.parquet', '.arrow'])
+def test_failed_write_leaves_no_partial_file(tmp_path, extension):
+    path = str(tmp_path / f'results{extension}')
+    with pytest.raises(RuntimeError):
+        with AnalysisResultWriter(path, batch_size=1) as writer:
+            writer.write(RESULT)
+            assert os.path.exists(path)
+            raise RuntimeError('analysis failed')
+    assert not os.path.exists(path)
+
+
+def test_clean_exit_finalizes_file(tmp_path):
+    import pandas as pd
+    
+    path = str(tmp_path / 'results.parquet')
+    with AnalysisResultWriter(path, batch_size=1) as writer:
+        writer.write(RESULT)
+        writer.write(dict(RESULT, post_id='p2'))
+    assert list(pd.read_parquet(path)['post_id']) == ['p1', 'p2']
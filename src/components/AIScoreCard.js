@@ -12,7 +12,8 @@ const AIScoreCard = ({
   label,
   tapDetail,
   geminiInsights,
-  abnormalCount
+  abnormalCount,
+  geminiStatus
 }) => {
   
   const getRiskClass = (score) => {
@@ -137,6 +138,22 @@ const AIScoreCard = ({
             )}
           </div>
         )}
+
+        {!geminiInsights && ['pending', 'timeout', 'failed'].includes(geminiStatus) && (
+          <div className={`gemini-insights gemini-${geminiStatus}`}>
+            <div className="insight-header">
+              <span className="gemini-icon">🤖</span>
+              <span className="gemini-title">Gemini AI Insights</span>
+            </div>
+            <div className="insight-item">
+              <span>
+                {geminiStatus === 'pending' && 'Generating insights...'}
+                {geminiStatus === 'timeout' && '⏱️ Timed out waiting for insights'}
+                {geminiStatus === 'failed' && '⚠️ Insights unavailable right now'}
+              </span>
+            </div>
+          </div>
+        )}
       </div>
 
       <div className="score-footer">
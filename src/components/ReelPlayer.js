@@ -15,6 +15,9 @@ const ReelPlayer = ({ reel, isActive }) => {
   const [analysis, setAnalysis] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [geminiStatus, setGeminiStatus] = useState(null);
+  const reelIdRef = useRef(reel.id);
+  const geminiJobId = analysis?.gemini_job_id;
 
   useEffect(() => {
     if (isActive && videoRef.current && !videoError) {
@@ -27,6 +30,41 @@ const ReelPlayer = ({ reel, isActive }) => {
     }
   }, [isActive, videoError]);
 
+  // A different reel starts with a clean slate; late results for the old one are dropped
+  useEffect(() => {
+    reelIdRef.current = reel.id;
+    setAnalysis(null);
+    setError(null);
+    setGeminiStatus(null);
+  }, [reel.id]);
+
+  // Gemini insights arrive separately; poll for them until they are ready, and
+  // stop polling when the analysis is replaced or the player unmounts
+  useEffect(() => {
+    if (!geminiJobId) {
+      setGeminiStatus(null);
+      return undefined;
+    }
+    const controller = new AbortController();
+    setGeminiStatus('pending');
+    api.getEnrichment(geminiJobId, { signal: controller.signal })
+      .then((job) => {
+        if (job && job.status === 'done') {
+          setAnalysis((current) => ({ ...current, ...job.result, gemini_status: 'done' }));
+          setGeminiStatus('done');
+        } else {
+          setGeminiStatus(job && job.status === 'timeout' ? 'timeout' : 'failed');
+        }
+      })
+      .catch((err) => {
+        if (err.name !== 'AbortError') {
+          console.error('Gemini enrichment failed:', err);
+          setGeminiStatus('failed');
+        }
+      });
+    return () => controller.abort();
+  }, [geminiJobId]);
+
   const togglePlay = () => {
     if (videoRef.current) {
       if (isPlaying) {
@@ -45,16 +83,21 @@ const ReelPlayer = ({ reel, isActive }) => {
   };
 
   const analyzeVideo = async () => {
+    const reelId = reel.id;
     setLoading(true);
     setError(null);
     
     try {
-      console.log(`🔍 Analyzing video ${reel.id} with backend...`);
+      console.log(`🔍 Analyzing video ${reelId} with backend...`);
       const result = await api.analyzeReel(reel);
-      setAnalysis(result);
+      if (reelIdRef.current === reelId) {
+        setAnalysis(result);
+      }
     } catch (err) {
       console.error('Analysis failed:', err);
-      setError('Failed to analyze video');
+      if (reelIdRef.current === reelId) {
+        setError('Failed to analyze video');
+      }
     } finally {
       setLoading(false);
     }
@@ -166,6 +209,7 @@ const ReelPlayer = ({ reel, isActive }) => {
               tapDetail={analysis?.tap_detail}
               geminiInsights={analysis?.gemini_insights}
               abnormalCount={analysis?.abnormal_signal_count}
+              geminiStatus={geminiStatus}
             />
           )}
           <button className="close-ai-btn" onClick={toggleAIScore}>
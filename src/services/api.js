@@ -30,12 +30,47 @@ export const api = {
       });
       
       const result = await response.json();
+      if (!response.ok) {
+        // e.g. 429 when the server's Gemini queue is full; the caller offers a retry
+        throw new Error(result.error || `Analysis failed (${response.status})`);
+      }
       console.log(`✅ Analysis for video ${reelData.id}: ${result.confidence}%`);
       return result;
     } catch (error) {
       console.error('❌ Analysis failed:', error);
       throw error;
     }
+  },
+
+  // Poll for deferred Gemini insights until they are ready (or give up).
+  // Resolves to the job, { status: 'timeout' } after the last attempt, or null
+  // if the job is unknown; aborting `signal` stops polling with an AbortError.
+  async getEnrichment(jobId, { attempts = 10, intervalMs = 1500, signal } = {}) {
+    for (let i = 0; i < attempts; i++) {
+      const response = await fetch(`${API_BASE_URL}/enrichment/${jobId}?_=${Date.now()}`, {
+        headers: { 'Cache-Control': 'no-cache' },
+        signal
+      });
+      if (!response.ok) {
+        return null;
+      }
+      const job = await response.json();
+      if (job.status !== 'pending') {
+        return job;
+      }
+      await new Promise((resolve, reject) => {
+        const onAbort = () => {
+          clearTimeout(timer);
+          reject(new DOMException('Enrichment polling aborted', 'AbortError'));
+        };
+        const timer = setTimeout(() => {
+          signal?.removeEventListener('abort', onAbort);
+          resolve();
+        }, intervalMs);
+        signal?.addEventListener('abort', onAbort, { once: true });
+      });
+    }
+    return { job_id: jobId, status: 'timeout' };
   }
 };
 